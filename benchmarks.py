@@ -0,0 +1,621 @@
+"""Medições de desempenho da ficha, sem interface gráfica.
+
+Uso:
+
+    python benchmarks.py registros [--quantidade N]
+    python benchmarks.py grupo [--quantidade N]
+    python benchmarks.py carga [--magias N]
+    python benchmarks.py binario [--magias N]
+    python benchmarks.py historico [--passos N] [--magias N]
+    python benchmarks.py pdf [--fichas N] [--magias N]
+    python benchmarks.py quebra [--magias N]
+    python benchmarks.py grimorio [--magias N]
+    python benchmarks.py reexportar [--magias N]
+    python benchmarks.py busca [--magias N]
+"""
+import argparse
+import copy
+import gc
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sheet_model import CharacterSheet, StatsEngine, ATTRIBUTES, SKILLS
+import sheet_binary
+from sheet_history import UndoHistory
+from sheet_records import Spell, Item
+from sheet_search import SearchController, SearchIndex, filter_records
+from sheet_storage import read_sheet, write_json_atomic
+
+
+SCHOOLS = ['Abjuração', 'Adivinhação', 'Conjuração', 'Encantamento',
+           'Evocação', 'Ilusão', 'Necromancia', 'Transmutação']
+
+
+def sample_spell(index):
+    """Magia no formato do JSON, com strings novas como as do json.load"""
+    return {
+        'nome': f"Magia {index}",
+        'nivel': index % 10,
+        'escola': ''.join(SCHOOLS[index % len(SCHOOLS)]),
+        'preparada': index % 3 == 0,
+        'tempo_conjuracao': ''.join('1 ação'),
+        'alcance': ''.join('18 metros'),
+        'componentes': ''.join('V, S, M'),
+        'duracao': ''.join('Instantânea'),
+        'custo_mana': str(index % 10),
+        'teste_resistencia': ''.join('Destreza'),
+        'dano_efeito': f"{index % 10 + 1}d6 fogo",
+        'descricao': f"Descrição da magia {index}.",
+        'niveis_superiores': '',
+    }
+
+
+def sample_item(index):
+    return {
+        'nome': f"Item {index}",
+        'acerto_bonus': '+1',
+        'peso': str(index % 20),
+        'cristal_saint': '0',
+        'cristal_qi': '0',
+        'cristal_puro': '0',
+        'descricao': f"Descrição do item {index}.",
+        'tipos_dano': [['1d8', 'cortante']],
+    }
+
+
+def sample_sheet(index):
+    """Ficha com atributos, nível e proficiências variando com o índice"""
+    sheet = CharacterSheet()
+    sheet.basic_info['Nome'] = f"Personagem {index}"
+    sheet.basic_info['Nível'] = str(index % 20 + 1)
+    for offset, attr in enumerate(ATTRIBUTES):
+        sheet.attributes[attr] = {
+            'value': str(8 + (index + offset * 3) % 13),
+            'save_proficiency': (index + offset) % 3 == 0
+        }
+    for offset, skill in enumerate(SKILLS):
+        sheet.skills[skill] = {
+            'prof1': (index + offset) % 4 == 0,
+            'prof2': (index + offset) % 11 == 0,
+            'bonus': str((index + offset) % 3 - 1)
+        }
+    return sheet
+
+
+def measure(build):
+    """Executa build() e retorna (resultado, bytes alocados, segundos).
+
+    O tempo é medido numa execução separada, sem o tracemalloc ativo.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, allocated, elapsed
+
+
+def records_command(args):
+    count = args.quantidade
+    cases = [('magias', sample_spell, Spell), ('itens', sample_item, Item)]
+    for label, sample, cls in cases:
+        raw = [sample(i) for i in range(count)]
+        dicts, dict_bytes, dict_time = measure(lambda: [dict(entry) for entry in raw])
+        records, record_bytes, record_time = measure(lambda: [cls.from_dict(entry) for entry in raw])
+        print(f"{count} {label}:")
+        print(f"    dicionários: {dict_bytes / count:8.1f} bytes/registro, {dict_time * 1000:7.1f} ms")
+        print(f"    registros:   {record_bytes / count:8.1f} bytes/registro, {record_time * 1000:7.1f} ms")
+        print(f"    economia:    {100 * (1 - record_bytes / dict_bytes):.0f}%")
+        del dicts, records
+    return 0
+
+
+def roster_command(args):
+    # Importado aqui para os demais comandos não dependerem do NumPy
+    from sheet_roster import Roster
+
+    count = args.quantidade
+    sheets = [sample_sheet(i) for i in range(count)]
+
+    start = time.perf_counter()
+    per_sheet = [StatsEngine(sheet).derive() for sheet in sheets]
+    engine_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    roster = Roster(sheets)
+    load_time = time.perf_counter() - start
+    start = time.perf_counter()
+    stats = roster.compute()
+    compute_time = time.perf_counter() - start
+
+    # Confere que os dois caminhos chegam aos mesmos valores
+    for row, derived in enumerate(per_sheet):
+        assert list(stats['saves'][row]) == [derived['saves'][attr] for attr in ATTRIBUTES]
+        assert list(stats['skills'][row]) == [derived['skills'][skill] for skill in SKILLS]
+
+    print(f"{count} fichas:")
+    print(f"    StatsEngine por ficha: {engine_time * 1000:8.1f} ms")
+    print(f"    Roster (colunas):      {load_time * 1000:8.1f} ms")
+    print(f"    Roster (cálculo):      {compute_time * 1000:8.1f} ms")
+    return 0
+
+
+def load_command(args):
+    sheet = sample_sheet(0)
+    sheet.spells = [Spell.from_dict(sample_spell(i)) for i in range(args.magias)]
+    sheet.inventory = [Item.from_dict(sample_item(i)) for i in range(args.magias // 10)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ficha.json')
+        write_json_atomic(path, sheet.to_dict())
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        with open(path, 'r', encoding='utf-8') as file:
+            CharacterSheet.from_dict(json.load(file))
+        eager_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lazy = CharacterSheet.from_dict(read_sheet(path))
+        lazy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lazy.spells
+        spells_time = time.perf_counter() - start
+
+    print(f"Ficha de {size / 1e6:.1f} MB com {args.magias} magias:")
+    print(f"    leitura completa:          {eager_time * 1000:8.1f} ms")
+    print(f"    leitura adiada (núcleo):   {lazy_time * 1000:8.1f} ms")
+    print(f"    primeiro acesso às magias: {spells_time * 1000:8.1f} ms")
+    return 0
+
+
+def binary_command(args):
+    sheet = sample_sheet(0)
+    sheet.spells = [Spell.from_dict(sample_spell(i)) for i in range(args.magias)]
+    sheet.inventory = [Item.from_dict(sample_item(i)) for i in range(args.magias // 10)]
+    # Retrato de 150x150 com conteúdo pouco compressível, como uma foto
+    sheet.photo = os.urandom(150 * 150 * 2)
+    data = sheet.to_dict()
+
+    formats = [
+        ('JSON (indent=4)',
+         lambda: json.dumps(data, ensure_ascii=False, indent=4).encode('utf-8'),
+         lambda blob: json.loads(blob)),
+        ('binário', lambda: sheet_binary.dumps(data), sheet_binary.loads),
+    ]
+    print(f"Ficha com {args.magias} magias:")
+    for label, save, load in formats:
+        start = time.perf_counter()
+        blob = save()
+        save_time = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = load(blob)
+        load_time = time.perf_counter() - start
+        assert loaded == data
+        print(f"    {label:16} {len(blob) / 1e6:7.2f} MB  gravação {save_time * 1000:7.1f} ms  "
+              f"leitura {load_time * 1000:7.1f} ms")
+    return 0
+
+
+def edit_step(sheet, step):
+    """Uma edição variada: atributo, magia alterada, incluída ou excluída"""
+    kind = step % 4
+    if kind == 0:
+        sheet.set(('attributes', ATTRIBUTES[step % 6], 'value'), str(8 + step % 11))
+    elif kind == 1:
+        index = step % len(sheet.spells)
+        changed = dict(sheet.spells[index].to_dict(), descricao=f"Revisão {step}")
+        sheet.set(('spells', index), Spell.from_dict(changed))
+    elif kind == 2:
+        sheet.insert(('spells',), None, Spell.from_dict(sample_spell(step)))
+    else:
+        sheet.remove(('spells',), step % len(sheet.spells))
+
+
+def history_command(args):
+    def build_sheet():
+        sheet = sample_sheet(0)
+        sheet.spells = [Spell.from_dict(sample_spell(i)) for i in range(args.magias)]
+        return sheet
+
+    def run(with_history):
+        sheet = build_sheet()
+        history = UndoHistory(sheet, limit=args.passos)
+        if with_history:
+            sheet.listeners.append(history.record)
+        gc.collect()
+        tracemalloc.start()
+        for step in range(args.passos):
+            edit_step(sheet, step)
+            history.checkpoint()
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return sheet, history, allocated
+
+    _, _, base_bytes = run(False)
+    sheet, history, history_bytes = run(True)
+    per_step = (history_bytes - base_bytes) / args.passos
+
+    # Alternativa com cópias: uma cópia profunda da ficha por passo
+    gc.collect()
+    tracemalloc.start()
+    snapshot = copy.deepcopy(sheet.to_dict())
+    snapshot_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del snapshot
+
+    # Desfazer tudo volta à ficha original; refazer tudo volta ao estado final
+    final = sheet.to_dict()
+    start = time.perf_counter()
+    while history.undo_stack:
+        history.undo()
+    undo_time = time.perf_counter() - start
+    assert sheet.to_dict() == build_sheet().to_dict()
+    start = time.perf_counter()
+    while history.redo_stack:
+        history.redo()
+    redo_time = time.perf_counter() - start
+    assert sheet.to_dict() == final
+
+    print(f"{args.passos} passos numa ficha com {args.magias} magias:")
+    print(f"    histórico (operações inversas): {per_step:10.1f} bytes/passo")
+    print(f"    cópia da ficha por passo:       {snapshot_bytes:10.1f} bytes/passo")
+    print(f"    desfazer tudo: {undo_time * 1000:7.1f} ms   refazer tudo: {redo_time * 1000:7.1f} ms")
+    return 0
+
+
+def pdf_command(args):
+    # Importado aqui para os demais comandos não dependerem do reportlab
+    from reportlab import rl_config
+    from sheet_pdf import render_sheet_pdf
+
+    sheets = []
+    for index in range(args.fichas):
+        sheet = sample_sheet(index)
+        sheet.spells = [Spell.from_dict(sample_spell(i)) for i in range(args.magias)]
+        sheet.inventory = [Item.from_dict(sample_item(i)) for i in range(args.magias // 10)]
+        sheets.append(sheet)
+
+    def run():
+        start = time.perf_counter()
+        size = 0
+        for sheet in sheets:
+            output = io.BytesIO()
+            render_sheet_pdf(sheet, output)
+            size += len(output.getbuffer())
+        return (time.perf_counter() - start) / len(sheets), size / len(sheets)
+
+    cases = [('Flate + ASCII85', 1), ('só Flate', 0)]
+    results = {}
+    current = rl_config.useA85
+    try:
+        # Melhor de três rodadas alternadas, para diluir o ruído da máquina
+        for _ in range(3):
+            for label, use_a85 in cases:
+                rl_config.useA85 = use_a85
+                elapsed, size = run()
+                best = results.get(label)
+                results[label] = (min(elapsed, best[0]) if best else elapsed, size)
+    finally:
+        rl_config.useA85 = current
+
+    print(f"{args.fichas} fichas com {args.magias} magias e {args.magias // 10} itens:")
+    for label, _ in cases:
+        elapsed, size = results[label]
+        print(f"    {label:16} {elapsed * 1000:7.2f} ms/ficha  {size / 1024:7.1f} KiB/ficha")
+    return 0
+
+
+DESCRIPTION_WORDS = (
+    "uma criatura dentro do alcance deve fazer um teste de resistência de Destreza "
+    "sofrendo dano de fogo em uma falha ou metade desse dano em um sucesso "
+    "objetos inflamáveis na área que não estejam sendo vestidos ou carregados pegam fogo"
+).split()
+
+
+def sample_description(index, words=120):
+    """Descrição longa, em parágrafos, com palavras que se repetem entre magias"""
+    text = []
+    for position in range(words):
+        text.append(DESCRIPTION_WORDS[(index + position * 7 + position // 11) % len(DESCRIPTION_WORDS)])
+        if position % 40 == 39:
+            text.append('\n')
+    return ' '.join(text).replace(' \n ', '\n')
+
+
+def wrap_command(args):
+    # Importado aqui para os demais comandos não dependerem do reportlab
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import simpleSplit
+    from sheet_pdf import RIGHT_MARGIN, text_width, wrap_text
+
+    width = A4[0] - 70 - RIGHT_MARGIN
+    texts = [sample_description(i) for i in range(args.magias)]
+    texts += [f"{i + 1}d6 de dano adicional para cada nível acima do {i % 9 + 1}º"
+              for i in range(args.magias)]
+    words = sum(len(text.split()) for text in texts)
+
+    def reportlab_split():
+        return [line for text in texts for paragraph in text.split('\n')
+                for line in simpleSplit(paragraph, "Helvetica", 10, width) or ['']]
+
+    def wrap():
+        return [line for text in texts for line in wrap_text(text, width)]
+
+    # simpleSplit do reportlab mede cada linha candidata de novo; wrap_text
+    # mede cada palavra uma vez, primeiro com o cache vazio e depois pronto
+    cases = [('simpleSplit', reportlab_split, None),
+             ('wrap_text (cache vazio)', wrap, text_width.cache_clear),
+             ('wrap_text (cache pronto)', wrap, None)]
+    print(f"{len(texts)} textos ({args.magias} descrições e níveis superiores), {words} palavras:")
+    for label, function, before in cases:
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        lines = function()
+        elapsed = time.perf_counter() - start
+        print(f"    {label:24} {elapsed * 1000:8.1f} ms  {len(lines)} linhas")
+    info = text_width.cache_info()
+    print(f"    cache de larguras: {info.currsize} entradas, {info.hits} acertos, {info.misses} faltas")
+    return 0
+
+
+def peak_memory(function):
+    """Pico de memória alocada (tracemalloc) durante function()"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def grimoire_command(args):
+    # Importado aqui para os demais comandos não dependerem do reportlab
+    import PyPDF2
+    from sheet_pdf import render_sheet_pdf
+    from sheet_pdf_import import pdf_lines, read_pdf_sheet
+
+    sheet = sample_sheet(0)
+    spells = []
+    for index in range(args.magias):
+        spell = sample_spell(index)
+        spell['descricao'] = sample_description(index)
+        spells.append(Spell.from_dict(spell))
+    sheet.spells = spells
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'grimorio.pdf')
+        with open(path, 'wb') as file:
+            render_sheet_pdf(sheet, file)
+        size = os.path.getsize(path)
+
+        def full_text():
+            # Leitura anterior: o texto de todas as páginas em uma string
+            with open(path, 'rb') as file:
+                reader = PyPDF2.PdfReader(file)
+                text = ""
+                for page in reader.pages:
+                    text += page.extract_text() + "\n"
+            return len(text.split("\n")), len(reader.pages)
+
+        def streaming():
+            return sum(1 for _ in pdf_lines(path)), None
+
+        def parse():
+            data = read_pdf_sheet(path)
+            return len(data['spells']), None
+
+        lines, pages = full_text()
+        print(f"{args.magias} magias: {pages} páginas, {size / 1024:.0f} KiB, {lines} linhas")
+        cases = [('texto inteiro', full_text), ('página a página', streaming),
+                 ('importação completa', parse)]
+        for label, function in cases:
+            start = time.perf_counter()
+            count, _ = function()
+            elapsed = time.perf_counter() - start
+            peak = peak_memory(function)
+            print(f"    {label:20} {elapsed:7.2f} s  pico {peak / 1024 / 1024:7.2f} MiB  ({count})")
+    return 0
+
+
+def reexport_command(args):
+    # Importado aqui para os demais comandos não dependerem do reportlab
+    from sheet_pdf import PdfSectionCache, render_sheet_pdf
+
+    sheet = sample_sheet(0)
+    spells = []
+    for index in range(args.magias):
+        spell = sample_spell(index)
+        spell['descricao'] = sample_description(index)
+        spells.append(Spell.from_dict(spell))
+    sheet.spells = spells
+    sheet.inventory = [Item.from_dict(sample_item(i)) for i in range(args.magias // 10)]
+    cache = PdfSectionCache()
+
+    def export(use_cache=True):
+        output = io.BytesIO()
+        start = time.perf_counter()
+        render_sheet_pdf(sheet, output, cache=cache if use_cache else None)
+        return time.perf_counter() - start, len(output.getbuffer())
+
+    def change_hp():
+        sheet.resources['Vida'] = {'atual': '7', 'max': '20'}
+
+    def change_spell():
+        sheet.spells[0] = Spell.from_dict(dict(sample_spell(0), nome="Bola de Fogo"))
+
+    def change_level():
+        sheet.basic_info['Nível'] = '20'
+
+    print(f"Ficha com {args.magias} magias e {args.magias // 10} itens:")
+    elapsed, size = export(use_cache=False)
+    print(f"    {'sem cache':26} {elapsed * 1000:8.1f} ms  {size / 1024:.0f} KiB")
+    cases = [('primeira exportação', None), ('sem alterações', None),
+             ('pontos de vida', change_hp), ('uma magia', change_spell),
+             ('nível (saves, perícias)', change_level)]
+    for label, change in cases:
+        if change is not None:
+            change()
+        hits = cache.hits
+        elapsed, size = export()
+        print(f"    {label:26} {elapsed * 1000:8.1f} ms  {cache.hits - hits} seções copiadas")
+    return 0
+
+
+# Buscas digitadas letra a letra
+TYPED_QUERIES = ["bola de fogo", "destreza", "magia 1999", "inflamáveis vestidos", "xyz"]
+
+
+def search_command(args):
+    spells = []
+    for index in range(args.magias):
+        spell = sample_spell(index)
+        spell['descricao'] = sample_description(index)
+        spells.append(Spell.from_dict(spell))
+
+    def scan(term):
+        # Busca anterior: nome e descrição em minúsculas a cada tecla
+        term = term.lower().strip()
+        return [spell for spell in spells
+                if not term or term in spell.nome.lower() or term in spell.descricao.lower()]
+
+    start = time.perf_counter()
+    index = SearchIndex(('nome', 'descricao'))
+    index.sync(spells)
+    print(f"{args.magias} magias: índice montado em {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def controller(search):
+        # SearchController sem espera: cada tecla busca na hora, refinando
+        # a partir do resultado anterior quando o termo cresce
+        search = SearchController(lambda: spells, lambda results: None, search=search)
+        return lambda term: search.request(term)
+
+    prefixes = [query[:size] for query in TYPED_QUERIES for size in range(1, len(query) + 1)]
+    cases = [('varredura', scan),
+             ('varredura refinada', controller(filter_records)),
+             ('índice', lambda term: index.filter(spells, term)),
+             ('índice refinado', controller(index.filter))]
+    for label, search in cases:
+        times = []
+        for term in prefixes:
+            start = time.perf_counter()
+            search(term)
+            times.append(time.perf_counter() - start)
+        times.sort()
+        print(f"    {label:20} média {sum(times) / len(times) * 1000:6.2f} ms/tecla  "
+              f"pior {times[-1] * 1000:6.2f} ms  ({len(times)} teclas)")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='benchmarks.py',
+        description="Medições de desempenho da Ficha de D&D 5.5E."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    records = commands.add_parser(
+        'registros',
+        help="compara a memória de magias e itens em dicionários e em registros"
+    )
+    records.add_argument('--quantidade', type=int, default=10000,
+                         help="número de registros de cada tipo (padrão: 10000)")
+    records.set_defaults(handler=records_command)
+
+    roster = commands.add_parser(
+        'grupo',
+        help="compara o cálculo ficha a ficha com o cálculo vetorizado do grupo"
+    )
+    roster.add_argument('--quantidade', type=int, default=5000,
+                        help="número de fichas no grupo (padrão: 5000)")
+    roster.set_defaults(handler=roster_command)
+
+    load = commands.add_parser(
+        'carga',
+        help="compara a leitura completa de uma ficha grande com a leitura adiada por seção"
+    )
+    load.add_argument('--magias', type=int, default=20000,
+                      help="número de magias na ficha (padrão: 20000)")
+    load.set_defaults(handler=load_command)
+
+    binary = commands.add_parser(
+        'binario',
+        help="compara tamanho e tempo de gravação/leitura do JSON e do formato binário"
+    )
+    binary.add_argument('--magias', type=int, default=20000,
+                        help="número de magias na ficha (padrão: 20000)")
+    binary.set_defaults(handler=binary_command)
+
+    history = commands.add_parser(
+        'historico',
+        help="mede a memória por passo do histórico de desfazer/refazer"
+    )
+    history.add_argument('--passos', type=int, default=5000,
+                         help="número de passos no histórico (padrão: 5000)")
+    history.add_argument('--magias', type=int, default=5000,
+                         help="número de magias na ficha (padrão: 5000)")
+    history.set_defaults(handler=history_command)
+
+    pdf = commands.add_parser(
+        'pdf',
+        help="mede o tempo e o tamanho do PDF por ficha com e sem a codificação ASCII85"
+    )
+    pdf.add_argument('--fichas', type=int, default=200,
+                     help="número de fichas desenhadas (padrão: 200)")
+    pdf.add_argument('--magias', type=int, default=20,
+                     help="número de magias em cada ficha (padrão: 20)")
+    pdf.set_defaults(handler=pdf_command)
+
+    wrap = commands.add_parser(
+        'quebra',
+        help="mede a quebra de linhas das descrições de um compêndio de magias"
+    )
+    wrap.add_argument('--magias', type=int, default=5000,
+                      help="número de magias (padrão: 5000)")
+    wrap.set_defaults(handler=wrap_command)
+
+    grimoire = commands.add_parser(
+        'grimorio',
+        help="mede a importação pelo texto de um PDF de centenas de páginas"
+    )
+    grimoire.add_argument('--magias', type=int, default=1500,
+                          help="número de magias no grimório (padrão: 1500)")
+    grimoire.set_defaults(handler=grimoire_command)
+
+    reexport = commands.add_parser(
+        'reexportar',
+        help="mede exportações seguidas do PDF com o cache de seções"
+    )
+    reexport.add_argument('--magias', type=int, default=2000,
+                          help="número de magias na ficha (padrão: 2000)")
+    reexport.set_defaults(handler=reexport_command)
+
+    search = commands.add_parser(
+        'busca',
+        help="compara a busca de magias por varredura e pelo índice, com e sem refinamento"
+    )
+    search.add_argument('--magias', type=int, default=2000,
+                        help="número de magias na ficha (padrão: 2000)")
+    search.set_defaults(handler=search_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
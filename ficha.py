@@ -1,16 +1,44 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
-import json
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 import os
+import sys
 from PIL import Image, ImageTk
 import io
-import base64
+import logging
+import queue
+import threading
 import traceback
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from sheet_records import Spell, Item, Ability, Feature, Affinity
+from sheet_model import (CharacterSheet, StatsEngine, ATTRIBUTES, SKILLS, CLASS_LABELS,
+                         RESOURCES, format_bonus, format_modifier)
+from sheet_binary import BINARY_EXTENSION
+from sheet_db import CampaignStore
+from sheet_history import UndoHistory
+from sheet_journal import ChangeJournal
+from sheet_recent import RecentSheets
+from sheet_pdf import (PDF_SECTIONS, ExportCancelled, PdfSectionCache, read_embedded_sheet,
+                       write_sheet_pdf)
+from sheet_pdf_import import read_pdf_sheet
+from sheet_search import SearchController, SearchIndex, filter_records
+from sheet_storage import AutosaveWorker, AssetStore, DEFERRED_SECTIONS, read_sheet
+
+logger = logging.getLogger(__name__)
+
+# Tipos de arquivo de ficha aceitos na exportação e importação
+SHEET_FILETYPES = [("JSON Files", "*.json"), ("Ficha binária", "*" + BINARY_EXTENSION)]
+
+# Bancos SQLite de campanha (vários personagens)
+CAMPAIGN_FILETYPES = [("Campanha SQLite", "*.db"), ("Todos os arquivos", "*.*")]
 
 # Primeiro, definir a classe BackgroundScreen
 class BackgroundScreen:
+    # Seção da ficha mostrada pela tela
+    section = 'background'
+
     def __init__(self, parent):
         self.parent = parent
         self.window = tk.Toplevel(parent.root)
@@ -59,17 +87,10 @@ class BackgroundScreen:
         self.photo_canvas = tk.Canvas(photo_frame, width=150, height=150)
         self.photo_canvas.pack(pady=5)
 
-        # Carregar foto atual se existir
-        self.photo_image = None
-        if hasattr(self.parent, 'photo_data') and self.parent.photo_data:
-            try:
-                image_data = base64.b64decode(self.parent.photo_data)
-                image = Image.open(io.BytesIO(image_data))
-                photo = ImageTk.PhotoImage(image)
-                self.photo_canvas.create_image(0, 0, anchor="nw", image=photo)
-                self.photo_image = photo
-            except:
-                self.set_default_photo()
+        # Reaproveitar a imagem já carregada na ficha principal, se existir
+        self.photo_image = getattr(self.parent, 'photo_image', None)
+        if self.photo_image:
+            self.photo_canvas.create_image(0, 0, anchor="nw", image=self.photo_image)
         else:
             self.set_default_photo()
 
@@ -224,9 +245,8 @@ class BackgroundScreen:
                 level = self.parent.background_data.get('basic_info', {}).get('Nível', '0')
                 self.parent.background_data['classes']['Classe Primária'] = f"{primary_class.split()[0]} {level} nvs"
         
+        # O background é gravado junto com a ficha
         self.parent.background_data = background_data
-        with open('ficha_dnd.json', 'w') as file:
-            json.dump(self.parent.background_data, file, indent=4)
         messagebox.showinfo("Sucesso", "Background salvo com sucesso!")
 
     def clear_all(self):
@@ -237,37 +257,151 @@ class BackgroundScreen:
             self.moral_var.set("")
             self.order_var.set("")
 
+    def reload(self):
+        """Mostra de novo os dados da ficha (ex.: após desfazer)"""
+        self.load_background()
+
     def load_background(self):
-        """Carrega os dados do background se existirem"""
+        """Carrega os dados do background da ficha"""
+        # Se a seção foi adiada na importação, é decodificada neste acesso
         try:
-            with open('ficha_dnd.json', 'r', encoding='utf-8') as file:  # Especificar a codificação utf-8
-                data = json.load(file)
-                self.parent.background_data = normalize_data(data)
-        except FileNotFoundError:
-            messagebox.showwarning("Aviso", "Arquivo de dados não encontrado.")
-            return
+            background = self.parent.background_data
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao importar dados: {e}")
             return
 
         # Carregar informações de identidade
-        for key, value in self.parent.background_data.get('identity', {}).items():
+        for key, value in background.get('identity', {}).items():
             if key in self.identity_vars:
                 self.identity_vars[key].set(value)
         
         # Carregar textos
-        for key, text in self.parent.background_data.get('texts', {}).items():
+        for key, text in background.get('texts', {}).items():
             if key in self.text_widgets:
                 self.text_widgets[key].delete("1.0", tk.END)
                 self.text_widgets[key].insert("1.0", text)
         
         # Carregar alinhamento
-        alignment = self.parent.background_data.get('alignment', {})
+        alignment = background.get('alignment', {})
         self.moral_var.set(alignment.get('moral', ''))
         self.order_var.set(alignment.get('order', ''))
 
+def read_sheet_file(file_path):
+    """Lê uma ficha do disco e decodifica o retrato.
+
+    Não usa o Tk, então pode rodar fora da thread da interface. Retorna
+    (ficha, imagem PIL do retrato ou None); a imagem é convertida em
+    PhotoImage por load_photo, já na thread da interface.
+    """
+    # Magias, inventário e background só são decodificados quando as
+    # respectivas telas forem abertas
+    sheet = CharacterSheet.from_dict(read_sheet(file_path), AssetStore.for_sheet(file_path))
+    image = None
+    if sheet.photo:
+        try:
+            image = Image.open(io.BytesIO(sheet.photo))
+            image.load()
+        except Exception:
+            # load_photo mostra o erro e usa o retrato padrão
+            image = None
+    return sheet, image
+
+def _sheet_field(name):
+    """Propriedade que lê e grava um campo do modelo da ficha (self.sheet)"""
+    return property(lambda self: getattr(self.sheet, name),
+                    lambda self, value: self.sheet.set((name,), value))
+
+class RecomputeScheduler:
+    """Agrupa os recálculos disparados pelos traces das variáveis Tk.
+
+    Cada callback apenas registra uma chave suja; o recálculo roda uma única
+    vez no próximo ciclo ocioso (after_idle). Dentro de batch() o
+    agendamento fica suspenso e tudo é aplicado em um só flush ao final;
+    report(callbacks, chaves), se informado, é chamado depois desse flush
+    com quantos callbacks o lote agrupou.
+    """
+
+    def __init__(self, widget, callback, report=None):
+        self.widget = widget
+        self.callback = callback
+        self.report = report
+        self.dirty = set()
+        self.suspended = 0
+        self.pending = None
+        self.requests = 0
+        self.coalesced = 0
+        self.flushes = 0
+        # O próximo flush é o que encerra um batch()
+        self.batched = False
+
+    def request(self, key):
+        """Registra uma chave suja e agenda o recálculo"""
+        self.dirty.add(key)
+        self.requests += 1
+        self._schedule()
+
+    def _schedule(self):
+        if not self.suspended and self.pending is None:
+            self.pending = self.widget.after_idle(self.flush)
+
+    @contextmanager
+    def batch(self):
+        """Suspende os recálculos até o fim do bloco"""
+        self.suspended += 1
+        try:
+            yield self
+        finally:
+            self.suspended -= 1
+            if self.dirty:
+                self.batched = not self.suspended
+                self._schedule()
+
+    def flush(self):
+        """Executa o recálculo pendente com todas as chaves acumuladas"""
+        self.pending = None
+        if self.suspended or not self.dirty:
+            return
+        keys, self.dirty = self.dirty, set()
+        requests, self.requests = self.requests, 0
+        self.coalesced += requests - 1
+        self.flushes += 1
+        self.callback(keys)
+        if self.batched:
+            self.batched = False
+            if self.report is not None:
+                self.report(requests, keys)
+
+    def summary(self):
+        """Resumo de quantos callbacks foram agrupados"""
+        return (f"{self.coalesced + self.flushes} callbacks agrupados em "
+                f"{self.flushes} recálculos ({self.coalesced} evitados)")
+
 # Depois, definir a classe FichaDnD
 class FichaDnD:
+    # Os dados vivem no modelo; a interface apenas se liga a ele
+    photo = _sheet_field('photo')
+    background_data = _sheet_field('background')
+    spells_data = _sheet_field('spells')
+    abilities_data = _sheet_field('abilities')
+    features_data = _sheet_field('features')
+    inventory_data = _sheet_field('inventory')
+    affinities_data = _sheet_field('affinities')
+
+    # Intervalos (ms) entre a última edição/Ctrl+S e a gravação em segundo
+    # plano no arquivo atual; None em autosave_delay desativa o autosave
+    autosave_delay = 3000
+    quick_save_delay = 300
+
+    # Com journal_mode, as edições são acrescentadas ao diário do arquivo
+    # (ver sheet_journal) e a ficha inteira só é regravada quando o diário
+    # passa de journal_compact_after alterações ou com Ctrl+S
+    journal_mode = True
+    journal_compact_after = 200
+
+    # Ao iniciar, a última ficha aberta é lida em outra thread enquanto a
+    # interface é construída
+    warm_start = True
+
     def __init__(self, root):
         self.root = root
         self.root.title("Ficha de D&D 5.5E")
@@ -275,13 +409,42 @@ class FichaDnD:
         # Vincular o evento de fechamento da janela ao método close_main_window
         self.root.protocol("WM_DELETE_WINDOW", self.close_main_window)
         
-        # Inicializar variáveis
-        self.photo_data = None
-        self.background_data = {}
-        self.spells_data = []
-        self.abilities_data = []
-        self.features_data = []
-        self.inventory_data = []
+        # Modelo da ficha e motor de valores derivados
+        self.sheet = CharacterSheet()
+        self.stats = StatsEngine(self.sheet)
+        self.scheduler = RecomputeScheduler(self.root, self.on_sheet_flush,
+                                            report=self.report_batch)
+
+        # Desfazer/refazer: cada ciclo do laço de eventos vira um passo
+        self.history = UndoHistory(self.sheet, schedule=self.root.after_idle)
+        # Variáveis Tk ligadas a campos do modelo ({caminho: variável}) e
+        # telas de listas abertas, atualizadas ao desfazer/refazer
+        self._sheet_vars = {}
+        self.open_screens = []
+
+        # Gravação em segundo plano do arquivo atual
+        self.autosave = AutosaveWorker()
+        # Seções do PDF da última exportação, copiadas se não mudaram
+        self.pdf_cache = PdfSectionCache()
+        self.current_file_path = None
+        self._save_timer = None
+        self._save_poll = None
+        self._save_failed = False
+        self.journal = None
+        # Geração da ficha (CharacterSheet.generation) gravada no arquivo
+        # atual, a da gravação em andamento e a do último envio à campanha
+        self._saved_generation = self.sheet.generation
+        self._submitted_generation = None
+        self._campaign_generation = None
+
+        # Personagem de um banco de campanha: (caminho do banco, id)
+        self.campaign_character = None
+
+        # Leitura da última ficha em segundo plano: (caminho, future, início)
+        self.recent_sheets = RecentSheets()
+        self._preload = None
+        if self.warm_start:
+            self.start_preload()
         
         # Inicializar identity_vars
         self.identity_vars = {}
@@ -297,9 +460,11 @@ class FichaDnD:
         
         # Defina o atributo hit_points_var
         self.hit_points_var = tk.StringVar()
+        self.bind_to_sheet(self.hit_points_var, 'combat', 'hit_points')
         
         # Defina o atributo temp_hit_points_var
         self.temp_hit_points_var = tk.StringVar()
+        self.bind_to_sheet(self.temp_hit_points_var, 'combat', 'temp_hit_points')
         
         # Inicializar moral_var
         self.moral_var = tk.StringVar()  # Adicione esta linha para inicializar moral_var
@@ -314,6 +479,9 @@ class FichaDnD:
         screen_width = root.winfo_screenwidth()
         screen_height = root.winfo_screenheight() - 60
         root.geometry(f"{screen_width}x{screen_height}+0+0")
+
+        # Barra de status com o estado da gravação
+        self.create_status_bar()
         
         # Criar canvas principal com scrollbar
         self.main_canvas = tk.Canvas(root)
@@ -342,9 +510,88 @@ class FichaDnD:
         self.create_health_section()
         self.create_control_buttons()
 
+        # Recalcular apenas os valores derivados afetados quando o modelo mudar
+        self.sheet.listeners.append(self.stats.on_change)
+        self.sheet.listeners.append(self.on_sheet_changed)
+        self.sheet.listeners.append(self.history.record)
+        self.update_all()
+
         # Configurar atalho de teclado para salvar
         self.root.bind('<Control-s>', self.quick_save)
 
+        # Desfazer/refazer em qualquer janela da ficha
+        self.root.bind_all('<Control-z>', self.undo)
+        self.root.bind_all('<Control-y>', self.redo)
+        self.root.bind_all('<Control-Z>', self.redo)
+
+        if self._preload is not None:
+            self.root.after(0, self.poll_preload)
+
+    def bind_to_sheet(self, var, *path):
+        """Liga uma variável Tk a um campo do modelo da ficha"""
+        self._sheet_vars[path] = var
+        var.trace('w', lambda *args: self._write_sheet(path, var))
+
+    def bind_row_to_sheet(self, var, rows, row, section, key):
+        """Liga a variável de uma linha dinâmica (bônus, recursos) ao modelo"""
+        def write(*args):
+            index = next(i for i, r in enumerate(rows) if r is row)
+            self._write_sheet(section + (index, key), var)
+        var.trace('w', write)
+
+    def _write_sheet(self, path, var):
+        try:
+            value = var.get()
+        except tk.TclError:
+            return
+        self.sheet.set(path, value)
+
+    def on_sheet_changed(self, change):
+        """Agenda a atualização dos valores exibidos quando o modelo é alterado"""
+        self.scheduler.request(change.path[0])
+        if self.journal is not None:
+            try:
+                self.journal.append(change)
+            except OSError as e:
+                # Sem o diário, volta a gravar a ficha inteira
+                self.save_status_var.set(f"Erro no diário de alterações: {e}")
+                self.journal = None
+            else:
+                if (self.journal.pending >= self.journal_compact_after
+                        and self._save_timer is None and self.autosave.idle):
+                    self.schedule_save(self.autosave_delay)
+                return
+        if self.current_file_path and self.autosave_delay is not None:
+            self.schedule_save(self.autosave_delay)
+
+    def on_sheet_flush(self, sections):
+        """Recalcula de uma só vez o que mudou desde o último ciclo ocioso"""
+        self.apply_derived(self.stats.recompute())
+
+    def report_batch(self, requests, sections):
+        """Registra quantos recálculos a carga de uma ficha evitou"""
+        logger.debug("Carga da ficha: %d callbacks em um recálculo (%d seções); sessão: %s",
+                     requests, len(sections), self.scheduler.summary())
+
+    def apply_derived(self, values):
+        """Atualiza na interface os valores derivados informados ({nó: valor})"""
+        for key, value in values.items():
+            kind, _, name = key.partition(':')
+            if kind == 'mod':
+                self.modifier_labels[name].config(text=format_modifier(value))
+            elif kind == 'save':
+                self.save_labels[name].config(text=format_bonus(value))
+            elif kind == 'skill':
+                self.skill_vars[name]['label'].config(text=format_bonus(value))
+            elif kind == 'prof':
+                self.prof_bonus_label.config(text=f"+{value}")
+            elif kind == 'ac':
+                self.ac_label.config(text=f"CA Total: {value}")
+            elif kind == 'dc':
+                self.cd_label.config(text=f"CD: {value}")
+            elif kind == 'passive':
+                self.passive_perception_label.config(text=str(value))
+
     def create_menu(self):
         """Cria a barra de menu"""
         menubar = tk.Menu(self.root)
@@ -353,23 +600,36 @@ class FichaDnD:
         # Menu Arquivo
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="Arquivo", menu=file_menu)
+        file_menu.add_command(label="Nova Ficha", command=self.new_sheet)
         
         # Submenu Exportar
         export_menu = tk.Menu(file_menu, tearoff=0)
         file_menu.add_cascade(label="Exportar", menu=export_menu)
         export_menu.add_command(label="Exportar para JSON", command=self.export_to_json)
         export_menu.add_command(label="Exportar para PDF", command=self.export_to_pdf)
+        export_menu.add_command(label="Exportar para Campanha (SQLite)", command=self.export_to_campaign)
         
         # Submenu Importar
         import_menu = tk.Menu(file_menu, tearoff=0)
         file_menu.add_cascade(label="Importar", menu=import_menu)
         import_menu.add_command(label="Importar de JSON", command=self.import_from_json)
         import_menu.add_command(label="Importar de PDF", command=self.import_from_pdf)
+        import_menu.add_command(label="Importar de Campanha (SQLite)", command=self.import_from_campaign)
+
+        # Submenu Fichas Recentes, montado a partir do cache ao ser aberto
+        self.recent_menu = tk.Menu(file_menu, tearoff=0, postcommand=self.update_recent_menu)
+        file_menu.add_cascade(label="Fichas Recentes", menu=self.recent_menu)
         
         # Adicionar separador e opção de Sair
         file_menu.add_separator()
         file_menu.add_command(label="Sair", command=self.root.quit)
 
+        # Menu Editar
+        edit_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Editar", menu=edit_menu)
+        edit_menu.add_command(label="Desfazer", accelerator="Ctrl+Z", command=self.undo)
+        edit_menu.add_command(label="Refazer", accelerator="Ctrl+Y", command=self.redo)
+
     def _on_mousewheel(self, event):
         """Função para permitir scroll com o mousewheel"""
         self.main_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
@@ -388,8 +648,8 @@ class FichaDnD:
         for i, label in enumerate(labels):
             ttk.Label(info_frame, text=label).grid(row=i, column=0, padx=5, pady=5, sticky="w")
             var = tk.StringVar()
+            self.bind_to_sheet(var, 'basic_info', label)
             if label == "Nível":
-                var.trace('w', self.update_proficiency_bonus)
                 self.level_var = var  # Armazenar a variável de nível para atualização
             entry = ttk.Entry(info_frame, textvariable=var)
             entry.grid(row=i, column=1, padx=5, pady=5, sticky="ew")
@@ -419,7 +679,7 @@ class FichaDnD:
                    command=self.remove_photo).pack(side="left", padx=2)
 
         # Imagem padrão ou placeholder
-        self.photo_data = None
+        self.photo = None
         self.photo_image = None
         self.set_default_photo()
 
@@ -428,7 +688,8 @@ class FichaDnD:
         self.photo_canvas.delete("all")
         self.photo_canvas.create_rectangle(0, 0, 150, 150, fill="lightgray")
         self.photo_canvas.create_text(75, 75, text="Foto do\nPersonagem", justify="center")
-        self.photo_data = None
+        self.photo = None
+        self.sheet.missing_photo_ref = None
         self.photo_image = None
 
     def select_photo(self):
@@ -446,10 +707,10 @@ class FichaDnD:
                 image = Image.open(file_path)
                 image = image.resize((150, 150), Image.Resampling.LANCZOS)
                 
-                # Converter imagem para base64
+                # Guardar a imagem em PNG; ao salvar ela vai para o AssetStore
                 buffered = io.BytesIO()
                 image.save(buffered, format="PNG")
-                self.photo_data = base64.b64encode(buffered.getvalue()).decode()
+                self.photo = buffered.getvalue()
                 
                 # Atualizar canvas
                 photo = ImageTk.PhotoImage(image)
@@ -474,20 +735,23 @@ class FichaDnD:
         ttk.Label(frame, text="NV").grid(row=0, column=1, padx=5, pady=5)
         ttk.Label(frame, text="Main").grid(row=0, column=2, padx=5, pady=5)
 
-        classes = ["Classe Primária", "Classe Secundária", "Classe Terciária"]
+        classes = CLASS_LABELS
         self.class_vars = {}
         self.main_class_var = tk.StringVar(value=classes[0])  # Variável para classe principal
+        self.bind_to_sheet(self.main_class_var, 'main_class')
         self.class_level_vars = {}  # Dicionário para armazenar níveis
 
         for i, label in enumerate(classes):
             # Campo de entrada para o nome da classe
             var = tk.StringVar()
+            self.bind_to_sheet(var, 'classes', label, 'name')
             entry = ttk.Entry(frame, textvariable=var)
             entry.grid(row=i+1, column=0, padx=5, pady=5)
             self.class_vars[label] = var
 
             # Campo para nível da classe
             level_var = tk.StringVar(value="1")
+            self.bind_to_sheet(level_var, 'classes', label, 'level')
             ttk.Entry(frame, textvariable=level_var, width=5).grid(row=i+1, column=1, padx=5)
             self.class_level_vars[label] = level_var
 
@@ -515,7 +779,7 @@ class FichaDnD:
         self.modifier_labels = {}
         self.save_vars = {}
         self.save_labels = {}
-        attributes = ["FOR", "DES", "CON", "INT", "SAB", "CAR"]
+        attributes = ATTRIBUTES
 
         # Frame para atributos
         attr_frame = ttk.LabelFrame(left_frame, text="Valores Base")
@@ -524,7 +788,7 @@ class FichaDnD:
         for i, attr in enumerate(attributes):
             ttk.Label(attr_frame, text=attr).grid(row=i, column=0, padx=5, pady=5)
             var = tk.StringVar()
-            var.trace('w', lambda *args, attr=attr: self.update_modifiers(attr))
+            self.bind_to_sheet(var, 'attributes', attr, 'value')
             entry = ttk.Entry(attr_frame, textvariable=var, width=5)
             entry.grid(row=i, column=1, padx=5, pady=5)
             self.attribute_vars[attr] = var
@@ -546,7 +810,7 @@ class FichaDnD:
         for i, attr in enumerate(attributes):
             # Checkbox para proficiência em save
             save_var = tk.BooleanVar()
-            save_var.trace('w', lambda *args, attr=attr: self.update_saves(attr))
+            self.bind_to_sheet(save_var, 'attributes', attr, 'save_proficiency')
             save_check = ttk.Checkbutton(save_frame, variable=save_var)
             save_check.grid(row=i+1, column=0, padx=5, pady=2)
             self.save_vars[attr] = save_var
@@ -571,6 +835,13 @@ class FichaDnD:
         notes_scroll = ttk.Scrollbar(notes_frame, orient="vertical", command=self.attr_notes.yview)
         notes_scroll.pack(side="right", fill="y")
         self.attr_notes.configure(yscrollcommand=notes_scroll.set)
+        self.attr_notes.bind('<<Modified>>', self.on_attr_notes_modified)
+
+    def on_attr_notes_modified(self, event=None):
+        """Copia as anotações de atributos para o modelo ao serem editadas"""
+        if self.attr_notes.edit_modified():
+            self.sheet.set(('attribute_notes',), self.attr_notes.get('1.0', tk.END).strip())
+            self.attr_notes.edit_modified(False)
 
     def create_proficiencies_section(self):
         frame = ttk.LabelFrame(self.scrollable_frame, text="Proficiências")
@@ -583,16 +854,8 @@ class FichaDnD:
 
         # Perícias
         self.skill_vars = {}
-        skills = {
-            "Acrobacia": "DES", "Arcanismo": "INT", "Atletismo": "FOR",
-            "Atuação": "CAR", "Enganação": "CAR", "Furtividade": "DES",
-            "História": "INT", "Intimidação": "CAR", "Intuição": "SAB",
-            "Investigação": "INT", "Lidar com Animais": "SAB", "Medicina": "SAB",
-            "Natureza": "INT", "Percepção": "SAB", "Persuasão": "CAR",
-            "Prestidigitação": "DES", "Religião": "INT", "Sobrevivência": "SAB"
-        }
 
-        for i, (skill, attr) in enumerate(skills.items(), start=1):
+        for i, (skill, attr) in enumerate(SKILLS.items(), start=1):
             # Frame para cada perícia
             skill_frame = ttk.Frame(frame)
             skill_frame.grid(row=i, column=0, columnspan=3, sticky="w", padx=5)
@@ -604,11 +867,13 @@ class FichaDnD:
             # Checkboxes
             prof1_var = tk.BooleanVar()
             prof2_var = tk.BooleanVar()
+            self.bind_to_sheet(prof1_var, 'skills', skill, 'prof1')
+            self.bind_to_sheet(prof2_var, 'skills', skill, 'prof2')
             
-            cb1 = ttk.Checkbutton(check_frame, variable=prof1_var, command=lambda s=skill: self.update_skills_total(s))
+            cb1 = ttk.Checkbutton(check_frame, variable=prof1_var)
             cb1.pack(side="left", padx=2)
             
-            cb2 = ttk.Checkbutton(check_frame, variable=prof2_var, command=lambda s=skill: self.update_skills_total(s))
+            cb2 = ttk.Checkbutton(check_frame, variable=prof2_var)
             cb2.pack(side="left", padx=2)
             
             # Label com nome da perícia
@@ -617,7 +882,7 @@ class FichaDnD:
             
             # Entry para bônus extra
             bonus_var = tk.StringVar(value="0")
-            bonus_var.trace('w', lambda *args, s=skill: self.update_skills_total(s))
+            self.bind_to_sheet(bonus_var, 'skills', skill, 'bonus')
             bonus_entry = ttk.Entry(skill_frame, textvariable=bonus_var, width=3)
             bonus_entry.pack(side="left", padx=5)
             
@@ -634,49 +899,6 @@ class FichaDnD:
                 "label": total_label
             }
 
-    def update_skills_total(self, skill):
-        data = self.skill_vars[skill]
-        modifier = self.get_modifier(data["attr"])
-        prof_bonus = self.get_proficiency_bonus()
-        
-        # Calcula bônus de proficiência
-        total = modifier
-        if data["prof1"].get():
-            total += prof_bonus
-        if data["prof2"].get():
-            total += prof_bonus
-            
-        # Adiciona bônus extra
-        try:
-            bonus = int(data["bonus"].get() or 0)
-            total += bonus
-        except ValueError:
-            pass  # Ignora valores inválidos no bônus
-        
-        # Atualiza label
-        data["label"].config(text=f"{'+' if total >= 0 else ''}{total}")
-
-    def update_skills(self):
-        """Atualiza todas as perícias"""
-        prof_bonus = self.get_proficiency_bonus()
-        
-        for skill, data in self.skill_vars.items():
-            modifier = self.get_modifier(data["attr"])
-            total = modifier
-            
-            if data["prof1"].get():
-                total += prof_bonus
-            if data["prof2"].get():
-                total += prof_bonus
-                
-            try:
-                bonus = int(data["bonus"].get() or 0)
-                total += bonus
-            except ValueError:
-                pass
-            
-            data["label"].config(text=f"{'+' if total >= 0 else ''}{total}")
-
     def create_combat_section(self):
         frame = ttk.LabelFrame(self.scrollable_frame, text="Combate")
         frame.grid(row=0, column=2, padx=10, pady=10, sticky="nsew")
@@ -689,7 +911,7 @@ class FichaDnD:
         # Atributo para CA
         self.ac_attr_var = tk.StringVar(value="DES")
         ttk.Combobox(frame, textvariable=self.ac_attr_var, 
-                     values=["FOR", "DES", "CON", "INT", "SAB", "CAR"],
+                     values=ATTRIBUTES,
                      width=5).grid(row=0, column=2, padx=5)
         
         # Bônus adicional de CA
@@ -741,12 +963,12 @@ class FichaDnD:
         self.cd_bonus_frame = ttk.Frame(cd_frame)
         self.cd_bonus_frame.grid(row=4, column=0, columnspan=4, sticky="ew")
 
-        # Configurar traces para atualização automática
-        self.base_ac_var.trace('w', self.update_ac)
-        self.ac_attr_var.trace('w', self.update_ac)
-        self.ac_bonus_var.trace('w', self.update_ac)
-        self.spell_attr_var.trace('w', self.update_spell_dc)
-        self.cd_bonus_var.trace('w', self.update_spell_dc)
+        # Ligar os campos ao modelo para atualização automática
+        self.bind_to_sheet(self.base_ac_var, 'armor_class', 'base')
+        self.bind_to_sheet(self.ac_attr_var, 'armor_class', 'attr')
+        self.bind_to_sheet(self.ac_bonus_var, 'armor_class', 'bonus')
+        self.bind_to_sheet(self.spell_attr_var, 'spell_dc', 'attr')
+        self.bind_to_sheet(self.cd_bonus_var, 'spell_dc', 'bonus')
 
         # Adicionar label para Percepç����������o Passiva
         ttk.Label(frame, text="Percepção Passiva:").grid(row=4, column=0, padx=5, pady=5)
@@ -756,18 +978,22 @@ class FichaDnD:
         # Adicionar campo de taxa de movimento
         ttk.Label(frame, text="Taxa de Movimento:").grid(row=5, column=0, padx=5, pady=5)
         self.speed_var = tk.StringVar(value="30")
+        self.bind_to_sheet(self.speed_var, 'combat', 'speed')
         ttk.Entry(frame, textvariable=self.speed_var, width=5).grid(row=5, column=1, padx=5)
 
         # Adicionar campo de iniciativa
         ttk.Label(frame, text="Iniciativa:").grid(row=6, column=0, padx=5, pady=5)
         self.initiative_var = tk.StringVar(value="0")
+        self.bind_to_sheet(self.initiative_var, 'combat', 'initiative')
         ttk.Entry(frame, textvariable=self.initiative_var, width=5).grid(row=6, column=1, padx=5)
 
-        # Atualizar percepção passiva
-        self.update_passive_perception()
-
     def add_cd_bonus(self, desc='', value='0'):
         """Adiciona um novo bônus à CD"""
+        self._add_cd_bonus_row(desc, value)
+        self.sheet.insert(('spell_dc', 'bonus_list'), None, {'desc': desc, 'value': value})
+
+    def _add_cd_bonus_row(self, desc='', value='0'):
+        """Cria na interface a linha de um bônus da CD, já ligada ao modelo"""
         bonus_frame = ttk.Frame(self.cd_bonus_frame)
         bonus_frame.pack(fill="x", pady=2)
         
@@ -782,9 +1008,6 @@ class FichaDnD:
         entry = ttk.Entry(bonus_frame, textvariable=value_var, width=5)
         entry.pack(side="left", padx=2)
         
-        # Configurar trace para atualização automática
-        value_var.trace('w', self.update_spell_dc)
-        
         # Botão remover
         remove_btn = ttk.Button(bonus_frame, text="X", width=2,
                                command=lambda: self.remove_cd_bonus(bonus_frame))
@@ -798,42 +1021,25 @@ class FichaDnD:
         }
         self.cd_bonus_list.append(bonus_data)
         
-        # Atualizar CD total
-        self.update_spell_dc()
+        # Ligar a linha ao modelo (o que também atualiza a CD total)
+        self.bind_row_to_sheet(desc_var, self.cd_bonus_list, bonus_data, ('spell_dc', 'bonus_list'), 'desc')
+        self.bind_row_to_sheet(value_var, self.cd_bonus_list, bonus_data, ('spell_dc', 'bonus_list'), 'value')
+        return bonus_data
 
     def remove_cd_bonus(self, frame):
         """Remove um bônus da CD"""
-        self.cd_bonus_list = [b for b in self.cd_bonus_list if b['frame'] != frame]
+        index = next(i for i, b in enumerate(self.cd_bonus_list) if b['frame'] == frame)
+        del self.cd_bonus_list[index]
         frame.destroy()
-        self.update_spell_dc()
-
-    def update_spell_dc(self, *args):
-        """Atualiza o valor total da CD de magias na interface"""
-        try:
-            base = 8
-            prof_bonus = self.get_proficiency_bonus()
-            attr_mod = self.get_modifier(self.spell_attr_var.get())
-            
-            # Bônus adicional padrão
-            try:
-                bonus = int(self.cd_bonus_var.get() or 0)
-            except ValueError:
-                bonus = 0
-                
-            # Somar bônus extras
-            for bonus_data in self.cd_bonus_list:
-                try:
-                    bonus += int(bonus_data['value'].get() or 0)
-                except ValueError:
-                    continue
-            
-            total_cd = base + prof_bonus + attr_mod + bonus
-            self.cd_label.config(text=f"CD: {total_cd}")
-        except:
-            self.cd_label.config(text="CD: 8")
+        self.sheet.remove(('spell_dc', 'bonus_list'), index)
 
     def add_ac_bonus(self, desc='', value='0'):
         """Adiciona um novo bônus à CA"""
+        self._add_ac_bonus_row(desc, value)
+        self.sheet.insert(('armor_class', 'bonus_list'), None, {'desc': desc, 'value': value})
+
+    def _add_ac_bonus_row(self, desc='', value='0'):
+        """Cria na interface a linha de um bônus da CA, já ligada ao modelo"""
         bonus_frame = ttk.Frame(self.ac_bonus_frame)
         bonus_frame.pack(fill="x", pady=2)
         
@@ -845,9 +1051,6 @@ class FichaDnD:
         entry = ttk.Entry(bonus_frame, textvariable=value_var, width=5)
         entry.pack(side="left", padx=2)
         
-        # Configurar trace para atualização automática
-        value_var.trace('w', self.update_ac)
-        
         remove_btn = ttk.Button(bonus_frame, text="X", width=2,
                                command=lambda: self.remove_ac_bonus(bonus_frame))
         remove_btn.pack(side="left", padx=2)
@@ -859,38 +1062,17 @@ class FichaDnD:
         }
         self.ac_bonus_list.append(bonus_data)
         
-        # Atualizar CA total
-        self.update_ac()
+        # Ligar a linha ao modelo (o que também atualiza a CA total)
+        self.bind_row_to_sheet(desc_var, self.ac_bonus_list, bonus_data, ('armor_class', 'bonus_list'), 'desc')
+        self.bind_row_to_sheet(value_var, self.ac_bonus_list, bonus_data, ('armor_class', 'bonus_list'), 'value')
+        return bonus_data
 
     def remove_ac_bonus(self, frame):
         """Remove um bônus da CA"""
-        self.ac_bonus_list = [b for b in self.ac_bonus_list if b['frame'] != frame]
+        index = next(i for i, b in enumerate(self.ac_bonus_list) if b['frame'] == frame)
+        del self.ac_bonus_list[index]
         frame.destroy()
-        self.update_ac()
-
-    def update_ac(self, *args):
-        """Atualiza o valor total da CA"""
-        try:
-            base = int(self.base_ac_var.get() or 10)
-            attr_mod = self.get_modifier(self.ac_attr_var.get())
-            
-            # Bônus adicional padrão
-            try:
-                bonus = int(self.ac_bonus_var.get() or 0)
-            except ValueError:
-                bonus = 0
-                
-            # Somar bônus extras
-            for bonus_data in self.ac_bonus_list:
-                try:
-                    bonus += int(bonus_data['value'].get() or 0)
-                except ValueError:
-                    continue
-            
-            total = base + attr_mod + bonus
-            self.ac_label.config(text=f"CA Total: {total}")
-        except:
-            self.ac_label.config(text="CA Total: 10")
+        self.sheet.remove(('armor_class', 'bonus_list'), index)
 
     def create_health_section(self):
         frame = ttk.LabelFrame(self.scrollable_frame, text="Recursos")
@@ -900,7 +1082,7 @@ class FichaDnD:
         default_frame = ttk.Frame(frame)
         default_frame.pack(fill="x", padx=5, pady=5)
 
-        resources = ["Vida", "Mana", "Estamina"]
+        resources = RESOURCES
         self.resources_vars = {}
         self.resources_max_vars = {}
 
@@ -909,6 +1091,7 @@ class FichaDnD:
             
             # Valor atual
             var_atual = tk.StringVar()
+            self.bind_to_sheet(var_atual, 'resources', resource, 'atual')
             entry_atual = ttk.Entry(default_frame, textvariable=var_atual, width=5)
             entry_atual.grid(row=i, column=1, padx=5, pady=5)
             self.resources_vars[resource] = var_atual
@@ -917,6 +1100,7 @@ class FichaDnD:
             
             # Valor máximo
             var_max = tk.StringVar()
+            self.bind_to_sheet(var_max, 'resources', resource, 'max')
             entry_max = ttk.Entry(default_frame, textvariable=var_max, width=5)
             entry_max.grid(row=i, column=3, padx=5, pady=5)
             self.resources_max_vars[resource] = var_max
@@ -940,6 +1124,10 @@ class FichaDnD:
         self.custom_resources_frame.pack(fill="x", padx=5, pady=5)
 
     def add_custom_resource(self):
+        self._add_custom_resource_row()
+        self.sheet.insert(('custom_resources',), None, {'name': '', 'atual': '', 'max': ''})
+
+    def _add_custom_resource_row(self):
         # Criar novo frame para o recurso
         resource_frame = ttk.Frame(self.custom_resources_frame)
         resource_frame.pack(fill="x", pady=2)
@@ -968,18 +1156,26 @@ class FichaDnD:
         remove_btn.pack(side="left", padx=2)
 
         # Adicionar à lista de recursos
-        self.custom_resources.append({
+        resource = {
             'frame': resource_frame,
             'name': name_var,
             'atual': atual_var,
             'max': max_var
-        })
+        }
+        self.custom_resources.append(resource)
+
+        # Ligar o recurso ao modelo
+        for key in ('name', 'atual', 'max'):
+            self.bind_row_to_sheet(resource[key], self.custom_resources, resource, ('custom_resources',), key)
+        return resource
 
     def remove_custom_resource(self, frame):
         # Remover da lista
-        self.custom_resources = [r for r in self.custom_resources if r['frame'] != frame]
+        index = next(i for i, r in enumerate(self.custom_resources) if r['frame'] == frame)
+        del self.custom_resources[index]
         # Destruir frame
         frame.destroy()
+        self.sheet.remove(('custom_resources',), index)
 
     def create_control_buttons(self):
         frame = ttk.Frame(self.scrollable_frame)
@@ -994,287 +1190,490 @@ class FichaDnD:
         ttk.Button(frame, text="Grimório", command=self.open_grimoire_screen).grid(row=0, column=5, padx=5, pady=5)
 
     def open_spells_screen(self):
-        SpellScreen(self)
+        self.open_screens.append(SpellScreen(self))
 
     def open_abilities_screen(self):
-        AbilityScreen(self)
+        self.open_screens.append(AbilityScreen(self))
 
     def open_inventory_screen(self):
         """Abre a tela de inventário sem confirmação"""
-        InventoryScreen(self)
+        self.open_screens.append(InventoryScreen(self))
 
     def open_features_screen(self):
-        FeatureScreen(self)
+        self.open_screens.append(FeatureScreen(self))
 
     def open_affinity_screen(self):
-        AffinityScreen(self)
+        self.open_screens.append(AffinityScreen(self))
 
     def open_grimoire_screen(self):
         GrimoireScreen(self)
 
+    def undo(self, event=None):
+        """Desfaz a última alteração da ficha (Ctrl+Z)"""
+        self.refresh_from_sheet(self.history.undo())
+
+    def redo(self, event=None):
+        """Refaz a última alteração desfeita (Ctrl+Y)"""
+        self.refresh_from_sheet(self.history.redo())
+
+    def refresh_from_sheet(self, changes):
+        """Mostra na interface os valores do modelo alterados por desfazer/refazer.
+
+        As variáveis recebem o valor que o modelo já tem, então os traces
+        não geram novas alterações.
+        """
+        paths = {change.path for change in changes}
+        if not paths:
+            return
+
+        def touched(path):
+            return any(path[:len(other)] == other or other[:len(path)] == path
+                       for other in paths)
+
+        for path, var in self._sheet_vars.items():
+            if touched(path):
+                try:
+                    var.set(self.sheet.get(path))
+                except LookupError:
+                    pass
+
+        # Linhas dinâmicas: só são recriadas se o número de entradas mudou
+        row_lists = [
+            (('custom_resources',), self.custom_resources, self._add_custom_resource_row),
+            (('armor_class', 'bonus_list'), self.ac_bonus_list, self._add_ac_bonus_row),
+            (('spell_dc', 'bonus_list'), self.cd_bonus_list, self._add_cd_bonus_row),
+        ]
+        for path, rows, add_row in row_lists:
+            if not touched(path):
+                continue
+            entries = self.sheet.get(path)
+            while len(rows) > len(entries):
+                rows.pop()['frame'].destroy()
+            while len(rows) < len(entries):
+                add_row()
+            for row, entry in zip(rows, entries):
+                for key, value in entry.items():
+                    row[key].set(value)
+
+        sections = {path[0] for path in paths}
+        if 'attribute_notes' in sections:
+            self.attr_notes.delete('1.0', tk.END)
+            self.attr_notes.insert('1.0', self.sheet.attribute_notes)
+            self.attr_notes.edit_modified(False)
+        if 'photo' in sections:
+            if self.photo:
+                self.load_photo(self.photo)
+            else:
+                self.set_default_photo()
+
+        # Telas de listas abertas (magias, inventário, background...)
+        self.open_screens = [screen for screen in self.open_screens
+                             if screen.window.winfo_exists()]
+        for screen in self.open_screens:
+            if screen.section in sections:
+                screen.reload()
+
     def quick_save(self, event=None):
         """Salva rapidamente no arquivo atual ou abre diálogo se não houver arquivo"""
-        if hasattr(self, 'current_file_path') and self.current_file_path:
-            self.export_to_json(self.current_file_path)
+        if self.current_file_path:
+            self.schedule_save(self.quick_save_delay)
         else:
             self.export_to_json()
 
+    def has_unsaved_changes(self):
+        """Indica se alguma alteração da ficha ainda não está em disco.
+
+        Alterações registradas no diário já estão seguras, mesmo antes do
+        próximo snapshot.
+        """
+        generation = self.sheet.generation
+        if self.journal is not None or generation == self._saved_generation:
+            return False
+        return not (self.campaign_character and generation == self._campaign_generation)
+
+    def confirm_discard(self, message):
+        """Pede confirmação só se houver alterações não salvas"""
+        return not self.has_unsaved_changes() or self.simple_confirm_action(message)
+
     def export_to_json(self, file_path=None):
-        """Exporta os dados para um arquivo JSON"""
+        """Exporta os dados para um arquivo JSON (ou no formato binário .ficha)"""
         if not file_path:
             file_path = filedialog.asksaveasfilename(
                 defaultextension=".json",
-                filetypes=[("JSON Files", "*.json")],
+                filetypes=SHEET_FILETYPES,
                 initialfile="ficha_dnd.json"
             )
         
         if file_path:
-            try:
-                # Preparar dados para salvar
-                data = {
-                    'version': '1.2',
-                    'filename': os.path.basename(file_path),
-                    'photo_data': self.photo_data,  # Armazenar a imagem como base64
-                    'basic_info': {key: var.get() for key, var in self.basic_info_vars.items()},
-                    'classes': {key: {'name': var.get(), 'level': self.class_level_vars[key].get()} for key, var in self.class_vars.items()},
-                    'attributes': {
-                        attr: {
-                            'value': var.get(),
-                            'modifier': self.modifier_labels[attr].cget('text'),
-                            'save_proficiency': self.save_vars[attr].get(),
-                            'save_total': self.save_labels[attr].cget('text')
-                        } for attr, var in self.attribute_vars.items()
-                    },
-                    'attribute_notes': self.attr_notes.get('1.0', tk.END).strip(),
-                    'skills': {
-                        skill: {
-                            'prof1': data['prof1'].get(),
-                            'prof2': data['prof2'].get(),
-                            'bonus': data['bonus'].get(),
-                            'total': data['label'].cget('text')
-                        } for skill, data in self.skill_vars.items()
-                    },
-                    'resources': {
-                        resource: {
-                            'atual': self.resources_vars[resource].get(),
-                            'max': self.resources_max_vars[resource].get()
-                        } for resource in self.resources_vars.keys()
-                    },
-                    'custom_resources': [
-                        {
-                            'name': resource['name'].get(),
-                            'atual': resource['atual'].get(),
-                            'max': resource['max'].get()
-                        } for resource in self.custom_resources
-                    ],
-                    'spells': self.spells_data,
-                    'abilities': self.abilities_data,
-                    'features': self.features_data,
-                    'inventory': self.inventory_data,
-                    'background': self.background_data,
-                    
-                    # Adicionar dados da CA
-                    'armor_class': {
-                        'base': self.base_ac_var.get(),
-                        'attr': self.ac_attr_var.get(),
-                        'bonus': self.ac_bonus_var.get(),
-                        'bonus_list': [
-                            {
-                                'desc': bonus['desc'].get(),
-                                'value': bonus['value'].get()
-                            }
-                            for bonus in self.ac_bonus_list
-                        ]
-                    },
-                    'combat': {
-                        'initiative': self.initiative_var.get(),
-                        'speed': self.speed_var.get(),
-                        'hit_points': self.hit_points_var.get(),
-                        'temp_hit_points': self.temp_hit_points_var.get(),
-                        # Adicione outros dados de combate conforme necessário
-                    },
-                    'spell_dc': {
-                        'attr': self.spell_attr_var.get(),
-                        'bonus': self.cd_bonus_var.get(),
-                        'bonus_list': [
-                            {
-                                'desc': bonus['desc'].get(),
-                                'value': bonus['value'].get()
-                            }
-                            for bonus in self.cd_bonus_list
-                        ]
-                    },
-                }
-
-                # Salvar JSON
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    json.dump(data, file, ensure_ascii=False, indent=4)
-                
-                # Atualizar caminho do arquivo atual
-                self.current_file_path = file_path
-                # Atualizar título da janela
-                self.root.title(f"Ficha de D&D 5.5E - {os.path.basename(file_path)}")
-                
-                messagebox.showinfo("Sucesso", "Ficha salva com sucesso!")
-            except Exception as e:
-                messagebox.showerror("Erro", f"Erro ao salvar a ficha: {str(e)}")
+            # Atualizar caminho do arquivo atual
+            self.detach_journal()
+            self.set_current_file(file_path)
+            if self.journal_mode:
+                self.journal = ChangeJournal.start(file_path)
+            self.save_snapshot(force=True)
+
+    def set_current_file(self, file_path):
+        """Define o arquivo usado por Ctrl+S e pelo autosave"""
+        self.current_file_path = file_path
+        if file_path:
+            self.root.title(f"Ficha de D&D 5.5E - {os.path.basename(file_path)}")
+            self.save_last_file_path(file_path)
+            self.recent_sheets.add(file_path, {'basic_info': self.sheet.basic_info,
+                                               'main_class': self.sheet.main_class})
+        else:
+            self.root.title("Ficha de D&D 5.5E")
+
+    def update_recent_menu(self):
+        """Refaz o submenu Fichas Recentes"""
+        self.recent_menu.delete(0, tk.END)
+        entries = self.recent_sheets.entries()
+        for entry in entries:
+            label = entry['name'] or os.path.basename(entry['path'])
+            details = ", ".join(part for part in (entry['main_class'],
+                                                  entry['level'] and f"nível {entry['level']}") if part)
+            if details:
+                label += f" ({details})"
+            self.recent_menu.add_command(
+                label=f"{label} - {os.path.basename(entry['path'])}",
+                command=partial(self.import_from_json, entry['path']))
+        if not entries:
+            self.recent_menu.add_command(label="Nenhuma ficha recente", state="disabled")
+
+    def start_preload(self):
+        """Começa a ler a última ficha aberta em outra thread"""
+        file_path = self.get_last_file_path()
+        if not file_path or not os.path.exists(file_path):
+            return
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preload')
+        self._preload = (file_path, executor.submit(read_sheet_file, file_path), time.perf_counter())
+        executor.shutdown(wait=False)
+
+    def poll_preload(self):
+        """Mostra a ficha lida em segundo plano quando a leitura terminar"""
+        file_path, future, start = self._preload
+        if not future.done():
+            self.root.after(50, self.poll_preload)
+            return
+        self._preload = None
+        # O usuário já abriu outra ficha ou começou a editar a ficha em branco
+        if self.current_file_path or self.campaign_character or self.has_unsaved_changes():
+            return
+        name = os.path.basename(file_path)
+        try:
+            sheet, image = future.result()
+            recovered = self.open_sheet_file(file_path, sheet, image)
+        except Exception as e:
+            traceback.print_exc()
+            self.save_status_var.set(f"Não foi possível abrir {name}: {e}")
+            return
+        if not recovered:
+            self.save_status_var.set(f"{name} aberta em {time.perf_counter() - start:.2f}s")
+
+    def open_sheet_file(self, file_path, sheet, image=None):
+        """Mostra uma ficha lida de file_path e passa a gravá-la nesse arquivo.
+
+        Retorna o número de alterações recuperadas do diário.
+        """
+        # Alterações do diário que não chegaram a um snapshot (o programa
+        # foi fechado antes) são reaplicadas
+        journal, recovered = None, 0
+        if self.journal_mode:
+            journal, recovered = ChangeJournal.recover(file_path, sheet)
+
+        self.load_sheet(sheet, image)
+        self.set_current_file(file_path)
+        self.campaign_character = None
+        self.journal = journal
+        if recovered:
+            # O arquivo ainda não contém as alterações recuperadas
+            self._saved_generation = None
+            self.save_status_var.set(
+                f"{recovered} alteração(ões) recuperada(s) do diário de "
+                f"{os.path.basename(file_path)}")
+            self.schedule_save(self.autosave_delay)
+        return recovered
+
+    def create_status_bar(self):
+        """Cria a barra inferior que mostra o estado da gravação"""
+        self.save_status_var = tk.StringVar()
+        status_bar = ttk.Label(self.root, textvariable=self.save_status_var, anchor="w",
+                               relief="sunken", padding=(5, 1))
+        status_bar.pack(side="bottom", fill="x")
+
+    def schedule_save(self, delay):
+        """Agenda a gravação do arquivo atual; novos pedidos reiniciam a espera"""
+        self.cancel_scheduled_save()
+        self._save_timer = self.root.after(delay, self.save_snapshot)
+
+    def cancel_scheduled_save(self):
+        if self._save_timer is not None:
+            self.root.after_cancel(self._save_timer)
+            self._save_timer = None
+
+    def save_snapshot(self, force=False):
+        """Copia o modelo na thread da interface e grava o JSON em segundo plano.
+
+        Sem force, nada é gravado se a ficha não mudou desde a última
+        gravação (concluída ou em andamento).
+        """
+        self._save_timer = None
+        file_path = self.current_file_path
+        if not file_path:
+            return
+        generation = self.sheet.generation
+        if not force and generation in (self._saved_generation, self._submitted_generation):
+            if self.autosave.idle:
+                self.save_status_var.set(f"{os.path.basename(file_path)}: nenhuma alteração a salvar")
+            return
+        try:
+            data = self.sheet.to_dict(filename=os.path.basename(file_path), inline_photo=False,
+                                      keep_deferred=True)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao salvar a ficha: {str(e)}")
+            return
+        # O retrato é gravado à parte, uma única vez por conteúdo
+        assets = {data['photo_ref']: self.photo} if self.photo else None
+        on_saved = partial(self._snapshot_saved, generation, self.journal,
+                           self.journal.seq if self.journal else 0)
+        self._submitted_generation = generation
+        self.autosave.submit(file_path, data, assets, on_saved)
+        self.save_status_var.set(f"Salvando {os.path.basename(file_path)}...")
+        if self._save_poll is None:
+            self._save_poll = self.root.after(100, self.poll_saves)
+
+    def _snapshot_saved(self, generation, journal, seq):
+        # Chamado na thread de gravação, com o snapshot já no disco: o
+        # diário descarta o que o snapshot contém
+        if journal is not None:
+            journal.rebase(seq)
+        if self._saved_generation is None or generation > self._saved_generation:
+            self._saved_generation = generation
+
+    def detach_journal(self):
+        """Para de registrar as alterações no diário do arquivo atual.
+
+        Alterações pendentes são gravadas em um snapshot do arquivo antes da
+        troca de ficha, e o diário é apagado.
+        """
+        if self.journal is None:
+            return
+        if self.journal.pending:
+            self.save_snapshot()
+        self.journal.close()
+        self.journal = None
+
+    def poll_saves(self):
+        """Mostra na barra de status os resultados da thread de gravação"""
+        self._save_poll = None
+        while not self.autosave.results.empty():
+            result = self.autosave.results.get_nowait()
+            name = os.path.basename(result.path)
+            if result.error is None:
+                self._save_failed = False
+                self.save_status_var.set(
+                    f"{name} salvo às {time.strftime('%H:%M:%S')} ({result.elapsed:.2f}s)")
+            else:
+                # A mesma geração pode ser enviada de novo
+                self._submitted_generation = None
+                self.save_status_var.set(f"Erro ao salvar {name}: {result.error}")
+                # Avisar uma vez; as tentativas seguintes só atualizam a barra
+                if not self._save_failed:
+                    self._save_failed = True
+                    messagebox.showerror("Erro", f"Erro ao salvar a ficha: {result.error}")
+        if not self.autosave.idle or not self.autosave.results.empty():
+            self._save_poll = self.root.after(100, self.poll_saves)
 
     def import_from_json(self, file_path=None):
         """Importa os dados de um arquivo JSON"""
         if not file_path:
             file_path = filedialog.askopenfilename(
-                filetypes=[("JSON Files", "*.json")],
+                filetypes=SHEET_FILETYPES,
                 title="Importar de JSON"
             )
         
         if file_path:
             # Usar a nova função de confirmação simples
-            if not self.simple_confirm_action("Deseja importar? As alterações não salvas serão perdidas."):
+            if not self.confirm_discard("Deseja importar? As alterações não salvas serão perdidas."):
                 return
             try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                
-                # Corrigir possíveis problemas de codificação
-                classes_data = data.get('classes', {})
-                for class_label, class_info in zip(
-                    ["Classe Primária", "Classe Secundária", "Classe Terciária"],
-                    classes_data.values()
-                ):
-                    if isinstance(class_info, dict):
-                        self.class_vars[class_label].set(class_info.get('name', ''))
-                        self.class_level_vars[class_label].set(class_info.get('level', '1'))
-                
-                # Atualizar dados da interface
-                self.photo_data = data.get('photo_data', None)
-                if self.photo_data:
-                    self.load_photo(self.photo_data)
-                
-                basic_info = data.get('basic_info', {})
-                if isinstance(basic_info, dict):
-                    self.basic_info_vars['Nome'].set(basic_info.get('Nome', ''))
-                    self.basic_info_vars['Raça'].set(basic_info.get('Raça', ''))
-                    self.basic_info_vars['Antecedente'].set(basic_info.get('Antecedente', ''))
-                    self.basic_info_vars['Nível'].set(basic_info.get('Nível', ''))
-                
-                classes_data = data.get('classes', {})
-                for class_label, class_info in zip(
-                    ["Classe Primária", "Classe Secundária", "Classe Terciária"],
-                    classes_data.values()
-                ):
-                    if isinstance(class_info, dict):
-                        self.class_vars[class_label].set(class_info.get('name', ''))
-                        self.class_level_vars[class_label].set(class_info.get('level', '1'))
-                
-                # Definir classe principal na interface
-                main_class = data.get('main_class', 'Classe Primária')
-                self.main_class_var.set(main_class)
+                # A ficha atual termina de ser gravada antes da leitura
+                self.detach_journal()
+                self.autosave.flush()
 
-                # Atualizar o restante da interface conforme necessário
-                self.update_main_class_level()  # Atualiza o nível básico baseado na classe principal
-                
-                # Atualizar atributos
-                attributes = data.get('attributes', {})
-                if isinstance(attributes, dict):
-                    for attr, attr_data in attributes.items():
-                        if isinstance(attr_data, dict):
-                            self.attribute_vars[attr].set(attr_data.get('value', ''))
-                            self.save_vars[attr].set(attr_data.get('save_proficiency', False))
-                
-                # Atualizar notas de atributos
-                self.attr_notes.delete('1.0', tk.END)
-                self.attr_notes.insert('1.0', data.get('attribute_notes', ''))
-                
-                # Atualizar perícias
-                skills = data.get('skills', {})
-                if isinstance(skills, dict):
-                    for skill, skill_data in skills.items():
-                        if isinstance(skill_data, dict):
-                            self.skill_vars[skill]['prof1'].set(skill_data.get('prof1', False))
-                            self.skill_vars[skill]['prof2'].set(skill_data.get('prof2', False))
-                            self.skill_vars[skill]['bonus'].set(skill_data.get('bonus', '0'))
-                
-                # Atualizar recursos
-                resources = data.get('resources', {})
-                if isinstance(resources, dict):
-                    for resource, values in resources.items():
-                        if isinstance(values, dict):
-                            self.resources_vars[resource].set(values.get('atual', ''))
-                            self.resources_max_vars[resource].set(values.get('max', ''))
-                
-                # Atualizar CA
-                ac_data = data.get('armor_class', {})
-                if isinstance(ac_data, dict):
-                    self.base_ac_var.set(ac_data.get('base', '10'))
-                    self.ac_attr_var.set(ac_data.get('attr', 'DES'))
-                    self.ac_bonus_var.set(ac_data.get('bonus', '0'))
-                    # Limpar bônus existentes
-                    for bonus in self.ac_bonus_list:
-                        bonus['frame'].destroy()
-                    self.ac_bonus_list.clear()
-                    # Recriar lista de bônus
-                    for bonus_data in ac_data.get('bonus_list', []):
-                        self.add_ac_bonus(bonus_data['desc'], bonus_data['value'])
-                
-                # Atualizar CD de Magias
-                cd_data = data.get('spell_dc', {})
-                if isinstance(cd_data, dict):
-                    self.spell_attr_var.set(cd_data.get('attr', 'INT'))
-                    self.cd_bonus_var.set(cd_data.get('bonus', '0'))
-                    # Limpar bônus existentes
-                    for bonus in self.cd_bonus_list:
-                        bonus['frame'].destroy()
-                    self.cd_bonus_list.clear()
-                    # Recriar lista de bônus
-                    for bonus_data in cd_data.get('bonus_list', []):
-                        self.add_cd_bonus(bonus_data['desc'], bonus_data['value'])
-                
-                # Atualizar informações de combate
-                combat_info = data.get('combat', {})
-                if isinstance(combat_info, dict):
-                    self.initiative_var.set(combat_info.get('initiative', ''))
-                    self.speed_var.set(combat_info.get('speed', ''))
-                    self.hit_points_var.set(combat_info.get('hit_points', '0'))  # Define pontos de vida como '0' se não estiver presente
-                    self.temp_hit_points_var.set(combat_info.get('temp_hit_points', '0'))  # Define pontos de vida temporários como '0' se não estiver presente
-                
-                # Atualizar dados de magias, talentos, habilidades e inventário
-                self.spells_data = data.get('spells', [])
-                self.abilities_data = data.get('abilities', [])
-                self.features_data = data.get('features', [])
-                self.inventory_data = data.get('inventory', [])
-                
-                # Atualizar dados de background
-                self.background_data = data.get('background', {})
-                if isinstance(self.background_data, dict):
-                    # Atualizar informações de identidade
-                    for key, value in self.background_data.get('identity', {}).items():
-                        if key in self.identity_vars:
-                            self.identity_vars[key].set(value)
-                    
-                    # Atualizar textos
-                    for key, text in self.background_data.get('texts', {}).items():
-                        if key in self.text_widgets:
-                            self.text_widgets[key].delete("1.0", tk.END)
-                            self.text_widgets[key].insert("1.0", text)
-                    
-                    # Atualizar alinhamento
-                    alignment = self.background_data.get('alignment', {})
-                    self.moral_var.set(alignment.get('moral', ''))
-                    self.order_var.set(alignment.get('order', ''))
-
-                self.update_classes_interface()
-                self.update_all()
+                sheet, image = read_sheet_file(file_path)
+                self.open_sheet_file(file_path, sheet, image)
                 messagebox.showinfo("Sucesso", "Dados importados com sucesso!")
             
             except Exception as e:
                 traceback.print_exc()  # Imprime o rastreamento completo do erro no console
                 messagebox.showerror("Erro", f"Erro ao importar JSON: {str(e)}")
 
-    def load_photo(self, photo_data):
-        """Carrega a foto do personagem a partir de dados base64"""
+    def export_to_campaign(self):
+        """Grava a ficha em um banco SQLite de campanha.
+
+        Uma ficha que veio do mesmo banco substitui o personagem original;
+        as demais viram um personagem novo.
+        """
+        db_path = filedialog.asksaveasfilename(
+            defaultextension=".db",
+            filetypes=CAMPAIGN_FILETYPES,
+            initialfile="campanha.db",
+            confirmoverwrite=False
+        )
+        if not db_path:
+            return
+        character_id = None
+        if self.campaign_character:
+            linked_path, linked_id = self.campaign_character
+            if os.path.abspath(linked_path) == os.path.abspath(db_path):
+                character_id = linked_id
+        try:
+            data = self.sheet.to_dict(inline_photo=False)
+            assets = {data['photo_ref']: self.photo} if self.photo else None
+            with CampaignStore(db_path) as store:
+                character_id = store.save_sheet(data, assets, character_id)
+        except Exception as e:
+            traceback.print_exc()
+            messagebox.showerror("Erro", f"Erro ao exportar para a campanha: {str(e)}")
+            return
+        self.campaign_character = (db_path, character_id)
+        self._campaign_generation = self.sheet.generation
+        self.save_status_var.set(
+            f"Personagem {character_id} salvo em {os.path.basename(db_path)} "
+            f"às {time.strftime('%H:%M:%S')}")
+
+    def import_from_campaign(self):
+        """Escolhe um personagem de um banco SQLite de campanha e o carrega"""
+        db_path = filedialog.askopenfilename(
+            filetypes=CAMPAIGN_FILETYPES,
+            title="Importar de Campanha"
+        )
+        if db_path:
+            CampaignPicker(self, db_path)
+
+    def load_campaign_character(self, db_path, character_id):
+        """Carrega um personagem do banco de campanha na interface"""
+        if not self.confirm_discard("Deseja importar? As alterações não salvas serão perdidas."):
+            return False
+        try:
+            with CampaignStore(db_path) as store:
+                self.load_sheet(CharacterSheet.from_dict(store.load_sheet(character_id), store.assets))
+        except Exception as e:
+            traceback.print_exc()
+            messagebox.showerror("Erro", f"Erro ao importar da campanha: {str(e)}")
+            return False
+        # A ficha passa a ser gravada no banco, não em um arquivo
+        self.set_current_file(None)
+        self.campaign_character = (db_path, character_id)
+        self._campaign_generation = self.sheet.generation
+        self.save_status_var.set(f"Personagem {character_id} carregado de {os.path.basename(db_path)}")
+        return True
+
+    def new_sheet(self):
+        """Descarta a ficha atual e começa uma ficha em branco"""
+        if not self.confirm_discard("Deseja criar uma nova ficha? As alterações não salvas serão perdidas."):
+            return
+        self.load_sheet(CharacterSheet())
+        self.set_current_file(None)
+        self.campaign_character = None
+
+    def load_sheet(self, sheet, image=None):
+        """Carrega todos os campos de uma CharacterSheet na interface.
+
+        Os recálculos ficam suspensos durante a carga e são aplicados uma
+        única vez ao final. image é o retrato já decodificado, se houver.
+        """
+        # A carga não é uma edição do arquivo atual
+        self.detach_journal()
+        with self.scheduler.batch():
+            # Foto
+            if sheet.photo:
+                self.photo = sheet.photo
+                self.load_photo(sheet.photo, image)
+            else:
+                self.set_default_photo()
+                self.sheet.missing_photo_ref = sheet.missing_photo_ref
+
+            # Classes e informações básicas
+            for label in CLASS_LABELS:
+                self.class_vars[label].set(sheet.classes[label]['name'])
+                self.class_level_vars[label].set(sheet.classes[label]['level'])
+            for field, var in self.basic_info_vars.items():
+                var.set(sheet.basic_info.get(field, ''))
+            self.main_class_var.set(sheet.main_class)
+
+            # Atributos e anotações
+            for attr in ATTRIBUTES:
+                self.attribute_vars[attr].set(sheet.attributes[attr]['value'])
+                self.save_vars[attr].set(sheet.attributes[attr]['save_proficiency'])
+            self.attr_notes.delete('1.0', tk.END)
+            self.attr_notes.insert('1.0', sheet.attribute_notes)
+
+            # Perícias
+            for skill, skill_data in sheet.skills.items():
+                self.skill_vars[skill]['prof1'].set(skill_data['prof1'])
+                self.skill_vars[skill]['prof2'].set(skill_data['prof2'])
+                self.skill_vars[skill]['bonus'].set(skill_data['bonus'])
+
+            # Recursos
+            for resource, values in sheet.resources.items():
+                self.resources_vars[resource].set(values['atual'])
+                self.resources_max_vars[resource].set(values['max'])
+            self.clear_custom_resources()
+            for resource_data in sheet.custom_resources:
+                self.add_custom_resource()
+                resource = self.custom_resources[-1]
+                resource['name'].set(resource_data['name'])
+                resource['atual'].set(resource_data['atual'])
+                resource['max'].set(resource_data['max'])
+
+            # CA
+            self.base_ac_var.set(sheet.armor_class['base'])
+            self.ac_attr_var.set(sheet.armor_class['attr'])
+            self.ac_bonus_var.set(sheet.armor_class['bonus'])
+            for bonus in self.ac_bonus_list:
+                bonus['frame'].destroy()
+            self.ac_bonus_list.clear()
+            self.sheet.set(('armor_class', 'bonus_list'), [])
+            for bonus_data in sheet.armor_class['bonus_list']:
+                self.add_ac_bonus(bonus_data['desc'], bonus_data['value'])
+
+            # CD de Magias
+            self.spell_attr_var.set(sheet.spell_dc['attr'])
+            self.cd_bonus_var.set(sheet.spell_dc['bonus'])
+            for bonus in self.cd_bonus_list:
+                bonus['frame'].destroy()
+            self.cd_bonus_list.clear()
+            self.sheet.set(('spell_dc', 'bonus_list'), [])
+            for bonus_data in sheet.spell_dc['bonus_list']:
+                self.add_cd_bonus(bonus_data['desc'], bonus_data['value'])
+
+            # Combate
+            self.initiative_var.set(sheet.combat['initiative'])
+            self.speed_var.set(sheet.combat['speed'])
+            self.hit_points_var.set(sheet.combat['hit_points'])
+            self.temp_hit_points_var.set(sheet.combat['temp_hit_points'])
+
+            # Magias, talentos, habilidades, inventário, afinidades e
+            # background (as seções ainda não lidas continuam adiadas)
+            for section in DEFERRED_SECTIONS:
+                self.sheet.take_section(sheet, section)
+
+            # Sincronizar o nível básico com o nível da classe principal
+            self.update_main_class_level()
+
+        # Carregar uma ficha não é uma edição a ser gravada no arquivo anterior
+        # nem um passo a ser desfeito
+        self.cancel_scheduled_save()
+        self.history.clear()
+        self._saved_generation = self.sheet.generation
+        self._submitted_generation = None
+
+    def load_photo(self, photo, image=None):
+        """Carrega a foto do personagem a partir dos bytes da imagem"""
         try:
-            image_data = base64.b64decode(photo_data)
-            image = Image.open(io.BytesIO(image_data))
+            if image is None:
+                image = Image.open(io.BytesIO(photo))
             photo = ImageTk.PhotoImage(image)
             self.photo_canvas.delete("all")
             self.photo_canvas.create_image(0, 0, anchor="nw", image=photo)
@@ -1315,151 +1714,20 @@ class FichaDnD:
                 widget.destroy()
             resource['frame'].destroy()
         self.custom_resources.clear()
+        self.sheet.set(('custom_resources',), [])
 
-    def update_classes_interface(self):
-        """Atualiza as informações de classes na interface com base nos dados armazenados."""
-        try:
-            # Iterar pelas classes: Primária, Secundária e Terciária
-            for class_label in ["Classe Primária", "Classe Secundária", "Classe Terciária"]:
-                class_name = self.class_vars[class_label].get()
-                class_level = self.class_level_vars[class_label].get()
-
-                # Atualizar os campos de entrada na interface
-                self.class_vars[class_label].set(class_name)
-                self.class_level_vars[class_label].set(class_level)
-            
-            # Atualizar a classe principal na interface
-            main_class = self.main_class_var.get()
-            self.main_class_var.set(main_class)
-
-            # Sincronizar o nível básico com o nível da classe principal
-            self.update_main_class_level()
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao atualizar as classes na interface: {e}")
-
-    
     def update_all(self):
-        """Atualiza todos os valores calculados"""
-        # Atualizar modificadores de atributos
-        for attr in ["FOR", "DES", "CON", "INT", "SAB", "CAR"]:
-            self.update_modifiers(attr)  
-        self.update_classes_interface()
-        # Atualizar bônus de proficiência
-        self.update_proficiency_bonus()
-        
-        # Atualizar CA
-        if hasattr(self, 'ac_attr_var'):
-            self.update_ac()
-        
-        # Atualizar CD de magias
-        if hasattr(self, 'spell_attr_var'):
-            self.update_spell_dc()
-        
-        # Atualizar perícias
-        self.update_skills()
-        
-        # Atualizar percepção passiva
-        self.update_passive_perception()
-        
-        # Atualizar informações de combate
-        self.update_combat_info()  # Adicione este método para atualizar informações de combate
-
-    def update_combat_info(self):
-        """Atualiza as informações de combate na interface"""
-        self.ac_label.config(text=f"CA Total: {self.calculate_ac()}")
-        self.update_spell_dc()  # Atualiza o valor da CD de magias
-        self.update_passive_perception()  # Atualiza a percepção passiva
-        # Atualize outros campos de combate conforme necessário
-
-    def update_modifiers(self, attr):
-        try:
-            value = int(self.attribute_vars[attr].get())
-            modifier = (value - 10) // 2
-            sign = "+" if modifier >= 0 else ""
-            self.modifier_labels[attr].config(text=f"({sign}{modifier})")
-            
-            self.update_saves(attr)
-            
-            # Atualizar perícias relacionadas
-            self.update_skills()  # Removido o argumento data
-            
-            if hasattr(self, 'ac_attr_var') and self.ac_attr_var.get() == attr:
-                self.update_ac()
-            
-            if hasattr(self, 'spell_attr_var') and self.spell_attr_var.get() == attr:
-                self.update_spell_dc()
-            
-            if attr == "SAB":
-                self.update_passive_perception()
-            
-        except ValueError:
-            self.modifier_labels[attr].config(text="(+0)")
-
-    def update_saves(self, attr=None):
-        try:
-            nivel = int(self.basic_info_vars["Nível"].get())
-            prof_bonus = 2 + ((nivel - 1) // 4)
-        except ValueError:
-            prof_bonus = 2
-
-        for attribute, var in self.attribute_vars.items():
-            try:
-                value = int(var.get())
-                modifier = (value - 10) // 2
-                
-                # Adiciona bônus de proficiência se tiver proficiência no save
-                if self.save_vars[attribute].get():
-                    total = modifier + prof_bonus
-                else:
-                    total = modifier
-                
-                self.save_labels[attribute].config(text=f"{'+' if total >= 0 else ''}{total}")
-            except ValueError:
-                self.save_labels[attribute].config(text="+0")
+        """Recalcula e exibe todos os valores derivados"""
+        self.apply_derived(self.stats.recompute_all())
 
     def get_modifier(self, attr):
-        try:
-            value = int(self.attribute_vars[attr].get())
-            return (value - 10) // 2
-        except (ValueError, KeyError):
-            return 0
-
-    def update_passive_perception(self):
-        """Atualiza o valor da percepção passiva na interface"""
-        try:
-            perception_bonus = self.get_modifier("SAB") + self.get_proficiency_bonus()
-            self.passive_perception_label.config(text=str(10 + perception_bonus))
-        except:
-            self.passive_perception_label.config(text="10")
+        return self.stats.modifier(attr)
 
     def get_proficiency_bonus(self):
-        try:
-            nivel = int(self.basic_info_vars["Nível"].get())
-            # Cálculo do bônus de proficiência padrão do D&D 5e
-            if nivel >= 17:
-                return 6
-            elif nivel >= 13:
-                return 5
-            elif nivel >= 9:
-                return 4
-            elif nivel >= 5:
-                return 3
-            else:
-                return 2
-        except ValueError:
-            return 2
-
-    def update_proficiency_bonus(self, *args):
-        bonus = self.get_proficiency_bonus()
-        self.prof_bonus_label.config(text=f"+{bonus}")
-        # Atualiza todas as perícias, saves e CD de magias
-        self.update_skills()
-        self.update_saves()
-        self.update_spell_dc()
-        self.update_passive_perception()
+        return self.stats.proficiency_bonus()
 
     def export_to_pdf(self):
-        """Exporta a ficha para PDF"""
+        """Exporta a ficha para PDF em segundo plano, com andamento e cancelamento"""
         file_path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("PDF Files", "*.pdf")],
@@ -1470,238 +1738,17 @@ class FichaDnD:
             return
 
         try:
-            # Criar PDF
-            c = canvas.Canvas(file_path, pagesize=A4)
-            width, height = A4
-
-            # Definir fonte e tamanho padrão
-            c.setFont("Helvetica-Bold", 14)
-            
-            # Informações Básicas
-            c.drawString(50, height - 50, "FICHA DE PERSONAGEM D&D 5.5E")
-            c.setFont("Helvetica", 12)
-            
-            y = height - 80
-            for key, var in self.basic_info_vars.items():
-                c.drawString(50, y, f"{key}: {var.get()}")
-                y -= 20
-
-            # Classes
-            y -= 20
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "CLASSES")
-            c.setFont("Helvetica", 12)
-            y -= 20
-            for key, var in self.class_vars.items():
-                c.drawString(50, y, f"{key}: {var.get()}")
-                y -= 20
-
-            # Atributos e Saves
-            y -= 20
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "ATRIBUTOS E SAVES")
-            c.setFont("Helvetica", 12)
-            y -= 20
-            
-            for attr, var in self.attribute_vars.items():
-                mod = self.modifier_labels[attr].cget('text')
-                save = self.save_labels[attr].cget('text')
-                prof = "✓" if self.save_vars[attr].get() else "��"
-                c.drawString(50, y, f"{attr}: {var.get()} {mod} | Save: {save} {prof}")
-                y -= 20
-
-            # Anotações dos Atributos
-            y -= 20
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "ANOTAÇÕES DOS ATRIBUTOS")
-            c.setFont("Helvetica", 10)
-            y -= 20
-            
-            notes = self.attr_notes.get("1.0", tk.END).strip().split('\n')
-            for note in notes:
-                if y < 50:  # Nova página se necessário
-                    c.showPage()
-                    c.setFont("Helvetica", 10)
-                    y = height - 50
-                c.drawString(50, y, note)
-                y -= 15
-
-            # Perícias
-            c.showPage()
-            y = height - 50
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "PERÍCIAS")
-            c.setFont("Helvetica", 12)
-            y -= 20
-
-            for skill, data in self.skill_vars.items():
-                prof1 = "✓" if data['prof1'].get() else "□"
-                prof2 = "✓" if data['prof2'].get() else "□"
-                total = data['label'].cget('text')
-                c.drawString(50, y, f"{skill} [{prof1}{prof2}] {total}")
-                y -= 20
-
-            # Recursos
-            y -= 20
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "RECURSOS")
-            c.setFont("Helvetica", 12)
-            y -= 20
-
-            for resource, var in self.resources_vars.items():
-                atual = var.get()
-                maximo = self.resources_max_vars[resource].get()
-                c.drawString(50, y, f"{resource}: {atual}/{maximo}")
-                y -= 20
-
-            # Recursos Customizados
-            if self.custom_resources:
-                y -= 20
-                c.drawString(50, y, "Recursos Customizados:")
-                y -= 20
-                for resource in self.custom_resources:
-                    nome = resource['name'].get()
-                    atual = resource['atual'].get()
-                    maximo = resource['max'].get()
-                    c.drawString(50, y, f"{nome}: {atual}/{maximo}")
-                    y -= 20
-
-            # Magias
-            c.showPage()
-            y = height - 50
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "MAGIAS")
-            c.setFont("Helvetica", 10)
-            y -= 20
-
-            for spell in self.spells_data:
-                if y < 100:  # Nova página se necessário
-                    c.showPage()
-                    c.setFont("Helvetica", 10)
-                    y = height - 50
-
-                c.drawString(50, y, f"Nível {spell['nivel']}: {spell['nome']}")
-                y -= 15
-                c.drawString(70, y, f"Escola: {spell['escola']}")
-                y -= 15
-                c.drawString(70, y, f"Tempo: {spell['tempo_conjuracao']}")
-                y -= 15
-                c.drawString(70, y, f"Alcance: {spell['alcance']}")
-                y -= 15
-                c.drawString(70, y, f"Componentes: {spell['componentes']}")
-                y -= 15
-                c.drawString(70, y, f"Duração: {spell['duracao']}")
-                y -= 15
-                
-                # Quebrar descrição em linhas
-                desc_lines = spell['descricao'].split('\n')
-                for line in desc_lines:
-                    if y < 50:
-                        c.showPage()
-                        c.setFont("Helvetica", 10)
-                        y = height - 50
-                    c.drawString(70, y, line)
-                    y -= 15
-                y -= 10
-
-            # Talentos
-            c.showPage()
-            y = height - 50
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "TALENTOS")
-            c.setFont("Helvetica", 10)
-            y -= 20
-
-            for ability in self.abilities_data:
-                if y < 100:
-                    c.showPage()
-                    c.setFont("Helvetica", 10)
-                    y = height - 50
-
-                c.drawString(50, y, ability['nome'])
-                y -= 15
-                desc_lines = ability['descricao'].split('\n')
-                for line in desc_lines:
-                    if y < 50:
-                        c.showPage()
-                        c.setFont("Helvetica", 10)
-                        y = height - 50
-                    c.drawString(70, y, line)
-                    y -= 15
-                y -= 10
-
-            # Inventário
-            c.showPage()
-            y = height - 50
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "INVENTÁRIO")
-            c.setFont("Helvetica", 10)
-            y -= 20
-
-            for item in self.inventory_data:
-                if y < 100:
-                    c.showPage()
-                    c.setFont("Helvetica", 10)
-                    y = height - 50
-
-                c.drawString(50, y, f"{item['nome']} ({item['tipo']}")
-                y -= 15
-                
-                # Bônus de atributos
-                bonus_str = ", ".join([f"{attr}: {val}" for attr, val in item['bonus_atributos'].items() if val != '0'])
-                if bonus_str:
-                    c.drawString(70, y, f"Bônus de Atributos: {bonus_str}")
-                    y -= 15
-
-                if item['bonus_ca'] != '0':
-                    c.drawString(70, y, f"Bônus de CA: {item['bonus_ca']}")
-                    y -= 15
-
-                if item['bonus_cd'] != '0':
-                    c.drawString(70, y, f"Bônus de CD: {item['bonus_cd']}")
-                    y -= 15
-
-                if item['dano_dado']:
-                    dano_str = f"Dano: {item['dano_dado']}"
-                    if item['dano_tipo']:
-                        dano_str += f" ({item['dano_tipo']})"
-                    c.drawString(70, y, dano_str)
-                    y -= 15
-
-                desc_lines = item['descricao'].split('\n')
-                for line in desc_lines:
-                    if y < 50:
-                        c.showPage()
-                        c.setFont("Helvetica", 10)
-                        y = height - 50
-                    c.drawString(70, y, line)
-                    y -= 15
-                y -= 10
-
-            # Informações de combate
-            y -= 20
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(50, y, "INFORMAÇÕES DE COMBATE")
-            c.setFont("Helvetica", 12)
-            y -= 20
-            c.drawString(50, y, f"CA Total: {self.calculate_ac()}")
-            y -= 20
-            c.drawString(50, y, f"CD: {self.calculate_spell_dc()}")
-            y -= 20
-            c.drawString(50, y, f"Percepção Passiva: {self.calculate_passive_perception()}")
-            y -= 20
-            c.drawString(50, y, f"Iniciativa: {self.initiative_var.get()}")
-            y -= 20
-            c.drawString(50, y, f"Movimento: {self.speed_var.get()}")
-
-            c.save()
-            messagebox.showinfo("Sucesso", "PDF exportado com sucesso!")
-
+            # O PDF é desenhado a partir de uma cópia: a ficha pode continuar
+            # sendo editada durante a exportação
+            snapshot = self.sheet.snapshot()
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao exportar PDF: {str(e)}")
+            return
+        PdfExportDialog(self, snapshot, file_path)
 
     def import_from_pdf(self):
-        """Importa dados de um PDF"""
+        """Importa dados de um PDF: o JSON anexado pela exportação ou, em PDFs
+        de outra origem, o texto das páginas"""
         file_path = filedialog.askopenfilename(
             filetypes=[("PDF Files", "*.pdf")],
             initialfile="ficha_dnd.pdf"
@@ -1711,115 +1758,22 @@ class FichaDnD:
             return
 
         try:
-            import PyPDF2
-            
-            extracted_data = {
-                'basic_info': {},
-                'classes': {},
-                'attributes': {},
-                'attribute_notes': '',
-                'skills': {},
-                'resources': {},
-                'custom_resources': [],
-                'spells': [],
-                'abilities': [],
-                'features': [],
-                'inventory': []
-            }
-
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                full_text = ""
-                for page in reader.pages:
-                    full_text += page.extract_text() + "\n"
+            # PDFs exportados pela ficha trazem o JSON completo anexado
+            data = read_embedded_sheet(file_path)
+            if data is not None:
+                self.load_sheet(CharacterSheet.from_dict(data))
+                self.set_current_file(None)
+                self.campaign_character = None
+                messagebox.showinfo("Sucesso", "Dados importados do PDF com sucesso!")
+                return
 
-            # Dividir o texto em seções
-            sections = full_text.split("\n")
-            current_section = None
-            current_item = None
-            buffer = []
-
-            for line in sections:
-                line = line.strip()
-                
-                # Identificar seções principais
-                if line.startswith("FICHA DE PERSONAGEM"):
-                    current_section = "basic_info"
-                    continue
-                elif line == "CLASSES":
-                    current_section = "classes"
-                    continue
-                elif line == "ATRIBUTOS E SAVES":
-                    current_section = "attributes"
-                    continue
-                elif line == "ANOTAÇÕES DOS ATRIBUTOS":
-                    current_section = "attribute_notes"
-                    continue
-                elif line == "PERÍCIAS":
-                    current_section = "skills"
-                    continue
-                elif line == "RECURSOS":
-                    current_section = "resources"
-                    continue
-                elif line == "MAGIAS":
-                    current_section = "spells"
-                    continue
-                elif line == "TALENTOS":
-                    current_section = "abilities"
-                    continue
-                elif line == "INVENTÁRIO":
-                    current_section = "inventory"
-                    continue
-
-                # Processar linha baseado na seção atual
-                if current_section == "basic_info":
-                    if ":" in line:
-                        key, value = line.split(":", 1)
-                        extracted_data['basic_info'][key.strip()] = value.strip()
-                
-                elif current_section == "classes":
-                    if ":" in line:
-                        key, value = line.split(":", 1)
-                        extracted_data['classes'][key.strip()] = value.strip()
-                
-                elif current_section == "attributes":
-                    if ":" in line and "|" in line:
-                        attr_part, save_part = line.split("|")
-                        attr_name = attr_part.split(":")[0].strip()
-                        attr_value = attr_part.split(":")[1].split()[0].strip()
-                        modifier = attr_part.split(":")[1].split()[1].strip()
-                        save_value = save_part.split(":")[1].split()[0].strip()
-                        save_prof = "✓" in save_part
-                        
-                        extracted_data['attributes'][attr_name] = {
-                            'value': attr_value,
-                            'modifier': modifier,
-                            'save_total': save_value,
-                            'save_proficiency': save_prof
-                        }
-                
-                elif current_section == "attribute_notes":
-                    if line:
-                        buffer.append(line)
-                    extracted_data['attribute_notes'] = "\n".join(buffer)
-                
-                elif current_section == "skills":
-                    if "[" in line and "]" in line:
-                        skill_name = line[:line.find("[")].strip()
-                        profs = line[line.find("[")+1:line.find("]")].strip()
-                        total = line[line.find("]")+1:].strip()
-                        
-                        extracted_data['skills'][skill_name] = {
-                            'prof1': "✓" in profs[0],
-                            'prof2': "✓" in profs[1],
-                            'total': total,
-                            'bonus': '0'  # Valor padrão
-                        }
-                
-                # ... continuar com o processamento das outras seções ...
+            # Outros PDFs: o texto das páginas, lido uma página por vez
+            extracted_data = read_pdf_sheet(file_path)
 
             # Atualizar interface com dados extraídos
-            self._update_interface_from_extracted_data(extracted_data)
+            self.load_sheet(CharacterSheet.from_dict(extracted_data))
+            self.set_current_file(None)
+            self.campaign_character = None
             messagebox.showinfo("Sucesso", "Dados importados do PDF com sucesso!")
 
         except Exception as e:
@@ -1827,116 +1781,28 @@ class FichaDnD:
             import traceback
             traceback.print_exc()
 
-    def _update_interface_from_extracted_data(self, data):
-        """Atualiza a interface com os dados extraídos"""
-        
-        # Atualizar informações básicas
-        for key, value in data['basic_info'].items():
-            if key in self.basic_info_vars:
-                self.basic_info_vars[key].set(value)
-        
-        # Atualizar atributos
-        for attr, value in data['attributes'].items():
-            if attr in self.attribute_vars:
-                self.attribute_vars[attr].set(value)
-        
-        # Atualizar magias
-        self.spells_data = data['spells']
-        
-        # Atualizar talentos
-        self.abilities_data = data['abilities']
-        
-        # Atualizar habilidades
-        self.features_data = data['features']
-        
-        # Atualizar invent�������rio
-        self.inventory_data = data['inventory']
-        
-        # Atualizar recursos
-        for resource, values in data['resources'].items():
-            if resource in self.resources_vars:
-                self.resources_vars[resource].set(values['atual'])
-                self.resources_max_vars[resource].set(values['max'])
-        
-        # Atualizar recursos customizados
-        if 'custom_resources' in data:
-            for custom_resource in data['custom_resources']:
-                self.add_custom_resource()
-                last_resource = self.custom_resources[-1]
-                last_resource['name'].set(custom_resource['nome'])
-                last_resource['atual'].set(custom_resource['atual'])
-                last_resource['max'].set(custom_resource['max'])
-        
-        # Atualizar modificadores e outros cálculos
-        self.update_modifiers()
-        self.update_proficiency_bonus()
-        self.update_ac()
-        self.update_spell_dc()
-        self.update_passive_perception()
-        
-        # Carregar dados da CA
-        if 'armor_class' in data:
-            ac_data = data['armor_class']
-            
-            # Carregar valores base
-            self.base_ac_var.set(ac_data.get('base', '10'))
-            self.ac_attr_var.set(ac_data.get('attr', 'DES'))
-            self.ac_bonus_var.set(ac_data.get('bonus', '0'))
-            
-            # Limpar bônus existentes
-            for bonus in self.ac_bonus_list:
-                bonus['frame'].destroy()
-            self.ac_bonus_list.clear()
-            
-            # Recriar lista de bônus
-            for bonus_data in ac_data.get('bonus_list', []):
-                # Criar novo frame de bônus
-                bonus_frame = ttk.Frame(self.ac_bonus_frame)
-                bonus_frame.pack(fill="x", pady=2)
-                
-                # Descrição do bônus
-                ttk.Label(bonus_frame, text="Fonte:").pack(side="left", padx=2)
-                desc_var = tk.StringVar(value=bonus_data.get('desc', ''))
-                ttk.Entry(bonus_frame, textvariable=desc_var, width=15).pack(side="left", padx=2)
-                
-                # Valor do bônus
-                ttk.Label(bonus_frame, text="Valor:").pack(side="left", padx=2)
-                value_var = tk.StringVar(value=bonus_data.get('value', '0'))
-                entry = ttk.Entry(bonus_frame, textvariable=value_var, width=5)
-                entry.pack(side="left", padx=2)
-                
-                # Botão remover
-                remove_btn = ttk.Button(bonus_frame, text="X", width=2,
-                                  command=lambda f=bonus_frame: self.remove_ac_bonus(f))
-                remove_btn.pack(side="left", padx=2)
-                
-                # Adicionar à lista de bônus
-                self.ac_bonus_list.append({
-                    'frame': bonus_frame,
-                    'desc': desc_var,
-                    'value': value_var
-                })
-                
-                # Configurar trace para atualização automática
-                value_var.trace('w', self.update_ac)
-        
-        # Atualizar CA total
-        self.update_ac()
-
     def open_background_screen(self):
         """Abre a tela de background"""
         if not hasattr(self, 'background_screen'):
             self.background_screen = BackgroundScreen(self)
+            self.open_screens.append(self.background_screen)
         else:
             self.background_screen.window.deiconify()
 
     def open_affinity_screen(self):
-        AffinityScreen(self)
+        self.open_screens.append(AffinityScreen(self))
 
     def save_data(self, event=None):
-        """Salva os dados atuais no arquivo JSON."""
-        # Implementação do método de salvar
-        # ... existing save logic ...
+        """Salva a ficha no arquivo atual (ou pergunta onde salvar).
+
+        Retorna False se o usuário cancelar a escolha do arquivo.
+        """
+        if not self.current_file_path:
+            self.export_to_json()
+            return self.current_file_path is not None
+        self.cancel_scheduled_save()
+        self.save_snapshot()
+        return True
 
     def confirm_action(self, message):
         """Exibe uma mensagem de confirmação antes de realizar uma ação."""
@@ -1976,12 +1842,23 @@ class FichaDnD:
         return result.get()
 
     def close_main_window(self):
-        """Fecha a janela principal com confirmação"""
-        action = self.confirm_action("Deseja realmente sair? As alterações não salvas serão perdidas.")
+        """Fecha a janela principal, confirmando se houver alterações não salvas"""
+        if self.has_unsaved_changes():
+            action = self.confirm_action("Deseja realmente sair? As alterações não salvas serão perdidas.")
+        else:
+            action = "exit"
         if action == "save_and_exit":
-            self.save_data()  # Assumindo que você tem um método para salvar os dados
+            if not self.save_data():
+                return
+            self.detach_journal()
+            self.autosave.close()
             self.root.destroy()
         elif action == "exit":
+            # Não iniciar novas gravações, mas terminar as que já começaram
+            self.cancel_scheduled_save()
+            # Alterações já registradas no diário são gravadas na ficha
+            self.detach_journal()
+            self.autosave.close()
             self.root.destroy()
 
     def simple_confirm_action(self, message):
@@ -1990,27 +1867,15 @@ class FichaDnD:
 
     def calculate_ac(self):
         """Calcula a Classe de Armadura (CA) total."""
-        try:
-            base_ac = int(self.base_ac_var.get() or 10)
-            attr_mod = self.get_modifier(self.ac_attr_var.get())
-            
-            # Bônus adicional padrão
-            try:
-                bonus = int(self.ac_bonus_var.get() or 0)
-            except ValueError:
-                bonus = 0
-                
-            # Somar bônus extras
-            for bonus_data in self.ac_bonus_list:
-                try:
-                    bonus += int(bonus_data['value'].get() or 0)
-                except ValueError:
-                    continue
-            
-            total_ac = base_ac + attr_mod + bonus
-            return total_ac
-        except:
-            return 10  # Valor padrão se ocorrer um erro
+        return self.stats.armor_class()
+
+    def calculate_spell_dc(self):
+        """Calcula a CD de magias total."""
+        return self.stats.spell_dc()
+
+    def calculate_passive_perception(self):
+        """Calcula a percepção passiva."""
+        return self.stats.passive_perception()
 
 def center_window(window, width, height):
     """Centraliza uma janela na tela, considerando a barra de tarefas"""
@@ -2020,7 +1885,18 @@ def center_window(window, width, height):
     y = (screen_height - height) // 2
     window.geometry(f"{width}x{height}+{x}+{y}")
 
+def search_controller(window, source, show, status_var, search=filter_records):
+    """SearchController de uma tela, com o tempo de cada busca em status_var"""
+    def report(term, results, seconds):
+        status_var.set(f"{len(results)} resultados em {seconds * 1000:.1f} ms")
+
+    return SearchController(source, show, search=search, schedule=window.after,
+                            cancel=window.after_cancel, report=report)
+
 class SpellScreen:
+    # Seção da ficha mostrada pela tela
+    section = 'spells'
+
     def __init__(self, parent):
         self.parent = parent
         self.window = tk.Toplevel(parent.root)
@@ -2031,14 +1907,18 @@ class SpellScreen:
         self.spell_lists = {}
         self.spell_frames = {}
         self.prepared_spells = set()
-        self.spells_data = getattr(parent, 'spells_data', [])
-        parent.spells_data = self.spells_data
+        # Índice de nome e descrição para a busca; linhas mostradas em cada lista
+        self.index = SearchIndex(('nome', 'descricao'))
+        self.shown_rows = {}
         
         # Adicionar variáveis de filtro
         self.search_var = tk.StringVar()
         self.search_var.trace('w', self.filter_spells)
         self.filter_prepared = tk.StringVar(value="todas")
         self.filter_prepared.trace('w', self.filter_spells)
+        self.search_status_var = tk.StringVar()
+        self.search = search_controller(self.window, lambda: self.spells_data, self.show_spells,
+                                        self.search_status_var, search=self.index.filter)
         
         # Criar interface
         self.create_interface()
@@ -2047,6 +1927,11 @@ class SpellScreen:
         self.all_spells = {i: [] for i in range(10)}
         self.load_spells()
 
+    @property
+    def spells_data(self):
+        # Sempre a lista atual da ficha (que muda ao importar outra ficha)
+        return self.parent.spells_data
+
     def create_interface(self):
         # Frame para filtros no topo
         filter_frame = ttk.Frame(self.window)
@@ -2059,6 +1944,7 @@ class SpellScreen:
         ttk.Label(search_frame, text="Buscar:").pack(side="left", padx=5)
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         search_entry.pack(side="left", fill="x", expand=True, padx=5)
+        ttk.Label(search_frame, textvariable=self.search_status_var).pack(side="left", padx=5)
         
         # Frame para filtro de preparadas
         prepared_frame = ttk.Frame(filter_frame)
@@ -2201,23 +2087,23 @@ class SpellScreen:
         """Salva uma magia nova ou atualiza uma existente"""
         try:
             # Normalizar dados
-            spell = {
-                'nome': entries['Nome'].get().strip(),
-                'nivel': int(entries['Nível'].get().strip() or 0),
-                'escola': entries['Escola'].get().strip(),
-                'preparada': entries['Preparada'].get(),
-                'tempo_conjuracao': entries['Tempo de Conjuração'].get().strip(),
-                'alcance': entries['Alcance'].get().strip(),
-                'componentes': entries['Componentes'].get().strip(),
-                'duracao': entries['Duração'].get().strip(),
-                'custo_mana': entries['Custo de Mana'].get().strip(),  # Novo campo
-                'teste_resistencia': entries['Teste de Resist��ncia'].get().strip(),
-                'dano_efeito': entries['Dano/Efeito'].get().strip(),
-                'descricao': entries['Descrição'].get("1.0", tk.END).strip(),
-                'niveis_superiores': entries['Em Níveis Superiores'].get("1.0", tk.END).strip()
-            }
+            spell = Spell(
+                nome=entries['Nome'].get().strip(),
+                nivel=int(entries['Nível'].get().strip() or 0),
+                escola=entries['Escola'].get().strip(),
+                preparada=entries['Preparada'].get(),
+                tempo_conjuracao=entries['Tempo de Conjuração'].get().strip(),
+                alcance=entries['Alcance'].get().strip(),
+                componentes=entries['Componentes'].get().strip(),
+                duracao=entries['Duração'].get().strip(),
+                custo_mana=entries['Custo de Mana'].get().strip(),  # Novo campo
+                teste_resistencia=entries['Teste de Resistência'].get().strip(),
+                dano_efeito=entries['Dano/Efeito'].get().strip(),
+                descricao=entries['Descrição'].get("1.0", tk.END).strip(),
+                niveis_superiores=entries['Em Níveis Superiores'].get("1.0", tk.END).strip()
+            )
 
-            if not spell['nome']:
+            if not spell.nome:
                 messagebox.showerror("Erro", "O nome da magia é obrigatório")
                 return
 
@@ -2226,15 +2112,15 @@ class SpellScreen:
             if selected:
                 # Atualizar magia existente
                 for i, existing_spell in enumerate(self.spells_data):
-                    if existing_spell['nome'].strip().lower() == selected['nome'].strip().lower():
-                        self.spells_data[i] = spell
+                    if existing_spell.nome.strip().lower() == selected.nome.strip().lower():
+                        self.parent.sheet.set(('spells', i), spell)
+                        self.index.remove(existing_spell)
+                        self.index.add(spell)
                         break
             else:
                 # Adicionar nova magia
-                self.spells_data.append(spell)
-
-            # Atualizar a lista principal no parent
-            self.parent.spells_data = self.spells_data
+                self.parent.sheet.insert(('spells',), None, spell)
+                self.index.add(spell)
 
             # Recarregar listas
             self.load_spells()
@@ -2263,7 +2149,7 @@ class SpellScreen:
                 spell_name = spell_text.split(' ', 1)[-1].strip()  # Remove o status
         
         if spell_name:
-            return next((s for s in self.spells_data if s['nome'].strip().lower() == spell_name.lower()), None)
+            return next((s for s in self.spells_data if s.nome.strip().lower() == spell_name.lower()), None)
         return None
 
     def clear_form(self):
@@ -2283,67 +2169,81 @@ class SpellScreen:
             return
 
         if messagebox.askyesno("Confirmar", "Deseja realmente excluir esta magia?"):
-            self.spells_data.remove(selected)
+            index = next(i for i, spell in enumerate(self.spells_data) if spell is selected)
+            self.parent.sheet.remove(('spells',), index)
+            self.index.remove(selected)
             self.load_spells()
             self.clear_form()
 
-    def load_spells(self):
-        # Limpar todas as listas
-        for spell_list in self.spell_lists.values():
+    def reload(self):
+        """Mostra de novo os dados da ficha (ex.: após desfazer)"""
+        self.load_spells()
+
+    def show_rows(self, rows):
+        """Preenche cada lista com suas linhas ({lista: [texto]}).
+
+        As linhas entram de uma vez (uma chamada ao Tk por lista), e as
+        listas que já mostram as mesmas linhas não são tocadas.
+        """
+        for key, spell_list in self.spell_lists.items():
+            texts = rows.get(key, [])
+            if self.shown_rows.get(key) == texts:
+                continue
             spell_list.delete(0, tk.END)
+            if texts:
+                spell_list.insert(tk.END, *texts)
+            self.shown_rows[key] = texts
+
+    def load_spells(self):
+        # Índice da busca: só as magias novas ou removidas são processadas
+        self.index.sync(self.spells_data)
+        self.search.invalidate()
 
         # Organizar magias por nível
         self.all_spells = {i: [] for i in range(10)}
+        rows = {key: [] for key in self.spell_lists}
         for index, spell in enumerate(self.spells_data):
-            level = spell.get('nivel', 0)
+            level = spell.nivel
             self.all_spells[level].append(spell)
 
             # Calcular a página da magia
             page_number = (index // 2) + 1
 
             # Atualizar lista "Todas"
-            prepared = '✓' if spell.get('preparada', False) else ' '
-            display_text = f"[{spell['nivel']}] {prepared} {spell['nome']} (Página {page_number})"
-            self.spell_lists['all'].insert(tk.END, display_text)
+            prepared = '✓' if spell.preparada else ' '
+            rows['all'].append(f"[{spell.nivel}] {prepared} {spell.nome} (Página {page_number})")
 
             # Atualizar listas por nível
-            display_text = f"{prepared} {spell['nome']} (Página {page_number})"
-            self.spell_lists[level].insert(tk.END, display_text)
+            rows[level].append(f"{prepared} {spell.nome} (Página {page_number})")
+
+        if self.search_var.get().strip() or self.filter_prepared.get() != "todas":
+            # Há busca ou filtro ativo: mostrar só as magias que passam neles
+            self.search.refresh()
+        else:
+            self.show_rows(rows)
 
     def filter_spells(self, *args):
         """Filtra as magias com base na busca e no status de preparada"""
-        search_term = self.search_var.get().lower().strip()
+        self.search.request(self.search_var.get())
+
+    def show_spells(self, spells):
+        """Mostra as magias encontradas pela busca (pelo índice), por nível"""
         prepared_filter = self.filter_prepared.get()
-        
-        # Limpar todas as listas
-        for spell_list in self.spell_lists.values():
-            spell_list.delete(0, tk.END)
-        
-        # Filtrar e exibir magias
-        for spell in self.spells_data:
+
+        rows = {key: [] for key in self.spell_lists}
+        for spell in spells:
             # Verificar filtro de preparada
-            is_prepared = spell.get('preparada', False)
+            is_prepared = spell.preparada
             if prepared_filter == "preparadas" and not is_prepared:
                 continue
             if prepared_filter == "não preparadas" and is_prepared:
                 continue
-            
-            # Verificar termo de busca
-            spell_name = spell['nome'].lower()
-            spell_desc = spell.get('descricao', '').lower()
-            
-            if search_term and not (search_term in spell_name or search_term in spell_desc):
-                continue
-            
-            # Adicionar à lista 'todas'
+
+            # Adicionar à lista 'todas' e à lista do nível específico
             prepared_mark = '✓' if is_prepared else ' '
-            display_text = f"[{spell['nivel']}] {prepared_mark} {spell['nome']}"
-            self.spell_lists['all'].insert(tk.END, display_text)
-            
-            # Adicionar à lista do nível específico
-            level = spell.get('nivel', 0)
-            display_text = f"{prepared_mark} {spell['nome']}"
-            self.spell_lists[level].insert(tk.END, display_text)
+            rows['all'].append(f"[{spell.nivel}] {prepared_mark} {spell.nome}")
+            rows[spell.nivel].append(f"{prepared_mark} {spell.nome}")
+        self.show_rows(rows)
 
     def on_spell_select(self, event):
         """Manipula o evento de seleção de uma magia na lista"""
@@ -2357,24 +2257,24 @@ class SpellScreen:
             
             # Preencher os campos com os dados da magia
             form = self.spell_form
-            form['Nome'].set(selected_spell.get('nome', ''))
-            form['Nível'].set(str(selected_spell.get('nivel', '0')))
-            form['Escola'].set(selected_spell.get('escola', ''))
-            form['Preparada'].set(selected_spell.get('preparada', False))
-            form['Tempo de Conjuração'].set(selected_spell.get('tempo_conjuracao', ''))
-            form['Alcance'].set(selected_spell.get('alcance', ''))
-            form['Componentes'].set(selected_spell.get('componentes', ''))
-            form['Duração'].set(selected_spell.get('duracao', ''))
-            form['Custo de Mana'].set(selected_spell.get('custo_mana', ''))
-            form['Teste de Resistência'].set(selected_spell.get('teste_resistencia', 'Nenhum'))
-            form['Dano/Efeito'].set(selected_spell.get('dano_efeito', ''))
+            form['Nome'].set(selected_spell.nome)
+            form['Nível'].set(str(selected_spell.nivel))
+            form['Escola'].set(selected_spell.escola)
+            form['Preparada'].set(selected_spell.preparada)
+            form['Tempo de Conjuração'].set(selected_spell.tempo_conjuracao)
+            form['Alcance'].set(selected_spell.alcance)
+            form['Componentes'].set(selected_spell.componentes)
+            form['Duração'].set(selected_spell.duracao)
+            form['Custo de Mana'].set(selected_spell.custo_mana)
+            form['Teste de Resistência'].set((selected_spell.teste_resistencia or 'Nenhum'))
+            form['Dano/Efeito'].set(selected_spell.dano_efeito)
             
             # Para campos de texto (Text widget)
             form['Descrição'].delete('1.0', tk.END)
-            form['Descrição'].insert('1.0', selected_spell.get('descricao', ''))
+            form['Descrição'].insert('1.0', selected_spell.descricao)
             
             form['Em Níveis Superiores'].delete('1.0', tk.END)
-            form['Em Níveis Superiores'].insert('1.0', selected_spell.get('niveis_superiores', ''))
+            form['Em Níveis Superiores'].insert('1.0', selected_spell.niveis_superiores)
             
             # Atualizar a interface
             self.window.update_idletasks()
@@ -2383,6 +2283,9 @@ class SpellScreen:
             print(f"Erro ao carregar magia: {str(e)}")
 
 class AbilityScreen:
+    # Seção da ficha mostrada pela tela
+    section = 'abilities'
+
     def __init__(self, parent):
         self.parent = parent
         self.window = tk.Toplevel(parent.root)
@@ -2398,6 +2301,10 @@ class AbilityScreen:
         self.search_var.trace('w', self.filter_abilities)
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         search_entry.pack(side="left", fill="x", expand=True, padx=5)
+        self.search_status_var = tk.StringVar()
+        ttk.Label(search_frame, textvariable=self.search_status_var).pack(side="left", padx=5)
+        self.search = search_controller(self.window, lambda: self.all_abilities, self.show_abilities,
+                                        self.search_status_var)
         
         # Frame principal dividido em duas partes
         self.create_split_layout()
@@ -2462,18 +2369,22 @@ class AbilityScreen:
         ttk.Button(button_frame, text="Excluir", command=self.delete_ability).pack(side="left", padx=5)
 
     def filter_abilities(self, *args):
-        search_term = self.search_var.get().lower().strip()
-        
+        # Busca no nome e na descrição, depois de uma pausa na digitação
+        self.search.request(self.search_var.get())
+
+    def show_abilities(self, abilities):
+        self.shown_abilities = list(abilities)
         self.ability_list.delete(0, tk.END)
-        for ability in self.all_abilities:
-            # Busca no nome e na descrição
-            if (search_term in ability['nome'].lower() or 
-                search_term in ability.get('descricao', '').lower()):
-                self.ability_list.insert(tk.END, ability['nome'])
+        if abilities:
+            self.ability_list.insert(tk.END, *[ability.nome for ability in abilities])
     
+    def reload(self):
+        """Mostra de novo os dados da ficha (ex.: após desfazer)"""
+        self.load_abilities()
+
     def load_abilities(self):
         self.all_abilities = getattr(self.parent, 'abilities_data', []).copy()
-        self.filter_abilities()
+        self.search.refresh()
 
     def on_ability_select(self, event):
         selection = self.ability_list.curselection()
@@ -2485,25 +2396,31 @@ class AbilityScreen:
         ability_name = self.ability_list.get(index)
         
         # Encontrar o talento nos dados
-        ability = next((a for a in self.parent.abilities_data if a['nome'] == ability_name), None)
+        ability = next((a for a in self.parent.abilities_data if a.nome == ability_name), None)
         
         if ability:
-            self.name_var.set(ability['nome'])
+            self.name_var.set(ability.nome)
             self.description_text.delete("1.0", tk.END)
-            self.description_text.insert("1.0", ability['descricao'])
+            self.description_text.insert("1.0", ability.descricao)
+
+    def selected_index(self):
+        """Posição na ficha do talento selecionado (a lista pode estar filtrada)"""
+        selection = self.ability_list.curselection()
+        if not selection:
+            return None
+        ability = self.shown_abilities[selection[0]]
+        return next((i for i, a in enumerate(self.parent.abilities_data) if a is ability), None)
 
     def delete_ability(self):
-        selected = self.ability_list.curselection()
-        if not selected:
+        index = self.selected_index()
+        if index is None:
             messagebox.showwarning("Aviso", "Selecione um talento para excluir")
             return
 
         if messagebox.askyesno("Confirmar", "Deseja realmente excluir este talento?"):
-            index = selected[0]
-            self.ability_list.delete(index)
-            self.parent.abilities_data.pop(index)
+            self.parent.sheet.remove(('abilities',), index)
             self.clear_form()
-            self.all_abilities = self.parent.abilities_data.copy()
+            self.load_abilities()
 
     def clear_form(self):
         self.name_var.set("")
@@ -2511,28 +2428,28 @@ class AbilityScreen:
         self.ability_list.selection_clear(0, tk.END)
 
     def save_ability(self):
-        ability = {
-            'nome': self.name_var.get(),
-            'descricao': self.description_text.get("1.0", tk.END).strip()
-        }
+        ability = Ability(
+            nome=self.name_var.get(),
+            descricao=self.description_text.get("1.0", tk.END).strip()
+        )
 
-        selected = self.ability_list.curselection()
-        if selected:
+        index = self.selected_index()
+        if index is not None:
             # Atualizar talento existente
-            index = selected[0]
-            self.parent.abilities_data[index] = ability
-            self.ability_list.delete(index)
-            self.ability_list.insert(index, ability['nome'])
+            self.parent.sheet.set(('abilities', index), ability)
         else:
             # Novo talento
-            self.parent.abilities_data.append(ability)
-            self.ability_list.insert(tk.END, ability['nome'])
+            self.parent.sheet.insert(('abilities',), None, ability)
 
+        # Mostrar a lista de novo, com a busca atual
+        self.load_abilities()
         messagebox.showinfo("Sucesso", "Talento salvo com sucesso!")
         self.clear_form()
-        self.all_abilities = self.parent.abilities_data.copy()
 
 class InventoryScreen:
+    # Seção da ficha mostrada pela tela
+    section = 'inventory'
+
     def __init__(self, parent):
         self.parent = parent
         self.window = tk.Toplevel(parent.root)
@@ -2634,11 +2551,15 @@ class InventoryScreen:
                     dt['type'].get() == frame.winfo_children()[1].get())
         ]
 
+    def reload(self):
+        """Mostra de novo os dados da ficha (ex.: após desfazer)"""
+        self.load_items()
+
     def load_items(self):
         """Carrega os itens existentes na lista."""
         self.item_list.delete(0, tk.END)
         for item in self.parent.inventory_data:
-            self.item_list.insert(tk.END, item['nome'])
+            self.item_list.insert(tk.END, item.nome)
 
     def on_select_item(self, event):
         """Carrega os detalhes do item selecionado no formulário."""
@@ -2647,20 +2568,20 @@ class InventoryScreen:
             return
 
         item = self.parent.inventory_data[selected[0]]
-        self.name_var.set(item['nome'])
-        self.acerto_bonus_var.set(item.get('acerto_bonus', ''))
-        self.weight_var.set(item.get('peso', ''))
-        self.saint_crystal_var.set(item.get('cristal_saint', ''))
-        self.qi_crystal_var.set(item.get('cristal_qi', ''))
-        self.pure_crystal_var.set(item.get('cristal_puro', ''))
+        self.name_var.set(item.nome)
+        self.acerto_bonus_var.set(item.acerto_bonus)
+        self.weight_var.set(item.peso)
+        self.saint_crystal_var.set(item.cristal_saint)
+        self.qi_crystal_var.set(item.cristal_qi)
+        self.pure_crystal_var.set(item.cristal_puro)
         self.description_text.delete("1.0", tk.END)
-        self.description_text.insert("1.0", item.get('descricao', ''))
+        self.description_text.insert("1.0", item.descricao)
 
         # Carregar tipos de dano
         for dt in self.damage_types:
             dt['damage'].set('')
             dt['type'].set('')
-        for damage, type_ in item.get('tipos_dano', []):
+        for damage, type_ in item.tipos_dano:
             self.add_damage_type()
             self.damage_types[-1]['damage'].set(damage)
             self.damage_types[-1]['type'].set(type_)
@@ -2669,28 +2590,28 @@ class InventoryScreen:
         """Salva o item atual, seja novo ou editado."""
         tipos_dano = [(dt['damage'].get(), dt['type'].get()) for dt in self.damage_types]
 
-        item = {
-            'nome': self.name_var.get(),
-            'acerto_bonus': self.acerto_bonus_var.get(),
-            'peso': self.weight_var.get(),
-            'cristal_saint': self.saint_crystal_var.get(),
-            'cristal_qi': self.qi_crystal_var.get(),
-            'cristal_puro': self.pure_crystal_var.get(),
-            'descricao': self.description_text.get("1.0", tk.END).strip(),
-            'tipos_dano': tipos_dano
-        }
+        item = Item(
+            nome=self.name_var.get(),
+            acerto_bonus=self.acerto_bonus_var.get(),
+            peso=self.weight_var.get(),
+            cristal_saint=self.saint_crystal_var.get(),
+            cristal_qi=self.qi_crystal_var.get(),
+            cristal_puro=self.pure_crystal_var.get(),
+            descricao=self.description_text.get("1.0", tk.END).strip(),
+            tipos_dano=tipos_dano
+        )
 
         selected = self.item_list.curselection()
         if selected:
             # Atualizar item existente
             index = selected[0]
-            self.parent.inventory_data[index] = item
+            self.parent.sheet.set(('inventory', index), item)
             self.item_list.delete(index)
-            self.item_list.insert(index, item['nome'])
+            self.item_list.insert(index, item.nome)
         else:
             # Novo item
-            self.parent.inventory_data.append(item)
-            self.item_list.insert(tk.END, item['nome'])
+            self.parent.sheet.insert(('inventory',), None, item)
+            self.item_list.insert(tk.END, item.nome)
 
         messagebox.showinfo("Sucesso", "Item salvo com sucesso!")
         self.clear_form()
@@ -2720,15 +2641,18 @@ class InventoryScreen:
         if messagebox.askyesno("Confirmar", "Deseja realmente excluir este item?"):
             index = selected[0]
             self.item_list.delete(index)
-            self.parent.inventory_data.pop(index)
+            self.parent.sheet.remove(('inventory',), index)
             self.clear_form()
 
     def calculate_total_weight(self):
         """Calcula o peso total do inventário."""
-        total_weight = sum(float(item.get('peso', 0)) for item in self.parent.inventory_data)
+        total_weight = sum(float(item.peso or 0) for item in self.parent.inventory_data)
         messagebox.showinfo("Peso Total", f"O peso total do inventário é: {total_weight} lbs")
 
 class FeatureScreen:
+    # Seção da ficha mostrada pela tela
+    section = 'features'
+
     def __init__(self, parent):
         self.parent = parent
         self.window = tk.Toplevel(parent.root)
@@ -2744,6 +2668,10 @@ class FeatureScreen:
         self.search_var.trace('w', self.filter_features)
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         search_entry.pack(side="left", fill="x", expand=True, padx=5)
+        self.search_status_var = tk.StringVar()
+        ttk.Label(search_frame, textvariable=self.search_status_var).pack(side="left", padx=5)
+        self.search = search_controller(self.window, lambda: self.all_features, self.show_features,
+                                        self.search_status_var)
         
         # Frame principal dividido em duas partes
         self.create_split_layout()
@@ -2808,18 +2736,22 @@ class FeatureScreen:
         ttk.Button(button_frame, text="Excluir", command=self.delete_feature).pack(side="left", padx=5)
 
     def filter_features(self, *args):
-        search_term = self.search_var.get().lower().strip()
-        
+        # Busca no nome e na descrição, depois de uma pausa na digitação
+        self.search.request(self.search_var.get())
+
+    def show_features(self, features):
+        self.shown_features = list(features)
         self.feature_list.delete(0, tk.END)
-        for feature in self.all_features:
-            # Busca no nome e na descrição
-            if (search_term in feature['nome'].lower() or 
-                search_term in feature.get('descricao', '').lower()):
-                self.feature_list.insert(tk.END, feature['nome'])
+        if features:
+            self.feature_list.insert(tk.END, *[feature.nome for feature in features])
     
+    def reload(self):
+        """Mostra de novo os dados da ficha (ex.: após desfazer)"""
+        self.load_features()
+
     def load_features(self):
         self.all_features = self.parent.features_data.copy()
-        self.filter_features()
+        self.search.refresh()
 
     def on_feature_select(self, event):
         selected = self.feature_list.curselection()
@@ -2827,54 +2759,60 @@ class FeatureScreen:
         if not selected:
             return
             
-        index = selected[0]
-        feature = self.parent.features_data[index]
+        feature = self.shown_features[selected[0]]
         
-        self.name_var.set(feature['nome'])
+        self.name_var.set(feature.nome)
         self.description_text.delete("1.0", tk.END)
-        self.description_text.insert("1.0", feature['descricao'])
+        self.description_text.insert("1.0", feature.descricao)
 
     def clear_form(self):
         self.name_var.set("")
         self.description_text.delete("1.0", tk.END)
         self.feature_list.selection_clear(0, tk.END)
 
+    def selected_index(self):
+        """Posição na ficha da habilidade selecionada (a lista pode estar filtrada)"""
+        selection = self.feature_list.curselection()
+        if not selection:
+            return None
+        feature = self.shown_features[selection[0]]
+        return next((i for i, f in enumerate(self.parent.features_data) if f is feature), None)
+
     def delete_feature(self):
-        selected = self.feature_list.curselection()
-        if not selected:
+        index = self.selected_index()
+        if index is None:
             messagebox.showwarning("Aviso", "Selecione uma habilidade para excluir")
             return
 
         if messagebox.askyesno("Confirmar", "Deseja realmente excluir esta habilidade?"):
-            index = selected[0]
-            self.feature_list.delete(index)
-            self.parent.features_data.pop(index)
+            self.parent.sheet.remove(('features',), index)
             self.clear_form()
+            self.load_features()
             self.parent.update_all()
 
     def save_feature(self):
-        feature = {
-            'nome': self.name_var.get() or "Sem nome",
-            'descricao': self.description_text.get("1.0", tk.END).strip() or "Sem descrição"
-        }
+        feature = Feature(
+            nome=self.name_var.get() or "Sem nome",
+            descricao=self.description_text.get("1.0", tk.END).strip() or "Sem descrição"
+        )
 
-        selected = self.feature_list.curselection()
-        if selected:
+        index = self.selected_index()
+        if index is not None:
             # Atualizar habilidade existente
-            index = selected[0]
-            self.parent.features_data[index] = feature
-            self.feature_list.delete(index)
-            self.feature_list.insert(index, feature['nome'])
+            self.parent.sheet.set(('features', index), feature)
         else:
             # Nova habilidade
-            self.parent.features_data.append(feature)
-            self.feature_list.insert(tk.END, feature['nome'])
+            self.parent.sheet.insert(('features',), None, feature)
 
+        # Mostrar a lista de novo, com a busca atual
+        self.load_features()
         messagebox.showinfo("Sucesso", "Habilidade salva com sucesso!")
         self.clear_form()
-        self.all_features = self.parent.features_data.copy()
 
 class AffinityScreen:
+    # Seção da ficha mostrada pela tela
+    section = 'affinities'
+
     def __init__(self, parent):
         self.parent = parent
         self.window = tk.Toplevel(parent.root)
@@ -2890,6 +2828,10 @@ class AffinityScreen:
         self.search_var.trace('w', self.filter_affinities)
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
         search_entry.pack(side="left", fill="x", expand=True, padx=5)
+        self.search_status_var = tk.StringVar()
+        ttk.Label(search_frame, textvariable=self.search_status_var).pack(side="left", padx=5)
+        self.search = search_controller(self.window, lambda: self.all_affinities, self.show_affinities,
+                                        self.search_status_var)
         
         # Frame principal dividido em duas partes
         self.create_split_layout()
@@ -2957,18 +2899,22 @@ class AffinityScreen:
         ttk.Button(button_frame, text="Excluir", command=self.delete_affinity).pack(side="left", padx=5)
 
     def filter_affinities(self, *args):
-        search_term = self.search_var.get().lower().strip()
-        
+        # Busca no nome e na descrição, depois de uma pausa na digitação
+        self.search.request(self.search_var.get())
+
+    def show_affinities(self, affinities):
+        self.shown_affinities = list(affinities)
         self.affinity_list.delete(0, tk.END)
-        for affinity in self.all_affinities:
-            # Busca no nome e na descrição
-            if (search_term in affinity['nome'].lower() or 
-                search_term in affinity.get('descricao', '').lower()):
-                self.affinity_list.insert(tk.END, affinity['nome'])
+        if affinities:
+            self.affinity_list.insert(tk.END, *[affinity.nome for affinity in affinities])
     
+    def reload(self):
+        """Mostra de novo os dados da ficha (ex.: após desfazer)"""
+        self.load_affinities()
+
     def load_affinities(self):
         self.all_affinities = getattr(self.parent, 'affinities_data', []).copy()
-        self.filter_affinities()
+        self.search.refresh()
 
     def on_affinity_select(self, event):
         selection = self.affinity_list.curselection()
@@ -2980,26 +2926,32 @@ class AffinityScreen:
         affinity_name = self.affinity_list.get(index)
         
         # Encontrar a afinidade nos dados
-        affinity = next((a for a in self.parent.affinities_data if a['nome'] == affinity_name), None)
+        affinity = next((a for a in self.parent.affinities_data if a.nome == affinity_name), None)
         
         if affinity:
-            self.name_var.set(affinity['nome'])
-            self.bonus_var.set(affinity.get('bonus', ''))
+            self.name_var.set(affinity.nome)
+            self.bonus_var.set(affinity.bonus)
             self.description_text.delete("1.0", tk.END)
-            self.description_text.insert("1.0", affinity['descricao'])
+            self.description_text.insert("1.0", affinity.descricao)
+
+    def selected_index(self):
+        """Posição na ficha da afinidade selecionada (a lista pode estar filtrada)"""
+        selection = self.affinity_list.curselection()
+        if not selection:
+            return None
+        affinity = self.shown_affinities[selection[0]]
+        return next((i for i, a in enumerate(self.parent.affinities_data) if a is affinity), None)
 
     def delete_affinity(self):
-        selected = self.affinity_list.curselection()
-        if not selected:
+        index = self.selected_index()
+        if index is None:
             messagebox.showwarning("Aviso", "Selecione uma afinidade para excluir")
             return
 
         if messagebox.askyesno("Confirmar", "Deseja realmente excluir esta afinidade?"):
-            index = selected[0]
-            self.affinity_list.delete(index)
-            self.parent.affinities_data.pop(index)
+            self.parent.sheet.remove(('affinities',), index)
             self.clear_form()
-            self.all_affinities = self.parent.affinities_data.copy()
+            self.load_affinities()
 
     def clear_form(self):
         self.name_var.set("")
@@ -3008,27 +2960,24 @@ class AffinityScreen:
         self.affinity_list.selection_clear(0, tk.END)
 
     def save_affinity(self):
-        affinity = {
-            'nome': self.name_var.get(),
-            'bonus': self.bonus_var.get(),
-            'descricao': self.description_text.get("1.0", tk.END).strip()
-        }
+        affinity = Affinity(
+            nome=self.name_var.get(),
+            bonus=self.bonus_var.get(),
+            descricao=self.description_text.get("1.0", tk.END).strip()
+        )
 
-        selected = self.affinity_list.curselection()
-        if selected:
+        index = self.selected_index()
+        if index is not None:
             # Atualizar afinidade existente
-            index = selected[0]
-            self.parent.affinities_data[index] = affinity
-            self.affinity_list.delete(index)
-            self.affinity_list.insert(index, affinity['nome'])
+            self.parent.sheet.set(('affinities', index), affinity)
         else:
             # Nova afinidade
-            self.parent.affinities_data.append(affinity)
-            self.affinity_list.insert(tk.END, affinity['nome'])
+            self.parent.sheet.insert(('affinities',), None, affinity)
 
+        # Mostrar a lista de novo, com a busca atual
+        self.load_affinities()
         messagebox.showinfo("Sucesso", "Afinidade salva com sucesso!")
         self.clear_form()
-        self.all_affinities = self.parent.affinities_data.copy()
 
 class GrimoireScreen:
     def __init__(self, parent):
@@ -3077,23 +3026,23 @@ class GrimoireScreen:
         spells_to_display = self.parent.spells_data[start_index:end_index]
 
         for i, spell in enumerate(spells_to_display):
-            spell_frame = ttk.LabelFrame(self.spell_frame, text=spell['nome'])
+            spell_frame = ttk.LabelFrame(self.spell_frame, text=spell.nome)
             spell_frame.grid(row=0, column=i, padx=5, pady=5, sticky="nsew")
 
-            ttk.Label(spell_frame, text=f"Nível: {spell['nivel']}").pack(anchor="w")
-            ttk.Label(spell_frame, text=f"Escola: {spell['escola']}").pack(anchor="w")
-            ttk.Label(spell_frame, text=f"Tempo de Conjuração: {spell['tempo_conjuracao']}").pack(anchor="w")
-            ttk.Label(spell_frame, text=f"Alcance: {spell['alcance']}").pack(anchor="w")
-            ttk.Label(spell_frame, text=f"Componentes: {spell['componentes']}").pack(anchor="w")
-            ttk.Label(spell_frame, text=f"Duração: {spell['duracao']}").pack(anchor="w")
-            custo_mana = spell.get('custo_mana', '0')
+            ttk.Label(spell_frame, text=f"Nível: {spell.nivel}").pack(anchor="w")
+            ttk.Label(spell_frame, text=f"Escola: {spell.escola}").pack(anchor="w")
+            ttk.Label(spell_frame, text=f"Tempo de Conjuração: {spell.tempo_conjuracao}").pack(anchor="w")
+            ttk.Label(spell_frame, text=f"Alcance: {spell.alcance}").pack(anchor="w")
+            ttk.Label(spell_frame, text=f"Componentes: {spell.componentes}").pack(anchor="w")
+            ttk.Label(spell_frame, text=f"Duração: {spell.duracao}").pack(anchor="w")
+            custo_mana = (spell.custo_mana or '0')
             ttk.Label(spell_frame, text=f"Custo de Mana: {custo_mana}").pack(anchor="w")
-            ttk.Label(spell_frame, text=f"Teste de Resistência: {spell['teste_resistencia']}").pack(anchor="w")
-            ttk.Label(spell_frame, text=f"Dano/Efeito: {spell['dano_efeito']}").pack(anchor="w")
+            ttk.Label(spell_frame, text=f"Teste de Resistência: {spell.teste_resistencia}").pack(anchor="w")
+            ttk.Label(spell_frame, text=f"Dano/Efeito: {spell.dano_efeito}").pack(anchor="w")
             ttk.Label(spell_frame, text="Descrição:").pack(anchor="w")
-            ttk.Label(spell_frame, text=spell['descricao'], wraplength=200).pack(anchor="w")
+            ttk.Label(spell_frame, text=spell.descricao, wraplength=200).pack(anchor="w")
             ttk.Label(spell_frame, text="Em Níveis Superiores:").pack(anchor="w")
-            ttk.Label(spell_frame, text=spell['niveis_superiores'], wraplength=200).pack(anchor="w")
+            ttk.Label(spell_frame, text=spell.niveis_superiores, wraplength=200).pack(anchor="w")
 
         # Configurar o grid para esticar
         self.spell_frame.grid_columnconfigure(0, weight=1)
@@ -3113,29 +3062,148 @@ class GrimoireScreen:
         self.page_var.set(f"Página {self.current_page + 1} de {self.total_pages}")
         self.display_spells()
 
-def normalize_data(data):
-    """Normaliza os dados do JSON para garantir compatibilidade com a versão atual."""
-    # Verificar e ajustar a estrutura de 'alignment'
-    if 'alignment' not in data:
-        data['alignment'] = {'moral': '', 'order': ''}
-    
-    # Garantir que 'moral' e 'order' existam
-    if 'moral' not in data['alignment']:
-        data['alignment']['moral'] = ''
-    if 'order' not in data['alignment']:
-        data['alignment']['order'] = ''
-    
-    # Verificar e ajustar a estrutura de 'classes'
-    if 'classes' not in data:
-        data['classes'] = {'Classe Primária': '', 'Classe Secundária': '', 'Classe Terciária': ''}
-    
-    # Verificar e ajustar a estrutura de 'basic_info'
-    if 'basic_info' not in data:
-        data['basic_info'] = {'Nome': '', 'Raça': '', 'Antecedente': '', 'Nível': '0'}
-    
-    return data
+class PdfExportDialog:
+    """Janela de andamento de uma exportação em PDF, com botão Cancelar.
+
+    O PDF é gerado em uma thread separada (sheet_pdf.write_sheet_pdf); o
+    andamento chega pela fila ``events`` e é lido na thread da interface.
+    """
+    def __init__(self, parent, sheet, file_path):
+        self.parent = parent
+        self.file_path = file_path
+        self.window = tk.Toplevel(parent.root)
+        self.window.title("Exportando PDF")
+        center_window(self.window, 360, 130)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.status_var = tk.StringVar(value="Preparando...")
+        ttk.Label(self.window, textvariable=self.status_var).pack(fill="x", padx=10, pady=(10, 5))
+        self.progress = ttk.Progressbar(self.window, mode="determinate", length=320)
+        self.progress.pack(padx=10, pady=5)
+        self.cancel_button = ttk.Button(self.window, text="Cancelar", command=self.cancel)
+        self.cancel_button.pack(pady=5)
+
+        self.events = queue.Queue()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(sheet,), name='pdf', daemon=True)
+        self.thread.start()
+        self.window.after(50, self.poll)
+
+    def run(self, sheet):
+        # Thread de exportação: não toca em widgets, só na fila
+        try:
+            write_sheet_pdf(sheet, self.file_path,
+                            progress=lambda *event: self.events.put(('progress', event)),
+                            cancelled=self.cancelled.is_set,
+                            cache=self.parent.pdf_cache)
+            self.events.put(('done', None))
+        except ExportCancelled:
+            self.events.put(('cancelled', None))
+        except Exception as e:
+            traceback.print_exc()
+            self.events.put(('error', e))
+
+    def poll(self):
+        """Mostra o andamento enviado pela thread de exportação"""
+        while True:
+            try:
+                kind, value = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                section, done, total = value
+                self.progress.configure(maximum=max(total, 1), value=done)
+                if not self.cancelled.is_set():
+                    self.status_var.set(f"{PDF_SECTIONS[section]} ({done} de {total})")
+                continue
+            self.window.destroy()
+            name = os.path.basename(self.file_path)
+            if kind == 'done':
+                messagebox.showinfo("Sucesso", "PDF exportado com sucesso!")
+            elif kind == 'cancelled':
+                self.parent.save_status_var.set(f"Exportação de {name} cancelada")
+            else:
+                messagebox.showerror("Erro", f"Erro ao exportar PDF: {str(value)}")
+            return
+        self.window.after(50, self.poll)
+
+    def cancel(self):
+        """Pede à thread que pare na próxima entrada"""
+        self.cancelled.set()
+        self.status_var.set("Cancelando...")
+        self.cancel_button.state(['disabled'])
+
+class CampaignPicker:
+    """Lista os personagens de um banco de campanha para importar um deles.
+
+    O filtro por magia usa o índice do banco ("quem conhece Bola de Fogo?").
+    """
+    def __init__(self, parent, db_path):
+        self.parent = parent
+        self.db_path = db_path
+        self.window = tk.Toplevel(parent.root)
+        self.window.title(f"Campanha - {os.path.basename(db_path)}")
+        self.window.geometry("400x450")
+
+        search_frame = ttk.Frame(self.window)
+        search_frame.pack(fill="x", padx=5, pady=5)
+
+        ttk.Label(search_frame, text="Conhece a magia:").pack(side="left", padx=5)
+        self.spell_var = tk.StringVar()
+        self.spell_var.trace('w', self.filter_characters)
+        ttk.Entry(search_frame, textvariable=self.spell_var).pack(side="left", fill="x", expand=True, padx=5)
+
+        list_container = ttk.Frame(self.window)
+        list_container.pack(fill="both", expand=True, padx=5, pady=5)
+
+        self.character_list = tk.Listbox(list_container)
+        self.character_list.pack(side="left", fill="both", expand=True)
+        self.character_list.bind('<Double-Button-1>', self.open_selected)
+
+        scrollbar = ttk.Scrollbar(list_container, orient="vertical", command=self.character_list.yview)
+        scrollbar.pack(side="right", fill="y")
+        self.character_list.config(yscrollcommand=scrollbar.set)
+
+        ttk.Button(self.window, text="Importar", command=self.open_selected).pack(pady=5)
+
+        self.character_ids = []
+        self.filter_characters()
+
+    def filter_characters(self, *args):
+        spell = self.spell_var.get().strip()
+        try:
+            with CampaignStore(self.db_path) as store:
+                if spell:
+                    rows = [(character_id, name, None, None)
+                            for character_id, name in store.characters_with_spell(spell)]
+                else:
+                    rows = store.characters()
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao ler a campanha: {str(e)}", parent=self.window)
+            return
+
+        self.character_list.delete(0, tk.END)
+        self.character_ids = []
+        for character_id, name, level, main_class in rows:
+            label = name or f"Personagem {character_id}"
+            if level is not None:
+                label += f" (nível {level})"
+            self.character_list.insert(tk.END, label)
+            self.character_ids.append(character_id)
+
+    def open_selected(self, event=None):
+        selected = self.character_list.curselection()
+        if not selected:
+            return
+        if self.parent.load_campaign_character(self.db_path, self.character_ids[selected[0]]):
+            self.window.destroy()
 
 if __name__ == "__main__":
+    # Com argumentos, executar as ferramentas de linha de comando (sem Tk)
+    if len(sys.argv) > 1:
+        import sheet_batch
+        sys.exit(sheet_batch.main(sys.argv[1:]))
+
     root = tk.Tk()
     app = FichaDnD(root)
     root.mainloop()
@@ -0,0 +1,382 @@
+"""Processamento em lote de fichas exportadas em JSON, sem interface gráfica.
+
+Uso (a partir de ficha.py):
+
+    python ficha.py recalcular DIRETORIO [--gravar] [--processos N]
+    python ficha.py migrar DIRETORIO [--processos N]
+    python ficha.py pdf (DIRETORIO | BANCO) [--saida DIRETORIO] [--processos N]
+    python ficha.py campanha importar BANCO DIRETORIO
+    python ficha.py campanha personagens BANCO
+    python ficha.py campanha magia BANCO NOME
+"""
+import argparse
+import copy
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sheet_model import CharacterSheet, StatsEngine, SKILLS, format_bonus, format_modifier
+from sheet_db import CampaignStore
+from sheet_migrations import SHEET_VERSION, migrate, needs_migration, sheet_version
+from sheet_pdf import write_sheet_pdf
+from sheet_storage import AssetStore, read_sheet, write_json_atomic
+
+
+def find_sheets(directory):
+    """Lista, em ordem, os arquivos .json de um diretório e subdiretórios"""
+    paths = []
+    for current, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith('.json'):
+                paths.append(os.path.join(current, name))
+    return sorted(paths)
+
+
+def expected_fields(data):
+    """Recalcula os campos derivados gravados na ficha.
+
+    Retorna uma lista de (seção, chave, campo, valor esperado) para cada
+    atributo e perícia presentes no dicionário. O dicionário não é
+    alterado: from_dict migra uma cópia, e atualizar o formato fica para
+    o comando migrar.
+    """
+    stats = StatsEngine(CharacterSheet.from_dict(copy.deepcopy(data)))
+    fields = []
+    attributes = data.get('attributes', {})
+    if isinstance(attributes, dict):
+        for attr, attr_data in attributes.items():
+            if attr in stats.sheet.attributes and isinstance(attr_data, dict):
+                fields.append(('attributes', attr, 'modifier', format_modifier(stats.modifier(attr))))
+                fields.append(('attributes', attr, 'save_total', format_bonus(stats.save_total(attr))))
+    skills = data.get('skills', {})
+    if isinstance(skills, dict):
+        for skill, skill_data in skills.items():
+            if skill in SKILLS and isinstance(skill_data, dict):
+                fields.append(('skills', skill, 'total', format_bonus(stats.skill_total(skill))))
+    return fields
+
+
+def check_sheet(data):
+    """Retorna as inconsistências como (seção, chave, campo, gravado, esperado)"""
+    issues = []
+    for section, key, field, expected in expected_fields(data):
+        stored = data[section][key].get(field)
+        if stored != expected:
+            issues.append((section, key, field, stored, expected))
+    return issues
+
+
+def process_file(path, write=False):
+    """Valida uma ficha e, se pedido, regrava os campos derivados.
+
+    Retorna (caminho, inconsistências, mensagem de erro ou None).
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        issues = check_sheet(data)
+        if issues and write:
+            for section, key, field, _, expected in issues:
+                data[section][key][field] = expected
+            write_json_atomic(path, data)
+        return path, issues, None
+    except Exception as e:
+        return path, [], str(e)
+
+
+def _process_for_pool(args):
+    return process_file(*args)
+
+
+def migrate_file(path):
+    """Regrava a ficha no formato atual, se ela for de uma versão anterior.
+
+    Retorna (caminho, versão original ou None se já estava atualizada,
+    mensagem de erro ou None).
+    """
+    try:
+        # Só as seções pequenas são decodificadas; as migrações das demais
+        # são aplicadas durante a gravação
+        data = read_sheet(path)
+        if not needs_migration(data):
+            return path, None, None
+        version = sheet_version(data)
+        write_json_atomic(path, migrate(data))
+        return path, version, None
+    except Exception as e:
+        return path, None, str(e)
+
+
+# Banco de campanha aberto por cada processo de render_character
+_campaign_store = None
+
+
+def _open_campaign(path):
+    global _campaign_store
+    if _campaign_store is None or _campaign_store.path != path:
+        if _campaign_store is not None:
+            _campaign_store.close()
+        _campaign_store = CampaignStore(path)
+    return _campaign_store
+
+
+def _render_pdf(label, load, output):
+    """Desenha a ficha devolvida por load() em output.
+
+    Retorna (rótulo, arquivo gerado, segundos, bytes, mensagem de erro ou None).
+    """
+    start = time.perf_counter()
+    try:
+        size = write_sheet_pdf(load(), output)
+        return label, output, time.perf_counter() - start, size, None
+    except Exception as e:
+        return label, output, time.perf_counter() - start, 0, str(e)
+
+
+def render_file(args):
+    """Gera o PDF de uma ficha JSON (args: caminho da ficha, caminho do PDF)"""
+    path, output = args
+    # O retrato vai junto no JSON anexado ao PDF
+    return _render_pdf(path, lambda: CharacterSheet.from_dict(read_sheet(path),
+                                                              AssetStore.for_sheet(path)), output)
+
+
+def render_character(args):
+    """Gera o PDF de um personagem do banco (args: banco, id, caminho do PDF)"""
+    database, character_id, output = args
+
+    def load():
+        store = _open_campaign(database)
+        return CharacterSheet.from_dict(store.load_sheet(character_id), store.assets)
+
+    return _render_pdf(f"{database}#{character_id}", load, output)
+
+
+def pdf_file_name(character_id, name):
+    """Nome do PDF de um personagem do banco, seguro em qualquer sistema"""
+    name = re.sub(r'[^\w.-]+', '_', name or '').strip('._')
+    return f"{character_id:04d}-{name}.pdf" if name else f"{character_id:04d}.pdf"
+
+
+def _map_files(function, items, count, workers):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, count // ((workers or os.cpu_count() or 1) * 8))
+        yield from executor.map(function, items, chunksize=chunksize)
+
+
+def run_batch(paths, write=False, workers=None):
+    """Processa as fichas em paralelo, produzindo os resultados em ordem"""
+    return _map_files(_process_for_pool, ((path, write) for path in paths), len(paths), workers)
+
+
+def recalculate_command(args):
+    paths = find_sheets(args.diretorio)
+    start = time.perf_counter()
+    inconsistent = errors = 0
+    for path, issues, error in run_batch(paths, write=args.gravar, workers=args.processos):
+        if error:
+            errors += 1
+            print(f"{path}: erro: {error}", file=sys.stderr)
+        elif issues:
+            inconsistent += 1
+            print(f"{path}: {len(issues)} campo(s) divergente(s)" +
+                  (" (regravado)" if args.gravar else ""))
+            for section, key, field, stored, expected in issues:
+                print(f"    {key}.{field}: {stored!r} -> {expected!r}")
+    elapsed = time.perf_counter() - start
+    rate = len(paths) / elapsed if elapsed > 0 else 0.0
+    print(f"{len(paths)} fichas, {inconsistent} inconsistentes, {errors} erros "
+          f"em {elapsed:.2f}s ({rate:.1f} fichas/s)")
+    if errors or (inconsistent and not args.gravar):
+        return 1
+    return 0
+
+
+def migrate_command(args):
+    paths = find_sheets(args.diretorio)
+    start = time.perf_counter()
+    migrated = errors = 0
+    for path, version, error in _map_files(migrate_file, paths, len(paths), args.processos):
+        if error:
+            errors += 1
+            print(f"{path}: erro: {error}", file=sys.stderr)
+        elif version:
+            migrated += 1
+            print(f"{path}: {version} -> {SHEET_VERSION}")
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths)} fichas, {migrated} migradas, {errors} erros em {elapsed:.2f}s")
+    return 1 if errors else 0
+
+
+def pdf_jobs(source, output_directory=None):
+    """Fichas a desenhar: (função do processo, [argumentos]).
+
+    source é um diretório de fichas JSON ou um banco de campanha. Sem
+    output_directory, cada PDF fica ao lado da sua ficha (ou do banco); com
+    ele, a estrutura de subdiretórios das fichas é mantida.
+    """
+    if os.path.isdir(source):
+        jobs = []
+        for path in find_sheets(source):
+            output = os.path.splitext(path)[0] + '.pdf'
+            if output_directory:
+                output = os.path.join(output_directory, os.path.relpath(output, source))
+            jobs.append((path, output))
+        return render_file, jobs
+    if not os.path.isfile(source):
+        raise FileNotFoundError(f"Diretório ou banco não encontrado: {source}")
+    output_directory = output_directory or os.path.dirname(os.path.abspath(source))
+    with CampaignStore(source) as store:
+        characters = store.characters()
+    database = os.path.abspath(source)
+    return render_character, [
+        (database, character_id, os.path.join(output_directory, pdf_file_name(character_id, name)))
+        for character_id, name, _, _ in characters
+    ]
+
+
+def pdf_command(args):
+    try:
+        function, jobs = pdf_jobs(args.origem, args.saida)
+    except (OSError, sqlite3.Error) as e:
+        print(f"erro: {e}", file=sys.stderr)
+        return 1
+    for directory in {os.path.dirname(os.path.abspath(job[-1])) for job in jobs}:
+        os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    errors = 0
+    rendering = 0.0
+    for label, output, elapsed, size, error in _map_files(function, jobs, len(jobs), args.processos):
+        rendering += elapsed
+        if error:
+            errors += 1
+            print(f"{label}: erro: {error}", file=sys.stderr)
+        else:
+            print(f"{label} -> {output} ({elapsed * 1000:.0f} ms, {size / 1024:.0f} KiB)")
+    elapsed = time.perf_counter() - start
+    rate = len(jobs) / elapsed if elapsed > 0 else 0.0
+    print(f"{len(jobs) - errors} PDFs, {errors} erros em {elapsed:.2f}s "
+          f"({rate:.1f} fichas/s; {rendering:.2f}s somando os processos)")
+    return 1 if errors else 0
+
+
+def campaign_import_command(args):
+    """Importa as fichas JSON de um diretório para o banco de campanha"""
+    paths = find_sheets(args.diretorio)
+    start = time.perf_counter()
+    errors = 0
+    with CampaignStore(args.banco) as store:
+        for path in paths:
+            try:
+                # Normaliza a ficha pelo modelo; o retrato vai para o banco
+                sheet = CharacterSheet.from_dict(read_sheet(path, deferred=()),
+                                                 AssetStore.for_sheet(path))
+                data = sheet.to_dict(inline_photo=False)
+                assets = {data['photo_ref']: sheet.photo} if sheet.photo else None
+                character_id = store.save_sheet(data, assets)
+                print(f"{path}: personagem {character_id}")
+            except Exception as e:
+                errors += 1
+                print(f"{path}: erro: {e}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths) - errors} fichas importadas, {errors} erros em {elapsed:.2f}s")
+    return 1 if errors else 0
+
+
+def campaign_characters_command(args):
+    with CampaignStore(args.banco) as store:
+        for character_id, name, level, main_class in store.characters():
+            print(f"{character_id:5}  {name or '-'}  nível {level if level is not None else '-'}"
+                  f"  {main_class or ''}".rstrip())
+    return 0
+
+
+def campaign_spell_command(args):
+    start = time.perf_counter()
+    with CampaignStore(args.banco) as store:
+        owners = store.characters_with_spell(args.nome)
+    elapsed = time.perf_counter() - start
+    for character_id, name in owners:
+        print(f"{character_id:5}  {name or '-'}")
+    print(f"{len(owners)} personagem(ns) com {args.nome!r} ({elapsed * 1000:.1f} ms)")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='ficha.py',
+        description="Ferramentas de linha de comando da Ficha de D&D 5.5E "
+                    "(sem argumentos, abre a interface gráfica)."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    recalculate = commands.add_parser(
+        'recalcular',
+        help="recalcula e valida modificadores, saves e perícias de fichas JSON"
+    )
+    recalculate.add_argument('diretorio', help="diretório com as fichas exportadas")
+    recalculate.add_argument('--gravar', action='store_true',
+                             help="regrava os campos derivados das fichas inconsistentes")
+    recalculate.add_argument('--processos', type=int, default=None,
+                             help="número de processos (padrão: núcleos disponíveis)")
+    recalculate.set_defaults(handler=recalculate_command)
+
+    migrate_parser = commands.add_parser(
+        'migrar',
+        help=f"regrava fichas JSON de versões anteriores no formato {SHEET_VERSION}"
+    )
+    migrate_parser.add_argument('diretorio', help="diretório com as fichas exportadas")
+    migrate_parser.add_argument('--processos', type=int, default=None,
+                                help="número de processos (padrão: núcleos disponíveis)")
+    migrate_parser.set_defaults(handler=migrate_command)
+
+    pdf_parser = commands.add_parser(
+        'pdf',
+        help="gera os PDFs das fichas de um diretório ou de um banco de campanha"
+    )
+    pdf_parser.add_argument('origem', help="diretório com as fichas exportadas ou arquivo do banco")
+    pdf_parser.add_argument('--saida', default=None,
+                            help="diretório dos PDFs (padrão: ao lado das fichas ou do banco)")
+    pdf_parser.add_argument('--processos', type=int, default=None,
+                            help="número de processos (padrão: núcleos disponíveis)")
+    pdf_parser.set_defaults(handler=pdf_command)
+
+    campaign = commands.add_parser(
+        'campanha',
+        help="banco SQLite com os personagens, magias e itens de uma campanha"
+    )
+    campaign_commands = campaign.add_subparsers(dest='campaign_command', required=True)
+
+    campaign_import = campaign_commands.add_parser(
+        'importar', help="importa as fichas JSON de um diretório para o banco"
+    )
+    campaign_import.add_argument('banco', help="arquivo do banco (criado se não existir)")
+    campaign_import.add_argument('diretorio', help="diretório com as fichas exportadas")
+    campaign_import.set_defaults(handler=campaign_import_command)
+
+    campaign_characters = campaign_commands.add_parser(
+        'personagens', help="lista os personagens do banco"
+    )
+    campaign_characters.add_argument('banco', help="arquivo do banco")
+    campaign_characters.set_defaults(handler=campaign_characters_command)
+
+    campaign_spell = campaign_commands.add_parser(
+        'magia', help="lista os personagens que conhecem uma magia"
+    )
+    campaign_spell.add_argument('banco', help="arquivo do banco")
+    campaign_spell.add_argument('nome', help="nome da magia (sem diferenciar maiúsculas)")
+    campaign_spell.set_defaults(handler=campaign_spell_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
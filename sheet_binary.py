@@ -0,0 +1,235 @@
+"""Formato binário compacto para o dicionário de export_to_json.
+
+Equivalente ao JSON da ficha: ``loads(dumps(data)) == data`` para qualquer
+ficha. O arquivo tem um cabeçalho (``FDND``, versão do formato e tamanho
+do corpo) seguido do corpo comprimido com zlib:
+
+- tabela de strings: todas as strings da ficha (chaves e valores), cada
+  uma gravada uma única vez; os valores se referem a elas pelo índice
+- valores com uma etiqueta de um byte e tamanhos prefixados (struct)
+- listas de dicionários com as mesmas chaves (magias, itens, ...) são
+  gravadas como linhas: as chaves uma vez, depois só os valores
+- ``photo_data`` guarda os bytes da imagem, não o texto em base64
+"""
+import base64
+import binascii
+import struct
+import zlib
+from itertools import accumulate
+
+MAGIC = b'FDND'
+FORMAT_VERSION = 1
+
+# Extensão dos arquivos de ficha neste formato
+BINARY_EXTENSION = '.ficha'
+
+_HEADER = struct.Struct('<4sBI')
+_COUNT = struct.Struct('<I')
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+
+_NONE, _TRUE, _FALSE, _INT_TAG, _BIG_INT, _FLOAT_TAG, _STRING, _BASE64, _LIST, _DICT, _ROWS = (
+    b'N', b'T', b'F', b'I', b'J', b'D', b'S', b'B', b'L', b'M', b'R')
+
+# Chaves de primeiro nível gravadas como bytes em vez de base64
+_BASE64_KEYS = ('photo_data',)
+
+
+def is_binary(blob):
+    return blob[:len(MAGIC)] == MAGIC
+
+
+class _Encoder:
+    def __init__(self):
+        self.strings = {}
+        self.parts = []
+
+    def string(self, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def value(self, value):
+        parts = self.parts
+        if value is None:
+            parts.append(_NONE)
+        elif value is True:
+            parts.append(_TRUE)
+        elif value is False:
+            parts.append(_FALSE)
+        elif isinstance(value, str):
+            parts.append(_STRING + _COUNT.pack(self.string(value)))
+        elif isinstance(value, int):
+            if -2 ** 63 <= value < 2 ** 63:
+                parts.append(_INT_TAG + _INT.pack(value))
+            else:
+                parts.append(_BIG_INT + _COUNT.pack(self.string(str(value))))
+        elif isinstance(value, float):
+            parts.append(_FLOAT_TAG + _FLOAT.pack(value))
+        elif isinstance(value, dict):
+            self.mapping(value)
+        elif isinstance(value, (list, tuple)):
+            self.sequence(value)
+        else:
+            raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+    def mapping(self, value, base64_keys=()):
+        parts = self.parts
+        parts.append(_DICT + _COUNT.pack(len(value)))
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"Chave inválida: {key!r}")
+            parts.append(_COUNT.pack(self.string(key)))
+            if key in base64_keys and isinstance(item, str):
+                raw = _decode_base64(item)
+                if raw is not None:
+                    parts.append(_BASE64 + _COUNT.pack(len(raw)) + raw)
+                    continue
+            self.value(item)
+
+    def sequence(self, value):
+        parts = self.parts
+        keys = _common_keys(value)
+        if keys is None:
+            parts.append(_LIST + _COUNT.pack(len(value)))
+            for item in value:
+                self.value(item)
+            return
+        parts.append(_ROWS + _COUNT.pack(len(value)) + _COUNT.pack(len(keys)))
+        parts.extend(_COUNT.pack(self.string(key)) for key in keys)
+        for row in value:
+            for item in row.values():
+                self.value(item)
+
+
+def _common_keys(items):
+    """Chaves comuns se todos os itens forem dicionários com as mesmas chaves"""
+    if not items or type(items[0]) is not dict:
+        return None
+    keys = list(items[0])
+    for item in items:
+        if type(item) is not dict or list(item) != keys:
+            return None
+    if not all(isinstance(key, str) for key in keys):
+        return None
+    return keys
+
+
+def _decode_base64(text):
+    # Só aceita base64 canônico, para que o texto volte idêntico na leitura
+    try:
+        raw = base64.b64decode(text, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return raw if base64.b64encode(raw).decode('ascii') == text else None
+
+
+def dumps(data, level=6):
+    """Serializa o dicionário da ficha no formato binário"""
+    encoder = _Encoder()
+    encoder.mapping(data, _BASE64_KEYS)
+    strings = list(encoder.strings)
+    lengths = struct.pack(f'<{len(strings)}I', *map(len, strings))
+    text = ''.join(strings).encode('utf-8', 'surrogatepass')
+    body = b''.join([
+        _COUNT.pack(len(strings)), lengths,
+        _COUNT.pack(len(text)), text,
+    ] + encoder.parts)
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, len(body)) + zlib.compress(body, level)
+
+
+def loads(blob):
+    """Lê um arquivo no formato binário e retorna o dicionário da ficha"""
+    magic, version, size = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Não é uma ficha no formato binário")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Versão do formato binário não suportada: {version}")
+    body = zlib.decompress(memoryview(blob)[_HEADER.size:])
+    if len(body) != size:
+        raise ValueError("Ficha binária truncada")
+
+    count, = _COUNT.unpack_from(body, 0)
+    position = _COUNT.size
+    # Tamanhos em caracteres: o texto é decodificado uma única vez e fatiado
+    lengths = struct.unpack_from(f'<{count}I', body, position)
+    position += 4 * count
+    text_size, = _COUNT.unpack_from(body, position)
+    position += _COUNT.size
+    text = body[position:position + text_size].decode('utf-8', 'surrogatepass')
+    position += text_size
+    ends = list(accumulate(lengths))
+    strings = [text[end - length:end] for end, length in zip(ends, lengths)]
+
+    unpack_count = _COUNT.unpack_from
+    unpack_int = _INT.unpack_from
+    unpack_float = _FLOAT.unpack_from
+
+    def value(position):
+        tag = body[position]
+        position += 1
+        if tag == 0x53:  # S
+            return strings[unpack_count(body, position)[0]], position + 4
+        if tag == 0x49:  # I
+            return unpack_int(body, position)[0], position + 8
+        if tag == 0x4D:  # M
+            size, = unpack_count(body, position)
+            position += 4
+            result = {}
+            for _ in range(size):
+                key = strings[unpack_count(body, position)[0]]
+                position += 4
+                # Strings são a maioria dos valores: lidas sem chamar value()
+                if body[position] == 0x53:
+                    result[key] = strings[unpack_count(body, position + 1)[0]]
+                    position += 5
+                else:
+                    result[key], position = value(position)
+            return result, position
+        if tag == 0x52:  # R
+            rows, width = struct.unpack_from('<II', body, position)
+            position += 8
+            keys = [strings[index] for index in
+                    struct.unpack_from(f'<{width}I', body, position)]
+            position += 4 * width
+            result = []
+            for _ in range(rows):
+                row = {}
+                for key in keys:
+                    if body[position] == 0x53:
+                        row[key] = strings[unpack_count(body, position + 1)[0]]
+                        position += 5
+                    else:
+                        row[key], position = value(position)
+                result.append(row)
+            return result, position
+        if tag == 0x4C:  # L
+            size, = unpack_count(body, position)
+            position += 4
+            result = []
+            for _ in range(size):
+                item, position = value(position)
+                result.append(item)
+            return result, position
+        if tag == 0x4E:  # N
+            return None, position
+        if tag == 0x54:  # T
+            return True, position
+        if tag == 0x46:  # F
+            return False, position
+        if tag == 0x44:  # D
+            return unpack_float(body, position)[0], position + 8
+        if tag == 0x4A:  # J
+            return int(strings[unpack_count(body, position)[0]]), position + 4
+        if tag == 0x42:  # B
+            size, = unpack_count(body, position)
+            position += 4
+            raw = body[position:position + size]
+            return base64.b64encode(raw).decode('ascii'), position + size
+        raise ValueError(f"Etiqueta desconhecida na posição {position - 1}: {tag!r}")
+
+    data, position = value(position)
+    if position != len(body) or not isinstance(data, dict):
+        raise ValueError("Ficha binária corrompida")
+    return data
@@ -0,0 +1,242 @@
+"""Campanha em SQLite: vários personagens e suas listas em um só banco.
+
+Cada personagem é uma linha de ``characters`` (com o restante da ficha em
+JSON); magias, itens, habilidades e talentos ficam em tabelas próprias,
+indexadas por nome, nível, escola e dono. Perguntas como "quem conhece Bola
+de Fogo?" viram uma busca no índice em vez da leitura de cada arquivo.
+
+O banco usa WAL, então outros processos (a linha de comando, outra janela)
+podem ler enquanto a ficha é gravada.
+"""
+import json
+import sqlite3
+import time
+
+from sheet_storage import DeferredSection, asset_ref
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS characters (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    level INTEGER,
+    main_class TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS characters_name ON characters (name_key);
+CREATE INDEX IF NOT EXISTS characters_level ON characters (level);
+
+CREATE TABLE IF NOT EXISTS spells (
+    owner INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    level INTEGER,
+    school TEXT,
+    prepared INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (owner, position)
+);
+CREATE INDEX IF NOT EXISTS spells_name ON spells (name_key);
+CREATE INDEX IF NOT EXISTS spells_level ON spells (level);
+CREATE INDEX IF NOT EXISTS spells_school ON spells (school);
+
+CREATE TABLE IF NOT EXISTS assets (
+    ref TEXT PRIMARY KEY,
+    content BLOB NOT NULL
+);
+"""
+
+# Listas simples (sem colunas próprias além do nome)
+_LIST_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    owner INTEGER NOT NULL REFERENCES characters (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (owner, position)
+);
+CREATE INDEX IF NOT EXISTS {table}_name ON {table} (name_key);
+"""
+
+# Seção da ficha -> tabela do banco
+SECTION_TABLES = {
+    'spells': 'spells',
+    'inventory': 'items',
+    'abilities': 'abilities',
+    'features': 'features',
+}
+
+
+def name_key(name):
+    """Forma usada nas buscas por nome (sem diferenciar maiúsculas)"""
+    return str(name or '').strip().casefold()
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class DatabaseAssets:
+    """Retratos guardados na tabela ``assets``, com a interface do AssetStore"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def put(self, data, ref=None):
+        ref = ref or asset_ref(data)
+        self.connection.execute(
+            "INSERT OR IGNORE INTO assets (ref, content) VALUES (?, ?)", (ref, data))
+        return ref
+
+    def get(self, ref):
+        """Conteúdo de uma referência; FileNotFoundError se não houver, como no AssetStore"""
+        row = self.connection.execute(
+            "SELECT content FROM assets WHERE ref = ?", (ref,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(ref)
+        return bytes(row[0])
+
+
+class CampaignStore:
+    """Banco SQLite de uma campanha.
+
+        with CampaignStore('campanha.db') as store:
+            character_id = store.save_sheet(sheet.to_dict(inline_photo=False),
+                                            {sheet.photo_ref: sheet.photo})
+            store.characters_with_spell('Bola de Fogo')
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.assets = DatabaseAssets(self.connection)
+        self._create_schema()
+
+    def _create_schema(self):
+        version, = self.connection.execute("PRAGMA user_version").fetchone()
+        if version >= SCHEMA_VERSION:
+            return
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            for table in ('items', 'abilities', 'features'):
+                self.connection.executescript(_LIST_TABLE.format(table=table))
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def save_sheet(self, data, assets=None, character_id=None):
+        """Grava o dicionário de uma ficha e retorna o id do personagem.
+
+        Com character_id de um personagem existente, ele é substituído;
+        senão um novo personagem é criado. assets ({ref: bytes}) são os
+        retratos referenciados em ``photo_ref``.
+        """
+        data = {key: value.load() if isinstance(value, DeferredSection) else value
+                for key, value in data.items()}
+        core = {key: value for key, value in data.items() if key not in SECTION_TABLES}
+        basic_info = core.get('basic_info') or {}
+        name = basic_info.get('Nome', '')
+        row = (name, name_key(name), _to_int(basic_info.get('Nível')),
+               core.get('main_class'), _dumps(core), time.time())
+
+        with self.connection:
+            if character_id is not None and self.connection.execute(
+                    "SELECT 1 FROM characters WHERE id = ?", (character_id,)).fetchone():
+                self.connection.execute(
+                    "UPDATE characters SET name = ?, name_key = ?, level = ?, main_class = ?, "
+                    "data = ?, updated_at = ? WHERE id = ?", row + (character_id,))
+                for table in SECTION_TABLES.values():
+                    self.connection.execute(f"DELETE FROM {table} WHERE owner = ?", (character_id,))
+            else:
+                character_id = self.connection.execute(
+                    "INSERT INTO characters (name, name_key, level, main_class, data, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", row).lastrowid
+
+            self.connection.executemany(
+                "INSERT INTO spells (owner, position, name, name_key, level, school, prepared, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(character_id, position, spell.get('nome', ''), name_key(spell.get('nome')),
+                  _to_int(spell.get('nivel')), spell.get('escola') or None,
+                  int(bool(spell.get('preparada'))), _dumps(spell))
+                 for position, spell in enumerate(data.get('spells') or [])])
+            for section in ('inventory', 'abilities', 'features'):
+                self.connection.executemany(
+                    f"INSERT INTO {SECTION_TABLES[section]} (owner, position, name, name_key, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(character_id, position, entry.get('nome', ''), name_key(entry.get('nome')),
+                      _dumps(entry))
+                     for position, entry in enumerate(data.get(section) or [])])
+
+            for ref, content in (assets or {}).items():
+                self.assets.put(content, ref)
+        return character_id
+
+    def load_sheet(self, character_id):
+        """Dicionário da ficha de um personagem (como o de export_to_json)"""
+        row = self.connection.execute(
+            "SELECT data FROM characters WHERE id = ?", (character_id,)).fetchone()
+        if row is None:
+            raise KeyError(character_id)
+        data = json.loads(row[0])
+        for section, table in SECTION_TABLES.items():
+            data[section] = [
+                json.loads(entry) for entry, in self.connection.execute(
+                    f"SELECT data FROM {table} WHERE owner = ? ORDER BY position",
+                    (character_id,))
+            ]
+        return data
+
+    def delete_character(self, character_id):
+        with self.connection:
+            self.connection.execute("DELETE FROM characters WHERE id = ?", (character_id,))
+
+    def characters(self):
+        """Lista (id, nome, nível, classe principal) dos personagens"""
+        return self.connection.execute(
+            "SELECT id, name, level, main_class FROM characters ORDER BY name_key, id").fetchall()
+
+    def characters_with_spell(self, spell_name):
+        """Personagens (id, nome) que têm a magia, pelo índice de nomes"""
+        return self.connection.execute(
+            "SELECT DISTINCT c.id, c.name FROM spells s JOIN characters c ON c.id = s.owner "
+            "WHERE s.name_key = ? ORDER BY c.name_key, c.id", (name_key(spell_name),)).fetchall()
+
+    def characters_with_item(self, item_name):
+        """Personagens (id, nome) que têm o item no inventário"""
+        return self.connection.execute(
+            "SELECT DISTINCT c.id, c.name FROM items i JOIN characters c ON c.id = i.owner "
+            "WHERE i.name_key = ? ORDER BY c.name_key, c.id", (name_key(item_name),)).fetchall()
+
+    def find_spells(self, level=None, school=None, owner=None):
+        """Magias (dono, nome, nível, escola) filtradas por nível, escola e dono"""
+        conditions, params = [], []
+        for column, value in (('level', level), ('school', school), ('owner', owner)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.connection.execute(
+            f"SELECT owner, name, level, school FROM spells {where} "
+            "ORDER BY owner, position", params).fetchall()
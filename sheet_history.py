@@ -0,0 +1,138 @@
+"""Desfazer e refazer alterações da ficha.
+
+O histórico guarda as próprias alterações (registros Change de
+CharacterSheet), não cópias da ficha: cada passo é a lista de alterações de
+uma ação do usuário, e desfazer aplica as operações inversas em ordem
+contrária. Os valores antigos e novos são os mesmos objetos que estavam na
+ficha (registros, listas, strings), compartilhados em vez de copiados, então
+um passo custa algumas centenas de bytes mesmo em fichas com milhares de
+magias. Como os passos são desfeitos e refeitos estritamente em ordem, uma
+lista ou dicionário compartilhado volta ao estado que tinha quando a
+alteração foi registrada.
+
+    history = UndoHistory(sheet)
+    sheet.listeners.append(history.record)
+    ...
+    history.checkpoint()   # fim de uma ação
+    history.undo()
+"""
+from collections import deque
+
+from sheet_model import Change
+
+# Passos mantidos por padrão; os mais antigos são descartados
+HISTORY_LIMIT = 1000
+
+
+def inverse(change):
+    """Alteração que desfaz change"""
+    if change.op == 'set':
+        return Change('set', change.path, change.old, change.value)
+    if change.op == 'insert':
+        return Change('remove', change.path, None, change.value)
+    return Change('insert', change.path, change.old, None)
+
+
+def apply_change(sheet, change):
+    """Aplica uma alteração registrada à ficha"""
+    path = change.path
+    if change.op == 'set':
+        sheet.set(path, change.value)
+    elif change.op == 'insert':
+        sheet.insert(path[:-1], path[-1], change.value)
+    else:
+        sheet.remove(path[:-1], path[-1])
+
+
+def _single_set(step):
+    return len(step) == 1 and step[0].op == 'set'
+
+
+class UndoHistory:
+    """Pilhas de desfazer/refazer de uma ficha.
+
+    As alterações recebidas por ``record`` formam um passo até a próxima
+    chamada de ``checkpoint``; com schedule (ex.: ``root.after_idle``), o
+    checkpoint é agendado quando o passo começa, então cada ciclo do laço
+    de eventos vira um passo. Edições seguidas do mesmo campo (digitar um
+    nome, por exemplo) são juntadas em um único passo.
+    """
+
+    def __init__(self, sheet, limit=HISTORY_LIMIT, schedule=None):
+        self.sheet = sheet
+        self.schedule = schedule
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = []
+        self._step = None
+        self._replaying = False
+
+    @property
+    def can_undo(self):
+        return bool(self._step or self.undo_stack)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_stack) and not self._step
+
+    def record(self, change):
+        """Ouvinte da ficha: acrescenta a alteração ao passo atual"""
+        if self._replaying:
+            return
+        if self._step is None:
+            self._step = []
+            # Uma edição nova descarta o que havia para refazer
+            self.redo_stack.clear()
+            if self.schedule is not None:
+                self.schedule(self.checkpoint)
+        self._step.append(change)
+
+    def checkpoint(self):
+        """Fecha o passo atual; as próximas alterações começam outro passo"""
+        step, self._step = self._step, None
+        if not step:
+            return
+        previous = self.undo_stack[-1] if self.undo_stack else None
+        if (previous and _single_set(step) and _single_set(previous)
+                and step[0].path == previous[0].path):
+            self.undo_stack.pop()
+            merged = Change('set', step[0].path, step[0].value, previous[0].old)
+            if merged.value == merged.old and type(merged.value) is type(merged.old):
+                # O campo voltou ao valor original: não há o que desfazer
+                return
+            step = [merged]
+        self.undo_stack.append(step)
+
+    def clear(self):
+        """Esquece todos os passos (ex.: ao carregar outra ficha)"""
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self._step = None
+
+    def undo(self):
+        """Desfaz o último passo e retorna as alterações aplicadas"""
+        self.checkpoint()
+        if not self.undo_stack:
+            return []
+        step = self.undo_stack.pop()
+        changes = self._replay([inverse(change) for change in reversed(step)])
+        self.redo_stack.append(step)
+        return changes
+
+    def redo(self):
+        """Refaz o último passo desfeito e retorna as alterações aplicadas"""
+        self.checkpoint()
+        if not self.redo_stack:
+            return []
+        step = self.redo_stack.pop()
+        changes = self._replay(step)
+        self.undo_stack.append(step)
+        return changes
+
+    def _replay(self, changes):
+        self._replaying = True
+        try:
+            for change in changes:
+                apply_change(self.sheet, change)
+        finally:
+            self._replaying = False
+        return changes
@@ -0,0 +1,214 @@
+"""Diário de alterações de uma ficha, gravado ao lado do arquivo.
+
+Em vez de regravar a ficha inteira a cada edição, cada alteração do modelo
+(um registro Change de CharacterSheet) vira uma linha JSON acrescentada a
+``<ficha>.journal``. De tempos em tempos a interface grava um snapshot
+completo da ficha e o diário é compactado: as linhas já incluídas no
+snapshot são descartadas.
+
+A primeira linha do diário identifica o arquivo da ficha a que ele se
+aplica (tamanho e data de modificação). Se o programa for encerrado entre
+dois snapshots, ``ChangeJournal.recover`` reaplica as alterações do diário
+à ficha lida do disco; um diário de outra versão do arquivo é ignorado.
+
+    journal, recovered = ChangeJournal.recover(path, sheet)
+    sheet.listeners.append(journal.append)
+"""
+import json
+import os
+import threading
+
+from sheet_records import Record, SECTION_RECORDS, records_from_dicts
+from sheet_storage import AssetStore, write_atomic
+
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_FORMAT = 1
+
+
+def journal_path(sheet_path):
+    return sheet_path + JOURNAL_SUFFIX
+
+
+def _file_base(path):
+    """Identificação do conteúdo atual do arquivo da ficha"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _plain(value):
+    """Valor da alteração no formato do JSON da ficha"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def apply_record(sheet, record, assets=None):
+    """Reaplica à ficha uma alteração lida do diário"""
+    path = tuple(record['path'])
+    op = record['op']
+    if op == 'remove':
+        sheet.remove(path[:-1], path[-1])
+        return
+    if 'asset' in record:
+        # Retratos ficam no AssetStore; o diário guarda só a referência
+        value = assets.get(record['asset']) if assets else None
+    else:
+        value = record.get('value')
+        cls = SECTION_RECORDS.get(path[0])
+        if cls is not None and len(path) == 1:
+            value = records_from_dicts(cls, value)
+        elif cls is not None and len(path) == 2:
+            value = cls.from_dict(value)
+    if op == 'set':
+        sheet.set(path, value)
+    elif op == 'insert':
+        sheet.insert(path[:-1], path[-1], value)
+    else:
+        raise ValueError(f"Operação desconhecida no diário: {op!r}")
+
+
+class ChangeJournal:
+    """Diário de alterações do arquivo de uma ficha.
+
+    ``append`` é chamado na thread da interface (como ouvinte da ficha) e
+    ``rebase`` na thread que grava os snapshots; as duas usam o mesmo lock.
+    As linhas ainda não incluídas em um snapshot ficam também em memória,
+    para que a compactação não precise reler o arquivo.
+    """
+
+    def __init__(self, sheet_path):
+        self.sheet_path = sheet_path
+        self.path = journal_path(sheet_path)
+        self.assets = AssetStore.for_sheet(sheet_path)
+        # Número da última alteração registrada
+        self.seq = 0
+        self._lines = []
+        self._file = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Alterações registradas desde o último snapshot"""
+        return len(self._lines)
+
+    @classmethod
+    def recover(cls, sheet_path, sheet):
+        """Abre o diário da ficha, reaplicando a ela as alterações pendentes.
+
+        Retorna (diário, número de alterações recuperadas). A ficha deve
+        ter sido lida do arquivo em sheet_path e ainda não ter ouvintes.
+        """
+        journal = cls(sheet_path)
+        base, records = journal._read()
+        if base is not None and base == _file_base(sheet_path):
+            for seq, line, record in records:
+                try:
+                    apply_record(sheet, record, journal.assets)
+                except (LookupError, TypeError, ValueError, OSError):
+                    # O restante dependeria da alteração que falhou
+                    break
+                journal._lines.append((seq, line))
+                journal.seq = seq
+        journal._rewrite(_file_base(sheet_path))
+        return journal, journal.pending
+
+    @classmethod
+    def start(cls, sheet_path):
+        """Diário vazio para um arquivo cujo primeiro snapshot ainda vai ser gravado"""
+        journal = cls(sheet_path)
+        journal._rewrite(None)
+        return journal
+
+    def _read(self):
+        """Lê (base, [(seq, linha, registro)]), ignorando um final truncado"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                lines = file.readlines()
+        except OSError:
+            return None, []
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return None, []
+        if header.get('journal') != JOURNAL_FORMAT:
+            return None, []
+        records = []
+        for line in lines[1:]:
+            if not line.endswith('\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            records.append((record.get('n', 0), line, record))
+        return header.get('base'), records
+
+    def _rewrite(self, base):
+        # Chamado com o lock (ou antes de o diário ser compartilhado)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        header = _dumps({'journal': JOURNAL_FORMAT, 'base': base})
+        write_atomic(self.path, (header + ''.join(line for _, line in self._lines)).encode('utf-8'))
+        if not self._closed:
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def append(self, change):
+        """Ouvinte da ficha: acrescenta a alteração ao diário"""
+        self.seq += 1
+        record = {'n': self.seq, 'op': change.op, 'path': list(change.path)}
+        if isinstance(change.value, bytes):
+            record['asset'] = self.assets.put(change.value)
+        elif change.op != 'remove':
+            record['value'] = _plain(change.value)
+        line = _dumps(record)
+        with self._lock:
+            self._lines.append((self.seq, line))
+            if self._file is not None:
+                self._file.write(line)
+                # Chega ao sistema operacional: sobrevive ao fim do processo
+                self._file.flush()
+
+    def rebase(self, seq):
+        """Descarta as alterações até seq, já gravadas no arquivo da ficha.
+
+        Chamado depois que o snapshot tirado com o diário em seq foi gravado.
+        """
+        with self._lock:
+            self._lines = [(n, line) for n, line in self._lines if n > seq]
+            if self._closed and not self._lines:
+                self._remove()
+            else:
+                self._rewrite(_file_base(self.sheet_path))
+
+    def close(self):
+        """Encerra o diário; ele é apagado quando a ficha em disco estiver completa.
+
+        Se ainda houver alterações pendentes, o arquivo continua até que um
+        snapshot em andamento chame rebase.
+        """
+        with self._lock:
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if not self._lines:
+                self._remove()
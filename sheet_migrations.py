@@ -0,0 +1,146 @@
+"""Atualização de fichas de versões antigas para o formato atual.
+
+Cada passo converte o dicionário de uma versão para a seguinte e é
+registrado em MIGRATIONS pela versão de origem. ``migrate`` aplica os
+passos em sequência até SHEET_VERSION; uma ficha já na versão atual não
+passa por nenhum deles, e CharacterSheet.from_dict pode confiar no formato.
+
+Seções ainda não lidas (DeferredSection) não são decodificadas aqui: os
+passos que as alteram ficam guardados na seção e são aplicados quando ela
+for lida.
+
+O comando ``python ficha.py migrar`` regrava as fichas antigas de um
+diretório já no formato atual, para que as próximas leituras não precisem
+migrar nada.
+"""
+from sheet_storage import DeferredSection
+
+SHEET_VERSION = '1.3'
+
+# Versão assumida para fichas sem o campo 'version'
+LEGACY_VERSION = '1.1'
+
+# {versão de origem: (versão de destino, função)}
+MIGRATIONS = {}
+
+
+class MigrationError(ValueError):
+    """Ficha de uma versão desconhecida ou mais nova que a suportada"""
+
+
+def migration(source, target):
+    """Registra a função que converte uma ficha de source para target"""
+    def register(function):
+        if source in MIGRATIONS:
+            raise ValueError(f"Migração da versão {source} já registrada")
+        MIGRATIONS[source] = (target, function)
+        return function
+    return register
+
+
+def sheet_version(data):
+    return data.get('version') or LEGACY_VERSION
+
+
+def needs_migration(data):
+    return sheet_version(data) != SHEET_VERSION
+
+
+def migrate(data):
+    """Atualiza o dicionário da ficha (no lugar) até SHEET_VERSION.
+
+    Retorna o próprio dicionário; fichas já na versão atual voltam sem
+    nenhuma alteração.
+    """
+    version = sheet_version(data)
+    while version != SHEET_VERSION:
+        if version not in MIGRATIONS:
+            raise MigrationError(f"Versão de ficha não suportada: {version}")
+        version, step = MIGRATIONS[version]
+        step(data)
+        data['version'] = version
+    return data
+
+
+def _update_section(data, section, function):
+    """Aplica function à seção, adiando-a se a seção ainda não foi lida"""
+    value = data.get(section)
+    if isinstance(value, DeferredSection):
+        value.steps += (function,)
+    else:
+        data[section] = function(value)
+
+
+def _dict(value):
+    return value if isinstance(value, dict) else {}
+
+
+def _dicts(value):
+    return [entry for entry in value if isinstance(entry, dict)] if isinstance(value, list) else []
+
+
+@migration('1.1', '1.2')
+def normalize_data(data):
+    """Garante as seções básicas das primeiras versões da ficha"""
+    if not isinstance(data.get('basic_info'), dict):
+        data['basic_info'] = {'Nome': '', 'Raça': '', 'Antecedente': '', 'Nível': '0'}
+
+    if not isinstance(data.get('classes'), dict):
+        data['classes'] = {}
+
+    # O alinhamento fica no background
+    def normalize_background(background):
+        background = _dict(background)
+        alignment = background.setdefault('alignment', {})
+        if isinstance(alignment, dict):
+            alignment.setdefault('moral', '')
+            alignment.setdefault('order', '')
+        else:
+            background['alignment'] = {'moral': '', 'order': ''}
+        return background
+    _update_section(data, 'background', normalize_background)
+
+
+def _legacy_item(item):
+    # Itens antigos tinham um único dano em dano_dado/dano_tipo
+    dice = item.pop('dano_dado', None)
+    kind = item.pop('dano_tipo', '')
+    if dice:
+        item['tipos_dano'] = [[dice, kind]] + list(item.get('tipos_dano') or [])
+    return item
+
+
+@migration('1.2', '1.3')
+def repair_structure(data):
+    """Descarta entradas com o formato errado e renomeia chaves antigas.
+
+    Depois deste passo todas as seções têm o tipo esperado (dicionários e
+    listas de dicionários), e a leitura não precisa mais conferi-los.
+    """
+    for section in ('basic_info', 'attributes', 'skills', 'resources',
+                    'armor_class', 'combat', 'spell_dc'):
+        data[section] = _dict(data.get(section))
+
+    # As classes são lidas por posição: entradas inválidas viram classes vazias
+    data['classes'] = {
+        label: info if isinstance(info, dict) else {'name': '', 'level': '1'}
+        for label, info in _dict(data.get('classes')).items()
+    }
+
+    for section in ('attributes', 'skills', 'resources'):
+        data[section] = {key: value for key, value in data[section].items()
+                         if isinstance(value, dict)}
+
+    for section in ('armor_class', 'spell_dc'):
+        data[section]['bonus_list'] = _dicts(data[section].get('bonus_list'))
+
+    custom_resources = _dicts(data.get('custom_resources'))
+    for resource in custom_resources:
+        if 'name' not in resource:
+            resource['name'] = resource.pop('nome', '')
+    data['custom_resources'] = custom_resources
+
+    for section in ('spells', 'abilities', 'features', 'affinities'):
+        _update_section(data, section, _dicts)
+    _update_section(data, 'inventory', lambda items: [_legacy_item(item) for item in _dicts(items)])
+    _update_section(data, 'background', _dict)
@@ -0,0 +1,658 @@
+"""Modelo da ficha de personagem independente da interface gráfica.
+
+Este módulo não importa tkinter: a ficha (CharacterSheet) e o motor de
+valores derivados (StatsEngine) podem ser usados em processamento em lote,
+sem criar janelas.
+"""
+import base64
+import binascii
+import copy
+import heapq
+from collections import defaultdict, namedtuple
+
+from sheet_migrations import SHEET_VERSION, migrate
+from sheet_records import SECTION_RECORDS, records_from_dicts, records_to_dicts
+from sheet_storage import DeferredSection, asset_ref
+
+ATTRIBUTES = ["FOR", "DES", "CON", "INT", "SAB", "CAR"]
+
+SKILLS = {
+    "Acrobacia": "DES", "Arcanismo": "INT", "Atletismo": "FOR",
+    "Atuação": "CAR", "Enganação": "CAR", "Furtividade": "DES",
+    "História": "INT", "Intimidação": "CAR", "Intuição": "SAB",
+    "Investigação": "INT", "Lidar com Animais": "SAB", "Medicina": "SAB",
+    "Natureza": "INT", "Percepção": "SAB", "Persuasão": "CAR",
+    "Prestidigitação": "DES", "Religião": "INT", "Sobrevivência": "SAB"
+}
+
+CLASS_LABELS = ["Classe Primária", "Classe Secundária", "Classe Terciária"]
+
+BASIC_INFO_FIELDS = ["Nome", "Raça", "Antecedente", "Nível"]
+
+RESOURCES = ["Vida", "Mana", "Estamina"]
+
+# Registro de uma alteração no modelo, entregue aos ouvintes da ficha.
+# op é 'set', 'insert' ou 'remove'; em 'insert'/'remove' o último elemento
+# de path é o índice na lista.
+Change = namedtuple('Change', 'op path value old')
+
+
+def ability_modifier(score):
+    """Modificador de um valor de atributo (0 se o valor for inválido)"""
+    try:
+        return (int(score) - 10) // 2
+    except (TypeError, ValueError):
+        return 0
+
+
+def proficiency_bonus(level):
+    """Bônus de proficiência padrão do D&D 5e para o nível informado"""
+    try:
+        nivel = int(level)
+    except (TypeError, ValueError):
+        return 2
+    if nivel >= 17:
+        return 6
+    elif nivel >= 13:
+        return 5
+    elif nivel >= 9:
+        return 4
+    elif nivel >= 5:
+        return 3
+    return 2
+
+
+def parse_bonus(value):
+    """Converte um bônus digitado em inteiro, ignorando valores inválidos"""
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def format_bonus(total):
+    """Formata um total com sinal, como exibido nas perícias e saves"""
+    return f"{'+' if total >= 0 else ''}{total}"
+
+
+def format_modifier(modifier):
+    """Formata um modificador entre parênteses, como '(+2)'"""
+    return f"({format_bonus(modifier)})"
+
+
+class CharacterSheet:
+    """Dados editáveis de uma ficha, no mesmo formato do JSON exportado.
+
+    Toda alteração feita por set/insert/remove é repassada aos ouvintes em
+    ``listeners`` como um registro Change, e incrementa ``generation`` e o
+    contador da seção alterada em ``section_generations``: comparar
+    gerações diz se a ficha (ou uma seção) mudou desde uma gravação.
+    """
+
+    def __init__(self):
+        # Retrato em bytes (PNG); no JSON vira uma referência ao AssetStore
+        self.photo = None
+        # Referência lida do JSON cujo arquivo não foi encontrado; é mantida
+        # ao salvar para não perder o retrato
+        self.missing_photo_ref = None
+        self._photo_ref = (None, None)
+        self.basic_info = {field: '' for field in BASIC_INFO_FIELDS}
+        self.classes = {label: {'name': '', 'level': '1'} for label in CLASS_LABELS}
+        self.main_class = CLASS_LABELS[0]
+        self.attributes = {attr: {'value': '', 'save_proficiency': False} for attr in ATTRIBUTES}
+        self.attribute_notes = ''
+        self.skills = {skill: {'prof1': False, 'prof2': False, 'bonus': '0'} for skill in SKILLS}
+        self.resources = {resource: {'atual': '', 'max': ''} for resource in RESOURCES}
+        self.custom_resources = []
+        # Listas de registros compactos (ver sheet_records)
+        self.spells = []
+        self.abilities = []
+        self.features = []
+        self.inventory = []
+        self.affinities = []
+        self.background = {}
+        self.armor_class = {'base': '10', 'attr': 'DES', 'bonus': '0', 'bonus_list': []}
+        self.combat = {'initiative': '0', 'speed': '30', 'hit_points': '', 'temp_hit_points': ''}
+        self.spell_dc = {'attr': 'INT', 'bonus': '0', 'bonus_list': []}
+        self.listeners = []
+        self.generation = 0
+        self.section_generations = defaultdict(int)
+        # Seções ainda não decodificadas ({seção: DeferredSection})
+        self._deferred = {}
+        # Trecho original das seções decodificadas: {seção: (geração, DeferredSection)}.
+        # Enquanto a seção não muda, ela é gravada a partir desse trecho
+        self._clean = {}
+
+    def __getattr__(self, name):
+        # Chamado só quando o atributo não existe: seções adiadas são
+        # decodificadas no primeiro acesso
+        deferred = self.__dict__.get('_deferred')
+        if deferred and name in deferred:
+            raw = deferred.pop(name)
+            value = _section_from_json(name, raw.load())
+            setattr(self, name, value)
+            # Trechos com migrações pendentes precisam ser regravados
+            if not raw.steps:
+                self._clean[name] = (self.section_generations[name], raw)
+            return value
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def defer(self, section, raw):
+        """Troca uma seção por um DeferredSection, lido no primeiro acesso.
+
+        Não notifica os ouvintes: é usado ao carregar uma ficha inteira.
+        """
+        self.__dict__.pop(section, None)
+        self._deferred[section] = raw
+
+    def is_loaded(self, section):
+        return section not in self._deferred
+
+    def unchanged_section(self, section):
+        """Trecho original (DeferredSection) de uma seção lida e não alterada, ou None"""
+        generation, raw = self._clean.get(section, (None, None))
+        if raw is not None and generation == self.section_generations[section]:
+            return raw
+        return None
+
+    def take_section(self, other, section):
+        """Copia uma seção de outra ficha, mantendo-a adiada se ainda não foi lida"""
+        if other.is_loaded(section):
+            raw = other.unchanged_section(section)
+            self.set((section,), getattr(other, section))
+            if raw is not None:
+                self._clean[section] = (self.section_generations[section], raw)
+        else:
+            self.defer(section, other._deferred[section])
+
+    def _container(self, path):
+        """Retorna o objeto que contém o último elemento do caminho"""
+        target = getattr(self, path[0])
+        for key in path[1:-1]:
+            target = target[key]
+        return target
+
+    def get(self, path):
+        """Lê o valor em um caminho, como ('attributes', 'FOR', 'value')"""
+        if len(path) == 1:
+            return getattr(self, path[0])
+        return self._container(path)[path[-1]]
+
+    def set(self, path, value):
+        """Altera o valor em um caminho e notifica os ouvintes"""
+        path = tuple(path)
+        old = self.get(path)
+        if old == value and type(old) is type(value):
+            return
+        if len(path) == 1:
+            setattr(self, path[0], value)
+        else:
+            self._container(path)[path[-1]] = value
+        self._notify(Change('set', path, value, old))
+
+    def insert(self, path, index, value):
+        """Insere um elemento na lista indicada pelo caminho"""
+        items = self.get(path)
+        if index is None:
+            index = len(items)
+        items.insert(index, value)
+        self._notify(Change('insert', tuple(path) + (index,), value, None))
+
+    def remove(self, path, index):
+        """Remove o elemento de índice informado da lista indicada pelo caminho"""
+        old = self.get(path).pop(index)
+        self._notify(Change('remove', tuple(path) + (index,), None, old))
+        return old
+
+    @property
+    def photo_ref(self):
+        """Referência de conteúdo do retrato atual (calculada uma vez)"""
+        if self.photo is None:
+            return self.missing_photo_ref
+        photo, ref = self._photo_ref
+        if photo is not self.photo:
+            ref = asset_ref(self.photo)
+            self._photo_ref = (self.photo, ref)
+        return ref
+
+    def _notify(self, change):
+        self.generation += 1
+        self.section_generations[change.path[0]] += 1
+        for listener in list(self.listeners):
+            listener(change)
+
+    @classmethod
+    def from_dict(cls, data, assets=None):
+        """Cria uma ficha a partir do dicionário salvo por export_to_json.
+
+        assets é o AssetStore usado para resolver ``photo_ref``; fichas
+        antigas trazem o retrato embutido em base64 em ``photo_data``.
+        Dicionários de versões anteriores são migrados no lugar (ver
+        sheet_migrations) antes da leitura.
+        """
+        migrate(data)
+        sheet = cls()
+        photo_data = data.get('photo_data')
+        photo_ref = data.get('photo_ref')
+        if photo_data:
+            try:
+                sheet.photo = base64.b64decode(photo_data)
+            except (binascii.Error, TypeError, ValueError):
+                pass
+        elif photo_ref:
+            try:
+                sheet.photo = assets.get(photo_ref) if assets else None
+            except (OSError, ValueError):
+                pass
+            if sheet.photo is None:
+                sheet.missing_photo_ref = photo_ref
+
+        basic_info = data['basic_info']
+        for field in BASIC_INFO_FIELDS:
+            sheet.basic_info[field] = basic_info.get(field, '')
+
+        for label, class_info in zip(CLASS_LABELS, data['classes'].values()):
+            sheet.classes[label] = {
+                'name': class_info.get('name', ''),
+                'level': class_info.get('level', '1')
+            }
+        if data.get('main_class') in CLASS_LABELS:
+            sheet.main_class = data['main_class']
+
+        for attr, attr_data in data['attributes'].items():
+            if attr in sheet.attributes:
+                sheet.attributes[attr] = {
+                    'value': attr_data.get('value', ''),
+                    'save_proficiency': bool(attr_data.get('save_proficiency', False))
+                }
+
+        sheet.attribute_notes = data.get('attribute_notes', '') or ''
+
+        for skill, skill_data in data['skills'].items():
+            if skill in sheet.skills:
+                sheet.skills[skill] = {
+                    'prof1': bool(skill_data.get('prof1', False)),
+                    'prof2': bool(skill_data.get('prof2', False)),
+                    'bonus': skill_data.get('bonus', '0')
+                }
+
+        for resource, values in data['resources'].items():
+            if resource in sheet.resources:
+                sheet.resources[resource] = {
+                    'atual': values.get('atual', ''),
+                    'max': values.get('max', '')
+                }
+
+        for resource in data['custom_resources']:
+            sheet.custom_resources.append({
+                'name': resource.get('name', ''),
+                'atual': resource.get('atual', ''),
+                'max': resource.get('max', '')
+            })
+
+        for section in list(SECTION_RECORDS) + ['background']:
+            value = data.get(section)
+            if isinstance(value, DeferredSection):
+                sheet.defer(section, value)
+            else:
+                setattr(sheet, section, _section_from_json(section, value))
+
+        ac_data = data['armor_class']
+        sheet.armor_class = {
+            'base': ac_data.get('base', '10'),
+            'attr': ac_data.get('attr', 'DES'),
+            'bonus': ac_data.get('bonus', '0'),
+            'bonus_list': _bonus_rows(ac_data.get('bonus_list', []))
+        }
+
+        combat = data['combat']
+        sheet.combat = {
+            'initiative': combat.get('initiative', ''),
+            'speed': combat.get('speed', ''),
+            'hit_points': combat.get('hit_points', '0'),
+            'temp_hit_points': combat.get('temp_hit_points', '0')
+        }
+
+        cd_data = data['spell_dc']
+        sheet.spell_dc = {
+            'attr': cd_data.get('attr', 'INT'),
+            'bonus': cd_data.get('bonus', '0'),
+            'bonus_list': _bonus_rows(cd_data.get('bonus_list', []))
+        }
+
+        return sheet
+
+    def snapshot(self):
+        """Cópia independente da ficha, para ser lida em outra thread.
+
+        Seções ainda não lidas (ou não alteradas) são compartilhadas como
+        DeferredSection, que não muda; o retrato (bytes, imutável) também é
+        compartilhado em vez de copiado.
+        """
+        sheet = CharacterSheet.from_dict(self.to_dict(inline_photo=False, keep_deferred=True))
+        sheet.photo = self.photo
+        sheet.missing_photo_ref = self.missing_photo_ref
+        sheet._photo_ref = self._photo_ref
+        return sheet
+
+    def to_dict(self, filename=None, inline_photo=True, keep_deferred=False):
+        """Gera o dicionário no formato JSON atual, incluindo os valores derivados.
+
+        Com inline_photo=False o retrato não é embutido: o dicionário traz
+        apenas ``photo_ref`` e quem grava deve guardar ``self.photo`` no
+        AssetStore. Com keep_deferred=True as seções ainda não lidas, ou lidas
+        e não alteradas, saem como DeferredSection (write_json_atomic copia
+        o trecho original, sem codificá-las de novo). O resultado não
+        compartilha objetos mutáveis com a ficha e pode ser gravado em outra
+        thread enquanto a interface continua editando.
+        """
+        stats = StatsEngine(self)
+        sections = {}
+        for section in list(SECTION_RECORDS) + ['background']:
+            if keep_deferred and not self.is_loaded(section):
+                sections[section] = self._deferred[section]
+            elif keep_deferred and self.unchanged_section(section) is not None:
+                sections[section] = self.unchanged_section(section)
+            elif section == 'background':
+                sections[section] = copy.deepcopy(self.background)
+            else:
+                sections[section] = records_to_dicts(getattr(self, section))
+        photo = {'photo_data': None}
+        if self.photo and inline_photo:
+            photo['photo_data'] = base64.b64encode(self.photo).decode()
+        elif self.photo_ref:
+            photo['photo_ref'] = self.photo_ref
+        return {
+            'version': SHEET_VERSION,
+            'filename': filename,
+            **photo,
+            'basic_info': dict(self.basic_info),
+            'classes': {label: dict(info) for label, info in self.classes.items()},
+            'main_class': self.main_class,
+            'attributes': {
+                attr: {
+                    'value': data['value'],
+                    'modifier': format_modifier(stats.modifier(attr)),
+                    'save_proficiency': data['save_proficiency'],
+                    'save_total': format_bonus(stats.save_total(attr))
+                } for attr, data in self.attributes.items()
+            },
+            'attribute_notes': self.attribute_notes,
+            'skills': {
+                skill: {
+                    'prof1': data['prof1'],
+                    'prof2': data['prof2'],
+                    'bonus': data['bonus'],
+                    'total': format_bonus(stats.skill_total(skill))
+                } for skill, data in self.skills.items()
+            },
+            'resources': {resource: dict(values) for resource, values in self.resources.items()},
+            'custom_resources': [dict(resource) for resource in self.custom_resources],
+            'spells': sections['spells'],
+            'abilities': sections['abilities'],
+            'features': sections['features'],
+            'inventory': sections['inventory'],
+            'affinities': sections['affinities'],
+            'background': sections['background'],
+            'armor_class': {
+                'base': self.armor_class['base'],
+                'attr': self.armor_class['attr'],
+                'bonus': self.armor_class['bonus'],
+                'bonus_list': [dict(bonus) for bonus in self.armor_class['bonus_list']]
+            },
+            'combat': dict(self.combat),
+            'spell_dc': {
+                'attr': self.spell_dc['attr'],
+                'bonus': self.spell_dc['bonus'],
+                'bonus_list': [dict(bonus) for bonus in self.spell_dc['bonus_list']]
+            },
+        }
+
+
+def _section_from_json(section, value):
+    """Converte o valor de uma lista da ficha (ou do background) lido do JSON"""
+    if section == 'background':
+        return value if isinstance(value, dict) else {}
+    return records_from_dicts(SECTION_RECORDS[section], value)
+
+
+def _bonus_rows(rows):
+    """Normaliza uma lista de bônus ({'desc', 'value'}) lida do JSON"""
+    return [{'desc': row.get('desc', ''), 'value': row.get('value', '0')} for row in rows]
+
+
+class DependencyGraph:
+    """Grafo de dependências entre campos da ficha e valores derivados.
+
+    Nós de entrada correspondem a caminhos do modelo; nós calculados têm uma
+    função de cálculo e uma lista de dependências (fixa ou obtida por uma
+    função, quando depende do estado da ficha). Em evaluate() apenas os nós
+    sujos são recalculados, cada um uma única vez e em ordem topológica; se
+    o valor de um nó não mudar, seus dependentes não são tocados.
+    """
+
+    def __init__(self):
+        self.computes = {}
+        self.deps = {}
+        self.current_deps = {}
+        self.dependents = defaultdict(set)
+        self.rank = {}
+        self.inputs = {}
+        self.dirty = set()
+
+    def add_input(self, key, path):
+        self.rank[key] = 0
+        self.inputs.setdefault(path[0], []).append((key, tuple(path)))
+
+    def add_node(self, key, compute, deps):
+        """Declara um nó calculado; deps é uma lista ou uma função que a retorna"""
+        self.computes[key] = compute
+        self.deps[key] = deps if callable(deps) else (lambda deps=tuple(deps): deps)
+        self.current_deps[key] = ()
+        self._relink(key)
+        self.rank[key] = 1 + max(self.rank[dep] for dep in self.current_deps[key])
+        self.dirty.add(key)
+
+    def _relink(self, key):
+        new_deps = tuple(self.deps[key]())
+        if new_deps == self.current_deps[key]:
+            return
+        for dep in self.current_deps[key]:
+            self.dependents[dep].discard(key)
+        for dep in new_deps:
+            self.dependents[dep].add(key)
+        self.current_deps[key] = new_deps
+
+    def mark_path(self, path):
+        """Marca como sujos os nós de entrada afetados por uma alteração em path"""
+        for key, input_path in self.inputs.get(path[0], ()):
+            size = min(len(path), len(input_path))
+            if path[:size] == input_path[:size]:
+                self.dirty.add(key)
+
+    def mark_all(self):
+        self.dirty.update(self.computes)
+
+    def evaluate(self, values):
+        """Recalcula os nós sujos e retorna {chave: valor} dos que mudaram"""
+        heap = [(self.rank[key], key) for key in self.dirty]
+        heapq.heapify(heap)
+        self.dirty.clear()
+        done = set()
+        changed = {}
+        while heap:
+            _, key = heapq.heappop(heap)
+            if key in done:
+                continue
+            done.add(key)
+            if key in self.computes:
+                value = self.computes[key]()
+                self._relink(key)
+                if key in values and values[key] == value:
+                    continue
+                values[key] = value
+                changed[key] = value
+            for dependent in self.dependents[key]:
+                if dependent not in done:
+                    heapq.heappush(heap, (self.rank[dependent], dependent))
+        return changed
+
+
+def _is_int(value):
+    try:
+        int(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+class StatsEngine:
+    """Calcula os valores derivados de uma CharacterSheet.
+
+    Concentra as fórmulas de modificadores, bônus de proficiência, saves,
+    perícias, CA, CD de magias e percepção passiva, declaradas como nós de
+    um DependencyGraph:
+
+        Nível -> prof -> saves, perícias, CD, percepção passiva
+        atributo -> mod -> save, perícias do atributo, CA/CD (se usarem o
+                           atributo), percepção passiva (SAB)
+
+    Para acompanhar as edições da ficha, registre ``on_change`` em
+    ``sheet.listeners`` e chame ``recompute()`` para obter apenas os valores
+    que mudaram.
+    """
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.values = {}
+        self.graph = DependencyGraph()
+        self._declare_nodes()
+
+    def _declare_nodes(self):
+        graph = self.graph
+        sheet = self.sheet
+        values = self.values
+
+        graph.add_input('level', ('basic_info', 'Nível'))
+        graph.add_node('prof', lambda: proficiency_bonus(sheet.basic_info.get('Nível')), ['level'])
+
+        for attr in ATTRIBUTES:
+            graph.add_input(f'attr:{attr}', ('attributes', attr, 'value'))
+            graph.add_input(f'save_prof:{attr}', ('attributes', attr, 'save_proficiency'))
+            graph.add_node(f'mod:{attr}',
+                           lambda attr=attr: ability_modifier(sheet.attributes[attr]['value']),
+                           [f'attr:{attr}'])
+            graph.add_node(f'save:{attr}', lambda attr=attr: self._compute_save(attr),
+                           [f'attr:{attr}', f'save_prof:{attr}', f'mod:{attr}', 'prof'])
+
+        for skill, attr in SKILLS.items():
+            graph.add_input(f'skill_input:{skill}', ('skills', skill))
+            graph.add_node(f'skill:{skill}', lambda skill=skill: self._compute_skill(skill),
+                           [f'skill_input:{skill}', f'mod:{attr}', 'prof'])
+
+        graph.add_input('ac_input', ('armor_class',))
+        graph.add_node('ac', self._compute_ac,
+                       lambda: ['ac_input'] + self._modifier_deps(sheet.armor_class['attr']))
+
+        graph.add_input('dc_input', ('spell_dc',))
+        graph.add_node('dc', self._compute_dc,
+                       lambda: ['dc_input', 'prof'] + self._modifier_deps(sheet.spell_dc['attr']))
+
+        graph.add_node('passive', lambda: 10 + values['mod:SAB'] + values['prof'],
+                       ['mod:SAB', 'prof'])
+
+    @staticmethod
+    def _modifier_deps(attr):
+        return [f'mod:{attr}'] if attr in ATTRIBUTES else []
+
+    def _mod(self, attr):
+        return self.values[f'mod:{attr}'] if attr in ATTRIBUTES else 0
+
+    def _compute_save(self, attr):
+        # Valores de atributo inválidos exibem +0, mesmo com proficiência
+        data = self.sheet.attributes[attr]
+        if not _is_int(data['value']):
+            return 0
+        total = self.values[f'mod:{attr}']
+        if data['save_proficiency']:
+            total += self.values['prof']
+        return total
+
+    def _compute_skill(self, skill):
+        data = self.sheet.skills[skill]
+        total = self.values[f'mod:{SKILLS[skill]}']
+        if data['prof1']:
+            total += self.values['prof']
+        if data['prof2']:
+            total += self.values['prof']
+        return total + parse_bonus(data['bonus'])
+
+    def _compute_ac(self):
+        ac_data = self.sheet.armor_class
+        try:
+            base = int(ac_data['base'] or 10)
+        except (TypeError, ValueError):
+            return 10
+        bonus = parse_bonus(ac_data['bonus'])
+        for row in ac_data['bonus_list']:
+            bonus += parse_bonus(row['value'])
+        return base + self._mod(ac_data['attr']) + bonus
+
+    def _compute_dc(self):
+        cd_data = self.sheet.spell_dc
+        bonus = parse_bonus(cd_data['bonus'])
+        for row in cd_data['bonus_list']:
+            bonus += parse_bonus(row['value'])
+        return 8 + self.values['prof'] + self._mod(cd_data['attr']) + bonus
+
+    def on_change(self, change):
+        """Ouvinte da ficha: marca como sujos os nós afetados pela alteração"""
+        self.graph.mark_path(change.path)
+
+    def recompute(self):
+        """Recalcula os nós sujos e retorna {chave: valor} dos que mudaram"""
+        return self.graph.evaluate(self.values)
+
+    def recompute_all(self):
+        """Recalcula todos os nós e retorna todos os valores"""
+        self.graph.mark_all()
+        self.graph.evaluate(self.values)
+        return dict(self.values)
+
+    def value(self, key):
+        if self.graph.dirty:
+            self.recompute()
+        return self.values[key]
+
+    def modifier(self, attr):
+        return self.value(f'mod:{attr}') if attr in ATTRIBUTES else 0
+
+    def proficiency_bonus(self):
+        return self.value('prof')
+
+    def save_total(self, attr):
+        return self.value(f'save:{attr}')
+
+    def skill_total(self, skill):
+        return self.value(f'skill:{skill}')
+
+    def armor_class(self):
+        return self.value('ac')
+
+    def spell_dc(self):
+        return self.value('dc')
+
+    def passive_perception(self):
+        return self.value('passive')
+
+    def derive(self):
+        """Calcula todos os valores derivados de uma vez"""
+        return {
+            'proficiency_bonus': self.proficiency_bonus(),
+            'modifiers': {attr: self.modifier(attr) for attr in ATTRIBUTES},
+            'saves': {attr: self.save_total(attr) for attr in ATTRIBUTES},
+            'skills': {skill: self.skill_total(skill) for skill in SKILLS},
+            'armor_class': self.armor_class(),
+            'spell_dc': self.spell_dc(),
+            'passive_perception': self.passive_perception(),
+        }
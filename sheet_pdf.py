@@ -0,0 +1,620 @@
+"""Exportação da ficha para PDF, sem interface gráfica.
+
+write_sheet_pdf desenha a ficha a partir de uma CharacterSheet e pode rodar
+fora da thread da interface: a interface entrega uma cópia independente
+(CharacterSheet.snapshot) e continua respondendo enquanto o PDF é gerado.
+O andamento é informado por seção (magias, talentos, inventário...) e a
+exportação pode ser cancelada entre uma entrada e outra.
+
+O PDF é montado em memória e gravado de forma atômica: uma exportação
+cancelada ou com erro não deixa um arquivo pela metade.
+
+O JSON da ficha vai anexado ao PDF (arquivo incorporado ``ficha.json``):
+read_embedded_sheet o lê de volta sem perdas, sem extrair o texto das
+páginas.
+
+Cada seção (informações básicas, perícias, magias, talentos, inventário,
+combate) é desenhada por uma função própria. Com um PdfSectionCache, o
+código das páginas de cada seção fica guardado com o hash dos valores que
+ela desenha, e reexportar a ficha depois de mudar só os pontos de vida
+copia as páginas de magias, talentos e inventário sem desenhá-las de novo.
+"""
+import hashlib
+import io
+import json
+import zlib
+from collections import namedtuple
+from functools import lru_cache
+
+from reportlab import rl_config
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfdoc
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from sheet_model import (StatsEngine, ATTRIBUTES, BASIC_INFO_FIELDS, CLASS_LABELS, RESOURCES,
+                         format_bonus, format_modifier)
+from sheet_storage import encode_json, write_atomic
+
+# Streams só com compressão Flate. O ASCII85 aplicado por cima (para
+# transporte em 7 bits) aumenta o arquivo e, sem os aceleradores em C do
+# reportlab, é codificado em Python puro a cada página exportada.
+rl_config.useA85 = 0
+
+# Seções informadas ao acompanhamento, na ordem em que são desenhadas
+PDF_SECTIONS = {
+    'summary': "Informações básicas",
+    'skills': "Perícias e recursos",
+    'spells': "Magias",
+    'abilities': "Talentos",
+    'inventory': "Inventário",
+}
+
+# Entradas desenhadas entre dois avisos de andamento
+PROGRESS_EVERY = 25
+
+# Nome do arquivo incorporado com o JSON da ficha
+EMBEDDED_NAME = 'ficha.json'
+
+# Margem direita das linhas de texto
+RIGHT_MARGIN = 50
+
+# Fontes usadas no PDF (ZapfDingbats entra nos símbolos ✓ e □)
+PDF_FONTS = ("Helvetica", "Helvetica-Bold", "ZapfDingbats")
+
+
+@lru_cache(maxsize=1 << 16)
+def text_width(text, font, size):
+    """Largura de uma palavra ou caractere (memorizada: as palavras se repetem muito)"""
+    return stringWidth(text, font, size)
+
+
+def _split_word(word, width, font, size):
+    """Corta uma palavra mais larga que a linha, caractere a caractere"""
+    pieces, piece, piece_width = [], '', 0.0
+    for char in word:
+        char_width = text_width(char, font, size)
+        if piece and piece_width + char_width > width:
+            pieces.append(piece)
+            piece, piece_width = '', 0.0
+        piece += char
+        piece_width += char_width
+    pieces.append(piece)
+    return pieces
+
+
+def wrap_text(text, width, font="Helvetica", size=10):
+    """Linhas de text que cabem em width pontos.
+
+    As quebras de linha do texto são mantidas (inclusive as linhas vazias);
+    dentro de cada parágrafo a quebra é entre palavras, e só uma palavra
+    mais larga que a linha é cortada no meio. As fontes padrão do PDF não
+    têm kerning, então a largura de uma linha é a soma das larguras das
+    palavras e dos espaços.
+    """
+    space = text_width(' ', font, size)
+    lines = []
+    for paragraph in text.split('\n'):
+        line, line_width = [], 0.0
+        for word in paragraph.split():
+            word_width = text_width(word, font, size)
+            if word_width > width:
+                if line:
+                    lines.append(' '.join(line))
+                *full, last = _split_word(word, width, font, size)
+                lines.extend(full)
+                line, line_width = [last], text_width(last, font, size)
+            elif line and line_width + space + word_width > width:
+                lines.append(' '.join(line))
+                line, line_width = [word], word_width
+            else:
+                line_width += space + word_width if line else word_width
+                line.append(word)
+        lines.append(' '.join(line))
+    return lines
+
+
+class ExportCancelled(Exception):
+    """Exportação interrompida pelo usuário"""
+
+
+class _Progress:
+    """Conta as entradas desenhadas e repassa o andamento a progress"""
+
+    def __init__(self, total, progress, cancelled):
+        self.total = total
+        self.done = 0
+        self.progress = progress
+        self.cancelled = cancelled
+
+    def check(self):
+        if self.cancelled is not None and self.cancelled():
+            raise ExportCancelled()
+
+    def section(self, section):
+        """Início de uma seção: sempre informado"""
+        self.check()
+        if self.progress is not None:
+            self.progress(section, self.done, self.total)
+
+    def step(self, section):
+        """Uma entrada desenhada: informado a cada PROGRESS_EVERY entradas"""
+        self.check()
+        self.done += 1
+        if self.progress is not None and self.done % PROGRESS_EVERY == 0:
+            self.progress(section, self.done, self.total)
+
+    def skip(self, section, steps):
+        """Entradas de uma seção copiada do cache, informadas de uma vez"""
+        self.check()
+        self.done += steps
+        if self.progress is not None and steps:
+            self.progress(section, self.done, self.total)
+
+
+def embed_sheet_json(c, payload):
+    """Anexa o JSON (bytes) ao documento como o arquivo incorporado EMBEDDED_NAME"""
+    doc = c._doc
+    stream = pdfdoc.PDFStream(content=zlib.compress(payload))
+    stream.dictionary['Type'] = pdfdoc.PDFName('EmbeddedFile')
+    stream.dictionary['Filter'] = pdfdoc.PDFArray([pdfdoc.PDFName('FlateDecode')])
+    stream.dictionary['Params'] = pdfdoc.PDFDictionary({'Size': len(payload)})
+    filespec = pdfdoc.PDFDictionary({
+        'Type': pdfdoc.PDFName('Filespec'),
+        'F': pdfdoc.PDFString(EMBEDDED_NAME),
+        'UF': pdfdoc.PDFString(EMBEDDED_NAME),
+        'Desc': pdfdoc.PDFString("Dados da ficha"),
+        'EF': pdfdoc.PDFDictionary({'F': doc.Reference(stream)}),
+    })
+    doc.Catalog.Names = pdfdoc.PDFDictionary({
+        'EmbeddedFiles': pdfdoc.PDFDictionary({
+            'Names': pdfdoc.PDFArray([pdfdoc.PDFString(EMBEDDED_NAME), doc.Reference(filespec)])
+        })
+    })
+
+
+def read_embedded_sheet(file_path):
+    """Dicionário da ficha anexado a um PDF exportado.
+
+    Retorna None se o PDF não tiver o anexo (PDFs de outra origem). Só o
+    catálogo e o stream do anexo são lidos; as páginas não são abertas.
+    """
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(file_path)
+    try:
+        names = reader.trailer['/Root']['/Names']['/EmbeddedFiles']['/Names']
+    except (KeyError, TypeError):
+        return None
+    for name, filespec in zip(names[::2], names[1::2]):
+        if name == EMBEDDED_NAME:
+            payload = filespec.get_object()['/EF']['/F'].get_data()
+            return json.loads(payload)
+    return None
+
+
+def write_sheet_pdf(sheet, file_path, progress=None, cancelled=None, cache=None):
+    """Gera o PDF da ficha em file_path.
+
+    progress(seção, feitas, total) recebe o andamento (seção é uma chave de
+    PDF_SECTIONS); cancelled() é consultado a cada entrada e, se verdadeiro,
+    a exportação para com ExportCancelled sem criar o arquivo. cache é um
+    PdfSectionCache com as seções de exportações anteriores.
+    """
+    buffer = io.BytesIO()
+    render_sheet_pdf(sheet, buffer, progress, cancelled, cache)
+    return write_atomic(file_path, buffer.getvalue())
+
+
+def section_key(values, y):
+    """Hash (SHA-256) dos valores que uma seção desenha, a partir da altura y"""
+    digest = hashlib.sha256(repr(y).encode('ascii'))
+    for value in values:
+        digest.update(repr(value).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+# Seção desenhada: páginas fechadas e código da página aberta (listas de
+# operadores do canvas), altura final, fontes registradas e entradas
+# informadas ao andamento
+CachedSection = namedtuple('CachedSection', 'key pages tail y fonts steps')
+
+
+class PdfSectionCache:
+    """Seções do PDF já desenhadas, reaproveitadas nas exportações seguintes.
+
+    Cada seção é guardada com o hash dos valores que ela desenha; se o hash
+    não mudou, o código das páginas é copiado sem desenhar de novo. Só a
+    última versão de cada seção é mantida.
+    """
+
+    def __init__(self):
+        self._sections = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, section, key):
+        cached = self._sections.get(section)
+        if cached is not None and cached.key == key:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        return None
+
+    def put(self, section, cached):
+        self._sections[section] = cached
+
+    def clear(self):
+        self._sections.clear()
+
+
+class _SectionCanvas(canvas.Canvas):
+    """Canvas que registra o código das páginas desenhadas em uma seção"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pages = None
+        self._start = 0
+
+    def record(self):
+        """Começa a registrar o que for desenhado a partir daqui"""
+        self._pages = []
+        self._start = len(self._code)
+
+    def recorded(self):
+        """(páginas fechadas, código da página aberta) desde record()"""
+        pages, self._pages = self._pages, None
+        return pages, self._code[self._start:]
+
+    def showPage(self):
+        if self._pages is not None:
+            self._pages.append(self._code[self._start:])
+            self._start = 0
+        super().showPage()
+
+    def replay(self, pages, tail):
+        """Copia o código registrado de uma seção para o documento"""
+        for code in pages:
+            self._code.extend(code)
+            self.showPage()
+        self._code.extend(tail)
+
+    def fonts(self):
+        return tuple(self._doc.fontMapping.items())
+
+    def use_fonts(self, fonts):
+        """Registra as fontes de uma seção gravada, na mesma ordem.
+
+        Retorna False se algum nome interno (/F1, /F2...) não coincidir:
+        o código gravado apontaria para outra fonte.
+        """
+        return all(self._doc.getInternalFontName(name) == internal for name, internal in fonts)
+
+
+def render_sheet_pdf(sheet, output, progress=None, cancelled=None, cache=None):
+    """Desenha a ficha em output (caminho ou arquivo binário).
+
+    Com cache (PdfSectionCache), as seções cujos valores não mudaram desde
+    a exportação anterior são copiadas em vez de desenhadas.
+    """
+    stats = StatsEngine(sheet)
+    # Páginas fixas contam como uma entrada cada
+    tracker = _Progress(2 + len(sheet.spells) + len(sheet.abilities) + len(sheet.inventory),
+                        progress, cancelled)
+
+    c = _SectionCanvas(output, pagesize=A4)
+    # Fontes registradas antes de qualquer seção, para que os nomes
+    # internos não dependam de qual seção foi desenhada primeiro
+    for font in PDF_FONTS:
+        c._doc.getInternalFontName(font)
+
+    y = A4[1] - 50
+    for section, draw, values, new_page in SECTIONS:
+        if new_page:
+            c.showPage()
+            y = A4[1] - 50
+        if section in PDF_SECTIONS:
+            tracker.section(section)
+        key = section_key(values(sheet, stats), y) if cache is not None else None
+        cached = cache.get(section, key) if cache is not None else None
+        if cached is not None and c.use_fonts(cached.fonts):
+            c.replay(cached.pages, cached.tail)
+            tracker.skip(section, cached.steps)
+            y = cached.y
+            continue
+        done = tracker.done
+        c.record()
+        y = draw(c, sheet, stats, tracker, y)
+        pages, tail = c.recorded()
+        if cache is not None:
+            cache.put(section, CachedSection(key, pages, tail, y, c.fonts(), tracker.done - done))
+
+    tracker.check()
+    embed_sheet_json(c, encode_json(sheet.to_dict(keep_deferred=True)))
+    c.save()
+
+
+def _summary_values(sheet, stats):
+    yield [sheet.basic_info.get(key, '') for key in BASIC_INFO_FIELDS]
+    yield [sheet.classes[label]['name'] for label in CLASS_LABELS]
+    for attr in ATTRIBUTES:
+        data = sheet.attributes[attr]
+        yield (data['value'], data['save_proficiency'], stats.modifier(attr), stats.save_total(attr))
+    yield sheet.attribute_notes
+
+
+def _draw_summary(c, sheet, stats, tracker, y):
+    width, height = A4
+    c.setFont("Helvetica-Bold", 14)
+
+    # Informações Básicas
+    c.drawString(50, y, "FICHA DE PERSONAGEM D&D 5.5E")
+    c.setFont("Helvetica", 12)
+
+    y -= 30
+    for key in BASIC_INFO_FIELDS:
+        c.drawString(50, y, f"{key}: {sheet.basic_info.get(key, '')}")
+        y -= 20
+
+    # Classes
+    y -= 20
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "CLASSES")
+    c.setFont("Helvetica", 12)
+    y -= 20
+    for label in CLASS_LABELS:
+        c.drawString(50, y, f"{label}: {sheet.classes[label]['name']}")
+        y -= 20
+
+    # Atributos e Saves
+    y -= 20
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "ATRIBUTOS E SAVES")
+    c.setFont("Helvetica", 12)
+    y -= 20
+
+    for attr in ATTRIBUTES:
+        data = sheet.attributes[attr]
+        mod = format_modifier(stats.modifier(attr))
+        save = format_bonus(stats.save_total(attr))
+        prof = "✓" if data['save_proficiency'] else "□"
+        c.drawString(50, y, f"{attr}: {data['value']} {mod} | Save: {save} {prof}")
+        y -= 20
+
+    # Anotações dos Atributos
+    y -= 20
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "ANOTAÇÕES DOS ATRIBUTOS")
+    c.setFont("Helvetica", 10)
+    y -= 20
+
+    for note in wrap_text(sheet.attribute_notes.strip(), width - 50 - RIGHT_MARGIN):
+        if y < 50:  # Nova página se necessário
+            c.showPage()
+            c.setFont("Helvetica", 10)
+            y = height - 50
+        c.drawString(50, y, note)
+        y -= 15
+    tracker.step('summary')
+    return y
+
+
+def _skills_values(sheet, stats):
+    for skill, data in sheet.skills.items():
+        yield (skill, data['prof1'], data['prof2'], stats.skill_total(skill))
+    for resource in RESOURCES:
+        yield sheet.resources[resource]
+    yield sheet.custom_resources
+
+
+def _draw_skills(c, sheet, stats, tracker, y):
+    # Perícias
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "PERÍCIAS")
+    c.setFont("Helvetica", 12)
+    y -= 20
+
+    for skill, data in sheet.skills.items():
+        prof1 = "✓" if data['prof1'] else "□"
+        prof2 = "✓" if data['prof2'] else "□"
+        total = format_bonus(stats.skill_total(skill))
+        c.drawString(50, y, f"{skill} [{prof1}{prof2}] {total}")
+        y -= 20
+
+    # Recursos
+    y -= 20
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "RECURSOS")
+    c.setFont("Helvetica", 12)
+    y -= 20
+
+    for resource in RESOURCES:
+        values = sheet.resources[resource]
+        c.drawString(50, y, f"{resource}: {values['atual']}/{values['max']}")
+        y -= 20
+
+    # Recursos Customizados
+    if sheet.custom_resources:
+        y -= 20
+        c.drawString(50, y, "Recursos Customizados:")
+        y -= 20
+        for resource in sheet.custom_resources:
+            c.drawString(50, y, f"{resource['name']}: {resource['atual']}/{resource['max']}")
+            y -= 20
+    tracker.step('skills')
+    return y
+
+
+def _spells_values(sheet, stats):
+    for spell in sheet.spells:
+        yield (spell.nivel, spell.nome, spell.escola, spell.tempo_conjuracao, spell.alcance,
+               spell.componentes, spell.duracao, spell.descricao, spell.niveis_superiores)
+
+
+def _draw_spells(c, sheet, stats, tracker, y):
+    width, height = A4
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "MAGIAS")
+    c.setFont("Helvetica", 10)
+    y -= 20
+
+    for spell in sheet.spells:
+        tracker.step('spells')
+        if y < 100:  # Nova página se necessário
+            c.showPage()
+            c.setFont("Helvetica", 10)
+            y = height - 50
+
+        c.drawString(50, y, f"Nível {spell.nivel}: {spell.nome}")
+        y -= 15
+        c.drawString(70, y, f"Escola: {spell.escola}")
+        y -= 15
+        c.drawString(70, y, f"Tempo: {spell.tempo_conjuracao}")
+        y -= 15
+        c.drawString(70, y, f"Alcance: {spell.alcance}")
+        y -= 15
+        c.drawString(70, y, f"Componentes: {spell.componentes}")
+        y -= 15
+        c.drawString(70, y, f"Duração: {spell.duracao}")
+        y -= 15
+
+        # Quebrar descrição em linhas
+        lines = wrap_text(spell.descricao, width - 70 - RIGHT_MARGIN)
+        if spell.niveis_superiores:
+            lines.append("Em níveis superiores:")
+            lines.extend(wrap_text(spell.niveis_superiores, width - 70 - RIGHT_MARGIN))
+        for line in lines:
+            if y < 50:
+                c.showPage()
+                c.setFont("Helvetica", 10)
+                y = height - 50
+            c.drawString(70, y, line)
+            y -= 15
+        y -= 10
+    return y
+
+
+def _abilities_values(sheet, stats):
+    for ability in sheet.abilities:
+        yield (ability.nome, ability.descricao)
+
+
+def _draw_abilities(c, sheet, stats, tracker, y):
+    width, height = A4
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "TALENTOS")
+    c.setFont("Helvetica", 10)
+    y -= 20
+
+    for ability in sheet.abilities:
+        tracker.step('abilities')
+        if y < 100:
+            c.showPage()
+            c.setFont("Helvetica", 10)
+            y = height - 50
+
+        c.drawString(50, y, ability.nome)
+        y -= 15
+        for line in wrap_text(ability.descricao, width - 70 - RIGHT_MARGIN):
+            if y < 50:
+                c.showPage()
+                c.setFont("Helvetica", 10)
+                y = height - 50
+            c.drawString(70, y, line)
+            y -= 15
+        y -= 10
+    return y
+
+
+def _inventory_values(sheet, stats):
+    for item in sheet.inventory:
+        yield (item.nome, item.get('tipo', ''), item.get('bonus_atributos', {}),
+               item.get('bonus_ca', '0'), item.get('bonus_cd', '0'), item.tipos_dano, item.descricao)
+
+
+def _draw_inventory(c, sheet, stats, tracker, y):
+    width, height = A4
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "INVENTÁRIO")
+    c.setFont("Helvetica", 10)
+    y -= 20
+
+    for item in sheet.inventory:
+        tracker.step('inventory')
+        if y < 100:
+            c.showPage()
+            c.setFont("Helvetica", 10)
+            y = height - 50
+
+        # Campos tipo/bonus_* existem apenas em fichas antigas
+        tipo = item.get('tipo', '')
+        c.drawString(50, y, f"{item.nome} ({tipo})" if tipo else item.nome)
+        y -= 15
+
+        # Bônus de atributos
+        bonus_str = ", ".join([f"{attr}: {val}" for attr, val in item.get('bonus_atributos', {}).items() if val != '0'])
+        if bonus_str:
+            c.drawString(70, y, f"Bônus de Atributos: {bonus_str}")
+            y -= 15
+
+        if item.get('bonus_ca', '0') != '0':
+            c.drawString(70, y, f"Bônus de CA: {item.get('bonus_ca')}")
+            y -= 15
+
+        if item.get('bonus_cd', '0') != '0':
+            c.drawString(70, y, f"Bônus de CD: {item.get('bonus_cd')}")
+            y -= 15
+
+        for dano, dano_tipo in item.tipos_dano:
+            dano_str = f"Dano: {dano}"
+            if dano_tipo:
+                dano_str += f" ({dano_tipo})"
+            c.drawString(70, y, dano_str)
+            y -= 15
+
+        for line in wrap_text(item.descricao, width - 70 - RIGHT_MARGIN):
+            if y < 50:
+                c.showPage()
+                c.setFont("Helvetica", 10)
+                y = height - 50
+            c.drawString(70, y, line)
+            y -= 15
+        y -= 10
+    return y
+
+
+def _combat_values(sheet, stats):
+    yield (stats.armor_class(), stats.spell_dc(), stats.passive_perception(),
+           sheet.combat['initiative'], sheet.combat['speed'])
+
+
+def _draw_combat(c, sheet, stats, tracker, y):
+    # Informações de combate, logo abaixo do inventário
+    y -= 20
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "INFORMAÇÕES DE COMBATE")
+    c.setFont("Helvetica", 12)
+    y -= 20
+    c.drawString(50, y, f"CA Total: {stats.armor_class()}")
+    y -= 20
+    c.drawString(50, y, f"CD: {stats.spell_dc()}")
+    y -= 20
+    c.drawString(50, y, f"Percepção Passiva: {stats.passive_perception()}")
+    y -= 20
+    c.drawString(50, y, f"Iniciativa: {sheet.combat['initiative']}")
+    y -= 20
+    c.drawString(50, y, f"Movimento: {sheet.combat['speed']}")
+    return y
+
+
+# Seções na ordem em que são desenhadas: (nome, desenho, valores que
+# entram no hash do cache, começa em uma página nova)
+SECTIONS = (
+    ('summary', _draw_summary, _summary_values, False),
+    ('skills', _draw_skills, _skills_values, True),
+    ('spells', _draw_spells, _spells_values, True),
+    ('abilities', _draw_abilities, _abilities_values, True),
+    ('inventory', _draw_inventory, _inventory_values, True),
+    ('combat', _draw_combat, _combat_values, False),
+)
@@ -0,0 +1,340 @@
+"""Leitura de fichas a partir do texto de um PDF, sem interface gráfica.
+
+PDFs exportados pela ficha trazem o JSON completo anexado
+(sheet_pdf.read_embedded_sheet); este módulo é o caminho para os demais:
+PDFs antigos ou gerados de outra forma no mesmo layout de
+sheet_pdf.render_sheet_pdf.
+
+O texto é lido uma página por vez (pdf_lines é um gerador) e consumido por
+uma máquina de estados (SheetTextParser) que reconhece os títulos das
+seções. Nenhuma página fica guardada depois de lida, então a memória não
+cresce com o tamanho do documento, mesmo em grimórios de centenas de
+páginas.
+
+Dentro de MAGIAS, TALENTOS e INVENTÁRIO, cada entrada começa na margem
+da seção e os detalhes vêm recuados; a posição horizontal de cada linha
+vem da extração de texto do PyPDF2. As descrições quebradas na largura da
+página (sheet_pdf.wrap_text) são juntadas de novo em parágrafos.
+"""
+import re
+
+from reportlab.lib.pagesizes import A4
+
+from sheet_model import (CharacterSheet, StatsEngine, BASIC_INFO_FIELDS, CLASS_LABELS,
+                         RESOURCES, SKILLS)
+from sheet_migrations import SHEET_VERSION
+from sheet_pdf import RIGHT_MARGIN, text_width
+
+# Títulos das seções, como desenhados por render_sheet_pdf
+SECTION_TITLES = {
+    "CLASSES": 'classes',
+    "ATRIBUTOS E SAVES": 'attributes',
+    "ANOTAÇÕES DOS ATRIBUTOS": 'attribute_notes',
+    "PERÍCIAS": 'skills',
+    "RECURSOS": 'resources',
+    "Recursos Customizados:": 'custom_resources',
+    "MAGIAS": 'spells',
+    "TALENTOS": 'abilities',
+    "INVENTÁRIO": 'inventory',
+    "INFORMAÇÕES DE COMBATE": 'combat',
+}
+SHEET_TITLE = "FICHA DE PERSONAGEM"
+
+# Campos das linhas de detalhe de uma magia, antes da descrição
+SPELL_FIELDS = {
+    "Escola": 'escola',
+    "Tempo": 'tempo_conjuracao',
+    "Alcance": 'alcance',
+    "Componentes": 'componentes',
+    "Duração": 'duracao',
+}
+HIGHER_LEVELS = "Em níveis superiores:"
+
+# Recuo mínimo (em pontos) para uma linha ser detalhe da entrada anterior
+INDENT = 5
+
+_SPELL_HEADER = re.compile(r'Nível (\d+): (.*)\Z')
+_ATTRIBUTE = re.compile(r'(\S+): (\S*)\s*\(([+-]?\d+)\)\s*\|\s*Save: ([+-]?\d+)\s*(.*)\Z')
+_SKILL = re.compile(r'(.+?) \[(.*)\]\s*([+-]?\d+)?\Z')
+_CHECKED = "✓"
+
+
+def pdf_lines(file_path):
+    """(x, texto) de cada linha do PDF, lendo uma página por vez.
+
+    x é a posição horizontal do início da linha (None se o PyPDF2 não a
+    informar).
+    """
+    import PyPDF2
+
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for number in range(len(reader.pages)):
+            chunks = []
+
+            def visit(text, cm, tm, font, size):
+                if text:
+                    chunks.append((cm[4] + tm[4] if cm and tm else None, text))
+
+            reader.pages[number].extract_text(visitor_text=visit)
+            # O PdfReader guarda cada objeto que leu; sem isso o conteúdo de
+            # todas as páginas já lidas continuaria em memória. O cache é
+            # interno do PyPDF2 (3.x): numa versão sem ele a leitura continua
+            # funcionando, só sem o limite de memória
+            resolved = getattr(reader, 'resolved_objects', None)
+            if resolved is not None:
+                resolved.clear()
+            yield from _join_chunks(chunks)
+
+
+def _join_chunks(chunks):
+    """Junta os trechos de texto de uma página em linhas"""
+    x, parts = None, []
+    for chunk_x, text in chunks:
+        lines = text.split('\n')
+        for index, part in enumerate(lines):
+            if part and x is None:
+                x = chunk_x
+            parts.append(part)
+            if index < len(lines) - 1:
+                yield x, ''.join(parts).strip()
+                x, parts = None, []
+    if parts:
+        yield x, ''.join(parts).strip()
+
+
+def _wrapped(previous, line, x, font="Helvetica", size=10):
+    """Se line é continuação de previous, quebrada por wrap_text.
+
+    wrap_text só passa para a linha seguinte quando a próxima palavra não
+    cabe; se a primeira palavra de line caberia em previous, a quebra era
+    do próprio texto.
+    """
+    if x is None or not previous or not line:
+        return False
+    words = previous.split() + line.split()[:1]
+    width = sum(text_width(word, font, size) for word in words)
+    width += text_width(' ', font, size) * (len(words) - 1)
+    return width > A4[0] - x - RIGHT_MARGIN
+
+
+def _split_field(line):
+    """('Chave', 'valor') de uma linha 'Chave: valor'"""
+    key, _, value = line.partition(':')
+    return key.strip(), value.strip()
+
+
+class SheetTextParser:
+    """Reconstrói o dicionário da ficha a partir das linhas do PDF.
+
+        parser = SheetTextParser()
+        for x, line in pdf_lines(path):
+            parser.feed(x, line)
+        data = parser.result()
+    """
+
+    def __init__(self):
+        self.data = {
+            'version': SHEET_VERSION,
+            'basic_info': {},
+            'classes': {},
+            'attributes': {},
+            'attribute_notes': '',
+            'skills': {},
+            'resources': {},
+            'custom_resources': [],
+            'spells': [],
+            'abilities': [],
+            'features': [],
+            'inventory': [],
+            'armor_class': {},
+            'combat': {},
+            'spell_dc': {},
+        }
+        self.section = None
+        self.margin = None
+        self.notes = []
+        self.skill_totals = {}
+        # Entrada atual (magia, talento ou item) e o campo que recebe o texto
+        self.entry = None
+        self.target = None
+        self.lines = []
+        # Última linha de texto livre como aparece no PDF (antes de juntar)
+        self.previous = None
+
+    def feed(self, x, line):
+        if not line:
+            return
+        if line.startswith(SHEET_TITLE):
+            self._start('basic_info', x)
+            return
+        section = SECTION_TITLES.get(line)
+        if section is not None and not self._indented(x):
+            self._start(section, x)
+            return
+        handler = getattr(self, '_' + self.section, None) if self.section else None
+        if handler is not None:
+            handler(x, line)
+
+    def _indented(self, x):
+        return x is not None and self.margin is not None and x > self.margin + INDENT
+
+    def _start(self, section, x):
+        self._finish_entry()
+        self.section = section
+        if x is not None:
+            self.margin = x
+
+    # Seções de linhas 'Chave: valor'
+
+    def _basic_info(self, x, line):
+        key, value = _split_field(line)
+        if key in BASIC_INFO_FIELDS:
+            self.data['basic_info'][key] = value
+
+    def _classes(self, x, line):
+        key, value = _split_field(line)
+        if key in CLASS_LABELS:
+            self.data['classes'][key] = {'name': value}
+
+    def _attributes(self, x, line):
+        match = _ATTRIBUTE.match(line)
+        if match:
+            attr, value, _, _, proficiency = match.groups()
+            self.data['attributes'][attr] = {
+                'value': value,
+                'save_proficiency': _CHECKED in proficiency
+            }
+
+    def _attribute_notes(self, x, line):
+        if self.notes and _wrapped(self.previous, line, x):
+            self.notes[-1] += ' ' + line
+        else:
+            self.notes.append(line)
+        self.previous = line
+
+    def _skills(self, x, line):
+        match = _SKILL.match(line)
+        if match and match.group(1) in SKILLS:
+            skill, proficiencies, total = match.groups()
+            self.data['skills'][skill] = {
+                'prof1': proficiencies[:1] == _CHECKED,
+                'prof2': proficiencies[1:2] == _CHECKED,
+                'bonus': '0'
+            }
+            if total is not None:
+                self.skill_totals[skill] = int(total)
+
+    def _resources(self, x, line):
+        key, value = _split_field(line)
+        if key in RESOURCES:
+            atual, _, maximum = value.partition('/')
+            self.data['resources'][key] = {'atual': atual.strip(), 'max': maximum.strip()}
+
+    def _custom_resources(self, x, line):
+        name, _, value = line.rpartition(':')
+        atual, _, maximum = value.partition('/')
+        self.data['custom_resources'].append(
+            {'name': name.strip(), 'atual': atual.strip(), 'max': maximum.strip()})
+
+    def _combat(self, x, line):
+        key, value = _split_field(line)
+        if key == "Iniciativa":
+            self.data['combat']['initiative'] = value
+        elif key == "Movimento":
+            self.data['combat']['speed'] = value
+
+    # Seções de entradas: cabeçalho na margem, detalhes recuados
+
+    def _finish_entry(self):
+        if self.entry is not None and self.target is not None:
+            self.entry[self.target] = '\n'.join(self.lines)
+        self.entry = self.target = self.previous = None
+        self.lines = []
+
+    def _new_entry(self, section, entry):
+        self._finish_entry()
+        self.entry = entry
+        self.data[section].append(entry)
+
+    def _switch(self, target):
+        """Passa a acumular o texto livre da entrada em outro campo"""
+        if target != self.target:
+            if self.target is not None:
+                self.entry[self.target] = '\n'.join(self.lines)
+            self.target, self.lines = target, []
+            self.previous = None
+
+    def _text(self, target, x, line):
+        """Linha de texto livre da entrada atual (descrição ou níveis superiores)"""
+        self._switch(target)
+        if self.lines and _wrapped(self.previous, line, x):
+            self.lines[-1] += ' ' + line
+        else:
+            self.lines.append(line)
+        self.previous = line
+
+    def _spells(self, x, line):
+        header = _SPELL_HEADER.match(line)
+        if header and not self._indented(x):
+            self._new_entry('spells', {'nivel': header.group(1), 'nome': header.group(2)})
+            return
+        if self.entry is None:
+            return
+        key, value = _split_field(line)
+        if self.target is None and key in SPELL_FIELDS:
+            self.entry[SPELL_FIELDS[key]] = value
+        elif line == HIGHER_LEVELS:
+            self._switch('niveis_superiores')
+        else:
+            self._text(self.target or 'descricao', x, line)
+
+    def _abilities(self, x, line):
+        if not self._indented(x) or self.entry is None:
+            self._new_entry('abilities', {'nome': line})
+        else:
+            self._text('descricao', x, line)
+
+    def _inventory(self, x, line):
+        if not self._indented(x) or self.entry is None:
+            self._new_entry('inventory', {'nome': line, 'tipos_dano': []})
+            return
+        key, value = _split_field(line)
+        if self.target is None and key == "Bônus de Atributos":
+            bonuses = {}
+            for part in value.split(','):
+                attr, bonus = _split_field(part)
+                bonuses[attr] = bonus
+            self.entry['bonus_atributos'] = bonuses
+        elif self.target is None and key == "Bônus de CA":
+            self.entry['bonus_ca'] = value
+        elif self.target is None and key == "Bônus de CD":
+            self.entry['bonus_cd'] = value
+        elif self.target is None and key == "Dano":
+            damage, _, kind = value.partition(' (')
+            self.entry['tipos_dano'].append([damage.strip(), kind.rstrip(')')])
+        else:
+            self._text('descricao', x, line)
+
+    def result(self):
+        """Dicionário da ficha no formato de export_to_json"""
+        self._finish_entry()
+        data = self.data
+        data['attribute_notes'] = '\n'.join(self.notes)
+        data['classes'] = {label: data['classes'].get(label, {'name': ''}) for label in CLASS_LABELS}
+        if self.skill_totals:
+            # O PDF só traz o total; o bônus extra é o que sobra do cálculo
+            stats = StatsEngine(CharacterSheet.from_dict(data))
+            for skill, total in self.skill_totals.items():
+                bonus = total - stats.skill_total(skill)
+                if bonus:
+                    data['skills'][skill]['bonus'] = str(bonus)
+        return data
+
+
+def read_pdf_sheet(file_path):
+    """Dicionário da ficha reconstruído do texto do PDF"""
+    parser = SheetTextParser()
+    for x, line in pdf_lines(file_path):
+        parser.feed(x, line)
+    return parser.result()
@@ -0,0 +1,100 @@
+"""Fichas abertas recentemente, com um cache dos cabeçalhos em disco.
+
+O menu "Fichas Recentes" mostra nome, nível e classe de cada ficha. Para
+não ler todas as fichas sempre que o menu abre, esses dados ficam em
+``~/.ficha_dnd/recent.json`` junto com o tamanho e a data de modificação
+do arquivo; só as fichas alteradas desde então são lidas de novo (e só o
+cabeçalho: as seções grandes ficam adiadas em read_sheet).
+"""
+import json
+import os
+
+from sheet_storage import read_sheet, write_atomic
+
+CONFIG_DIRECTORY = os.path.join(os.path.expanduser('~'), '.ficha_dnd')
+
+# Número de fichas mantidas na lista
+RECENT_LIMIT = 10
+
+
+def _file_stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def sheet_header(data):
+    """Nome, nível e classe principal de um dicionário de ficha"""
+    basic_info = data.get('basic_info')
+    if not isinstance(basic_info, dict):
+        basic_info = {}
+    return {
+        'name': str(basic_info.get('Nome') or ''),
+        'level': str(basic_info.get('Nível') or ''),
+        'main_class': str(data.get('main_class') or ''),
+    }
+
+
+class RecentSheets:
+    """Lista das últimas fichas abertas, da mais recente para a mais antiga"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CONFIG_DIRECTORY, 'recent.json')
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return []
+        if not isinstance(entries, list):
+            return []
+        return [entry for entry in entries if isinstance(entry, dict) and entry.get('path')]
+
+    def _store(self, entries):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            write_atomic(self.path, json.dumps(entries, ensure_ascii=False, indent=1).encode('utf-8'))
+        except OSError as e:
+            # A lista é só uma conveniência; não interromper o uso da ficha
+            print(f"Erro ao salvar a lista de fichas recentes: {str(e)}")
+
+    def add(self, file_path, data=None):
+        """Coloca a ficha no topo da lista.
+
+        data é o dicionário da ficha, quando já está em memória (evita ler
+        o arquivo de novo para o cabeçalho).
+        """
+        file_path = os.path.abspath(file_path)
+        if data is None:
+            entry = self._read_entry(file_path)
+        else:
+            entry = dict(sheet_header(data), path=file_path, stat=_file_stat(file_path))
+        entries = [entry] + [other for other in self._load() if other['path'] != file_path]
+        self._store(entries[:RECENT_LIMIT])
+
+    def _read_entry(self, file_path):
+        stat = _file_stat(file_path)
+        try:
+            header = sheet_header(read_sheet(file_path))
+        except Exception:
+            header = sheet_header({})
+        return dict(header, path=file_path, stat=stat)
+
+    def entries(self):
+        """Fichas que ainda existem, com os cabeçalhos atualizados"""
+        entries, changed = [], False
+        for entry in self._load():
+            stat = _file_stat(entry['path'])
+            if stat is None:
+                changed = True
+                continue
+            if stat != entry.get('stat'):
+                entry = self._read_entry(entry['path'])
+                changed = True
+            entries.append(entry)
+        if changed:
+            self._store(entries)
+        return entries
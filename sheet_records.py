@@ -0,0 +1,168 @@
+"""Registros compactos para magias, itens, talentos, habilidades e afinidades.
+
+Cada registro guarda seus campos em __slots__ (sem um dict por instância) e
+converte de/para o formato de dicionário usado no JSON da ficha. Chaves
+desconhecidas são preservadas em ``extra`` para não se perderem ao salvar.
+"""
+import sys
+
+
+_MISSING = object()
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _to_level(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _to_damage_types(value):
+    return [tuple(entry) for entry in value or [] if len(entry) == 2]
+
+
+class Record:
+    """Base dos registros: FIELDS mapeia cada chave do JSON ao valor padrão"""
+
+    __slots__ = ('extra',)
+    FIELDS = {}
+    _spec = ()
+    # Conversões aplicadas ao ler um campo (ex.: nível sempre inteiro)
+    CONVERTERS = {}
+    # Campos com poucos valores distintos, compartilhados via sys.intern
+    INTERNED = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # (campo, padrão, conversão) pré-calculados para o __init__
+        spec = []
+        for name, default in cls.FIELDS.items():
+            convert = cls.CONVERTERS.get(name)
+            if convert is None and name in cls.INTERNED:
+                convert = _intern
+            spec.append((name, default, convert))
+        cls._spec = tuple(spec)
+
+    def __init__(self, **values):
+        for name, default, convert in self._spec:
+            value = values.pop(name, _MISSING)
+            if value is _MISSING:
+                value = default() if callable(default) else default
+            elif convert is not None:
+                value = convert(value)
+            setattr(self, name, value)
+        self.extra = values or None
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, key, default=None):
+        """Acesso por chave do JSON, incluindo as chaves extras"""
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Spell(Record):
+    FIELDS = {
+        'nome': '',
+        'nivel': 0,
+        'escola': '',
+        'preparada': False,
+        'tempo_conjuracao': '',
+        'alcance': '',
+        'componentes': '',
+        'duracao': '',
+        'custo_mana': '',
+        'teste_resistencia': '',
+        'dano_efeito': '',
+        'descricao': '',
+        'niveis_superiores': '',
+    }
+    __slots__ = tuple(FIELDS)
+    CONVERTERS = {'nivel': _to_level, 'preparada': bool}
+    INTERNED = ('escola', 'tempo_conjuracao', 'alcance', 'componentes', 'duracao',
+                'custo_mana', 'teste_resistencia')
+
+
+class Item(Record):
+    FIELDS = {
+        'nome': '',
+        'acerto_bonus': '',
+        'peso': '',
+        'cristal_saint': '',
+        'cristal_qi': '',
+        'cristal_puro': '',
+        'descricao': '',
+        'tipos_dano': list,
+    }
+    __slots__ = tuple(FIELDS)
+    CONVERTERS = {'tipos_dano': _to_damage_types}
+    INTERNED = ('peso', 'cristal_saint', 'cristal_qi', 'cristal_puro')
+
+    def to_dict(self):
+        data = super().to_dict()
+        data['tipos_dano'] = [list(entry) for entry in self.tipos_dano]
+        return data
+
+
+class Ability(Record):
+    FIELDS = {'nome': '', 'descricao': ''}
+    __slots__ = tuple(FIELDS)
+
+
+class Feature(Record):
+    FIELDS = {'nome': '', 'descricao': ''}
+    __slots__ = tuple(FIELDS)
+
+
+class Affinity(Record):
+    FIELDS = {'nome': '', 'bonus': '', 'descricao': ''}
+    __slots__ = tuple(FIELDS)
+
+
+# Tipo de registro de cada lista da ficha
+SECTION_RECORDS = {
+    'spells': Spell,
+    'inventory': Item,
+    'abilities': Ability,
+    'features': Feature,
+    'affinities': Affinity,
+}
+
+
+def records_from_dicts(cls, items):
+    """Converte a lista do JSON em registros, ignorando entradas inválidas"""
+    records = []
+    for item in items or []:
+        if isinstance(item, cls):
+            records.append(item)
+        elif isinstance(item, dict):
+            records.append(cls.from_dict(item))
+    return records
+
+
+def records_to_dicts(records):
+    """Converte os registros de volta para o formato do JSON"""
+    return [record.to_dict() for record in records]
@@ -0,0 +1,142 @@
+"""Valores derivados de um grupo inteiro de fichas, calculados com NumPy.
+
+Para a visão do mestre sobre uma campanha: as fichas são carregadas em
+colunas (atributos, níveis, proficiências em saves e perícias) e os
+modificadores, saves e perícias de todos os personagens são obtidos com
+poucas operações vetorizadas, com as mesmas fórmulas do StatsEngine.
+
+    roster = Roster.from_files(paths)
+    stats = roster.compute()
+    stats['skills'][i, roster.skill_index('Percepção')]
+"""
+import json
+
+import numpy as np
+
+from sheet_model import CharacterSheet, ATTRIBUTES, SKILLS, parse_bonus
+
+SKILL_NAMES = list(SKILLS)
+
+# Índice do atributo usado por cada perícia, na ordem de SKILL_NAMES
+SKILL_ATTRIBUTES = np.array([ATTRIBUTES.index(SKILLS[skill]) for skill in SKILL_NAMES])
+
+# Níveis a partir dos quais o bônus de proficiência sobe (+2 até o nível 4)
+PROFICIENCY_STEPS = np.array([5, 9, 13, 17])
+
+# Maior valor guardado nas colunas (int64), com folga para as somas das
+# perícias; acima disso o valor conta como inválido
+COLUMN_LIMIT = 2 ** 60
+
+
+def _to_int(value):
+    """Inteiro do campo, ou None se o valor for inválido ou grande demais"""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if -COLUMN_LIMIT <= number <= COLUMN_LIMIT else None
+
+
+class Roster:
+    """Colunas de um grupo de fichas, uma linha por personagem.
+
+    - ``scores``: valores dos seis atributos (N x 6), 10 onde inválidos
+      (inclusive os grandes demais para a coluna)
+    - ``valid``: máscara dos valores de atributo válidos (N x 6)
+    - ``levels``: nível de cada personagem (N), -1 se inválido
+    - ``save_mask``: proficiências em saves, um bit por atributo (N)
+    - ``prof1``/``prof2``: marcações de proficiência das perícias (N x 18)
+    - ``skill_bonus``: bônus digitados nas perícias (N x 18)
+    """
+
+    def __init__(self, sheets, names=None):
+        sheets = list(sheets)
+        count = len(sheets)
+        self.names = list(names) if names is not None else [
+            sheet.basic_info.get('Nome', '') for sheet in sheets
+        ]
+        self.scores = np.full((count, len(ATTRIBUTES)), 10, dtype=np.int64)
+        self.valid = np.zeros((count, len(ATTRIBUTES)), dtype=bool)
+        self.levels = np.full(count, -1, dtype=np.int64)
+        self.save_mask = np.zeros(count, dtype=np.uint8)
+        self.prof1 = np.zeros((count, len(SKILL_NAMES)), dtype=bool)
+        self.prof2 = np.zeros((count, len(SKILL_NAMES)), dtype=bool)
+        self.skill_bonus = np.zeros((count, len(SKILL_NAMES)), dtype=np.int64)
+
+        for row, sheet in enumerate(sheets):
+            try:
+                level = int(sheet.basic_info.get('Nível'))
+            except (TypeError, ValueError):
+                level = None
+            if level is not None:
+                # Fora dos degraus o bônus não muda: limitar não altera o resultado
+                self.levels[row] = min(max(level, -COLUMN_LIMIT), COLUMN_LIMIT)
+            mask = 0
+            for col, attr in enumerate(ATTRIBUTES):
+                data = sheet.attributes[attr]
+                score = _to_int(data['value'])
+                if score is not None:
+                    self.scores[row, col] = score
+                    self.valid[row, col] = True
+                if data['save_proficiency']:
+                    mask |= 1 << col
+            self.save_mask[row] = mask
+            for col, skill in enumerate(SKILL_NAMES):
+                data = sheet.skills[skill]
+                self.prof1[row, col] = data['prof1']
+                self.prof2[row, col] = data['prof2']
+                self.skill_bonus[row, col] = _to_int(parse_bonus(data['bonus'])) or 0
+
+    @classmethod
+    def from_dicts(cls, items):
+        """Cria o grupo a partir dos dicionários salvos por export_to_json"""
+        return cls(CharacterSheet.from_dict(data) for data in items)
+
+    @classmethod
+    def from_files(cls, paths):
+        """Cria o grupo a partir de arquivos JSON de fichas"""
+        items = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as file:
+                items.append(json.load(file))
+        return cls.from_dicts(items)
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def skill_index(skill):
+        return SKILL_NAMES.index(skill)
+
+    def compute(self):
+        """Calcula os valores derivados de todos os personagens.
+
+        Retorna um dicionário de arrays:
+
+        - ``proficiency_bonus``: (N)
+        - ``modifiers`` e ``saves``: (N x 6), colunas na ordem de ATTRIBUTES
+        - ``skills``: (N x 18), colunas na ordem de SKILL_NAMES
+        - ``passive_perception``: (N)
+        """
+        # Atributos inválidos têm modificador 0, como em ability_modifier
+        modifiers = np.where(self.valid, (self.scores - 10) // 2, 0)
+
+        # Nível inválido ou menor que 5 fica com +2, como em proficiency_bonus
+        proficiency = 2 + np.searchsorted(PROFICIENCY_STEPS, self.levels, side='right')
+
+        save_bits = (self.save_mask[:, None] >> np.arange(len(ATTRIBUTES))) & 1
+        saves = np.where(self.valid, modifiers + save_bits * proficiency[:, None], 0)
+
+        skill_profs = self.prof1.astype(np.int64) + self.prof2
+        skills = (modifiers[:, SKILL_ATTRIBUTES] + skill_profs * proficiency[:, None]
+                  + self.skill_bonus)
+
+        passive = 10 + modifiers[:, ATTRIBUTES.index('SAB')] + proficiency
+
+        return {
+            'proficiency_bonus': proficiency,
+            'modifiers': modifiers,
+            'saves': saves,
+            'skills': skills,
+            'passive_perception': passive,
+        }
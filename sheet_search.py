@@ -0,0 +1,252 @@
+"""Busca por trecho em listas de registros, sem interface gráfica.
+
+SearchIndex é um índice invertido das palavras de alguns campos dos
+registros (nome e descrição das magias, por exemplo). A busca tem o mesmo
+resultado da varredura simples ("o trecho aparece no nome ou na
+descrição?", sem diferenciar maiúsculas), mas só examina os registros que
+contêm todas as palavras da busca:
+
+    índice de palavras:   palavra -> registros que a contêm
+    índice do vocabulário: trigrama -> palavras que o contêm
+
+Uma palavra da busca pode ser só um pedaço de palavra ("fog" em "fogo"):
+os trigramas dela levam às palavras do vocabulário que a contêm, e as
+listas dessas palavras, aos registros. O índice é atualizado registro a
+registro (add/remove), sem reconstruir tudo a cada alteração.
+
+SearchController liga uma caixa de busca à lista: espera uma pausa na
+digitação antes de buscar, descarta buscas que ficaram velhas e, quando a
+busca nova contém a anterior ("bol" -> "bola"), procura só entre os
+resultados anteriores. O tempo de cada busca é informado para a tela.
+"""
+import re
+import time
+
+_WORD = re.compile(r'\w+')
+
+# Tamanho dos pedaços de palavra indexados no vocabulário
+NGRAM = 3
+
+# Espera (ms) depois da última tecla antes de buscar
+SEARCH_DELAY = 100
+
+
+def _ngrams(word):
+    return {word[i:i + NGRAM] for i in range(len(word) - NGRAM + 1)}
+
+
+class SearchIndex:
+    """Índice invertido dos campos ``fields`` de uma lista de registros.
+
+    Os registros são identificados pela identidade do objeto (a ficha troca
+    o registro inteiro ao editar uma entrada), então o índice não precisa
+    saber a posição deles na lista. O índice guarda uma referência a cada
+    registro indexado, para que o id não seja reaproveitado por outro
+    objeto enquanto estiver no índice.
+    """
+
+    def __init__(self, fields=('nome', 'descricao')):
+        self.fields = fields
+        # id(registro) -> (registro, textos dos campos em minúsculas)
+        self._texts = {}
+        # palavra -> ids dos registros que a contêm
+        self._postings = {}
+        # trigrama -> palavras do vocabulário que o contêm
+        self._vocabulary = {}
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, record):
+        return id(record) in self._texts
+
+    def _words(self, texts):
+        words = set()
+        for text in texts:
+            words.update(_WORD.findall(text))
+        return words
+
+    def add(self, record):
+        key = id(record)
+        if key in self._texts:
+            return
+        texts = tuple(str(record.get(field) or '').lower() for field in self.fields)
+        self._texts[key] = (record, texts)
+        for word in self._words(texts):
+            posting = self._postings.get(word)
+            if posting is None:
+                posting = self._postings[word] = set()
+                for ngram in _ngrams(word):
+                    self._vocabulary.setdefault(ngram, set()).add(word)
+            posting.add(key)
+
+    def remove(self, record):
+        self._remove_key(id(record))
+
+    def _remove_key(self, key):
+        entry = self._texts.pop(key, None)
+        if entry is None:
+            return
+        for word in self._words(entry[1]):
+            posting = self._postings[word]
+            posting.discard(key)
+            if not posting:
+                # Palavra que não aparece mais em nenhum registro
+                del self._postings[word]
+                for ngram in _ngrams(word):
+                    words = self._vocabulary[ngram]
+                    words.discard(word)
+                    if not words:
+                        del self._vocabulary[ngram]
+
+    def sync(self, records):
+        """Acerta o índice com a lista atual (ex.: após desfazer ou importar).
+
+        Só os registros novos são lidos; os que saíram da lista são removidos.
+        """
+        current = {id(record): record for record in records}
+        for key in [key for key in self._texts if key not in current]:
+            self._remove_key(key)
+        for key, record in current.items():
+            if key not in self._texts:
+                self.add(record)
+
+    def clear(self):
+        self._texts.clear()
+        self._postings.clear()
+        self._vocabulary.clear()
+
+    def _containing(self, word):
+        """ids dos registros com alguma palavra que contém word"""
+        if len(word) >= NGRAM:
+            words = None
+            for ngram in sorted(_ngrams(word), key=lambda ngram: len(self._vocabulary.get(ngram, ()))):
+                candidates = self._vocabulary.get(ngram)
+                if not candidates:
+                    return set()
+                words = set(candidates) if words is None else words & candidates
+            words = [other for other in words if word in other]
+        else:
+            words = [other for other in self._postings if word in other]
+        keys = set()
+        for other in words:
+            keys |= self._postings[other]
+        return keys
+
+    def search(self, query):
+        """ids dos registros cujo campo contém query (None: a busca está vazia)"""
+        term = query.lower().strip()
+        if not term:
+            return None
+        words = _WORD.findall(term)
+        if not words:
+            # Só pontuação: não há palavra para consultar o índice
+            return {key for key, (_, texts) in self._texts.items()
+                    if any(term in text for text in texts)}
+        keys = None
+        for word in sorted(set(words), key=len, reverse=True):
+            found = self._containing(word)
+            keys = found if keys is None else keys & found
+            if not keys:
+                return set()
+        if words == [term]:
+            # Uma palavra só: estar contida em uma palavra do registro basta
+            return keys
+        # Várias palavras (ou pontuação): confere o trecho inteiro em cada campo
+        return {key for key in keys if any(term in text for text in self._texts[key][1])}
+
+    def filter(self, records, query):
+        """Registros de records que contêm query, na ordem da lista"""
+        keys = self.search(query)
+        if keys is None:
+            return list(records)
+        return [record for record in records if id(record) in keys]
+
+
+def filter_records(records, query, fields=('nome', 'descricao')):
+    """Registros cujo campo contém query, sem índice (listas pequenas)"""
+    term = query.lower().strip()
+    if not term:
+        return list(records)
+    return [record for record in records
+            if any(term in str(record.get(field) or '').lower() for field in fields)]
+
+
+class SearchController:
+    """Busca de uma tela: espera entre teclas, refinamento e tempo de cada busca.
+
+        search = SearchController(lambda: self.records, self.show_records,
+                                  schedule=window.after, cancel=window.after_cancel)
+        search_var.trace('w', lambda *args: search.request(search_var.get()))
+
+    source() é a lista completa; search(registros, termo) filtra uma lista
+    (por padrão filter_records); show(resultados) mostra o resultado. Sem
+    schedule, a busca roda na hora. report(termo, resultados, segundos)
+    recebe o tempo de busca e exibição de cada consulta.
+
+    Quem altera a lista chama invalidate (a próxima busca parte da lista
+    completa) ou refresh (busca de novo já).
+    """
+
+    def __init__(self, source, show, search=filter_records, schedule=None, cancel=None,
+                 delay=SEARCH_DELAY, report=None):
+        self.source = source
+        self.show = show
+        self.search = search
+        self.schedule = schedule
+        self.cancel = cancel
+        self.delay = delay
+        self.report = report
+        self.last_latency = None
+        self._query = ''
+        self._generation = 0
+        self._pending = None
+        # Termo e resultado da última busca mostrada (base do refinamento)
+        self._term = None
+        self._results = None
+
+    def request(self, query):
+        """Busca digitada: roda quando a digitação parar por delay ms"""
+        self._query = query
+        self._generation += 1
+        self._cancel_pending()
+        if self.schedule is None:
+            self._run(self._generation)
+        else:
+            generation = self._generation
+            self._pending = self.schedule(self.delay, lambda: self._run(generation))
+
+    def invalidate(self):
+        """A lista mudou: os resultados anteriores não servem mais de base"""
+        self._term = self._results = None
+
+    def refresh(self):
+        """Busca o termo atual de novo, já, a partir da lista completa"""
+        self.invalidate()
+        self._generation += 1
+        self._cancel_pending()
+        self._run(self._generation)
+
+    def _cancel_pending(self):
+        if self._pending is not None and self.cancel is not None:
+            self.cancel(self._pending)
+        self._pending = None
+
+    def _run(self, generation):
+        if generation != self._generation:
+            # Substituída por uma tecla mais recente
+            return
+        self._pending = None
+        start = time.perf_counter()
+        term = self._query.lower().strip()
+        if self._results is not None and self._term and self._term in term:
+            # Tudo que contém o termo novo contém o anterior
+            records = self._results
+        else:
+            records = self.source()
+        results = self.search(records, term)
+        self.show(results)
+        self.last_latency = time.perf_counter() - start
+        self._term, self._results = term, results
+        if self.report is not None:
+            self.report(term, results, self.last_latency)
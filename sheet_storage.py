@@ -0,0 +1,387 @@
+"""Gravação de fichas em disco, sem interface gráfica.
+
+A gravação é atômica: o JSON vai para um arquivo temporário no mesmo
+diretório, é sincronizado com fsync e só então substitui o original. Uma
+queda no meio da gravação deixa a ficha anterior intacta.
+
+Os retratos ficam fora do JSON, em um AssetStore: cada arquivo é nomeado
+pelo hash SHA-256 do conteúdo, em ``assets/`` ao lado da ficha, e o JSON
+guarda apenas a referência (``photo_ref``).
+
+A leitura pode ser adiada por seção: read_sheet indexa as posições das
+chaves de primeiro nível e só decodifica as listas grandes (magias,
+inventário, background...) quando a ficha as acessa pela primeira vez.
+
+Arquivos com a extensão de sheet_binary (``.ficha``) são gravados e lidos
+no formato binário compacto, com o retrato embutido.
+
+AutosaveWorker faz essa gravação em uma thread separada: a interface
+entrega um snapshot (o dicionário de CharacterSheet.to_dict) e continua
+respondendo enquanto o JSON é serializado e gravado.
+"""
+import base64
+import hashlib
+import json
+import os
+import re
+import stat
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+import sheet_binary
+
+# Resultado de uma gravação: error é None em caso de sucesso
+SaveResult = namedtuple('SaveResult', 'path error elapsed size')
+
+
+# Diretório dos arquivos referenciados, ao lado das fichas
+ASSET_DIRECTORY = 'assets'
+
+_REF_PATTERN = re.compile(r'sha256:([0-9a-f]{64})\Z')
+
+# Seções lidas apenas quando a tela correspondente as usa
+DEFERRED_SECTIONS = ('spells', 'abilities', 'features', 'inventory', 'affinities', 'background')
+
+# Chave do objeto principal em um JSON gravado com indent=4. Quebras de
+# linha dentro de strings são sempre escapadas, então uma linha que começa
+# com exatamente quatro espaços e aspas só pode ser uma chave de primeiro
+# nível. (Um \r de arquivos com CRLF fica no fim do valor anterior.)
+_TOP_LEVEL_KEY = re.compile(rb'\n    ("(?:[^"\\\r\n]|\\.)*"): ')
+
+_CLOSING = {ord('['): ord(']'), ord('{'): ord('}')}
+
+
+class DeferredSection:
+    """Trecho do JSON de uma seção que ainda não foi decodificada.
+
+    ``steps`` são as migrações (ver sheet_migrations) aplicadas à seção
+    quando ela for lida.
+    """
+
+    __slots__ = ('raw', 'steps')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.steps = ()
+
+    def load(self):
+        value = json.loads(self.raw)
+        for step in self.steps:
+            value = step(value)
+        return value
+
+
+def _encode_deferred(value):
+    # Seções adiadas são gravadas a partir do trecho original, sem passar
+    # pelos registros da ficha
+    if isinstance(value, DeferredSection):
+        return value.load()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_json_atomic(path, data):
+    """Grava o JSON em um temporário sincronizado e o troca pelo original"""
+    return write_atomic(path, encode_json(data))
+
+
+def encode_json(data):
+    """JSON da ficha (indent=4) em bytes.
+
+    Seções de primeiro nível ainda em DeferredSection (sem migrações
+    pendentes) são copiadas do trecho original, sem decodificar e
+    codificar de novo: o trecho lido por read_sheet já está na indentação
+    de primeiro nível.
+    """
+    token = f"@trecho-{uuid.uuid4().hex}-"
+    raw_sections = {}
+    encoded = {}
+    for key, value in data.items():
+        if isinstance(value, DeferredSection) and not value.steps:
+            # Marcador trocado depois pelo trecho original
+            placeholder = f"{token}{len(raw_sections)}"
+            raw_sections[placeholder.encode('ascii')] = value.raw
+            value = placeholder
+        encoded[key] = value
+    payload = json.dumps(encoded, ensure_ascii=False, indent=4,
+                         default=_encode_deferred).encode('utf-8')
+    if not raw_sections:
+        return payload
+    parts = re.split(b'"(' + re.escape(token.encode('ascii')) + rb'\d+)"', payload)
+    # Partes ímpares são os marcadores capturados pelo split
+    return b''.join(raw_sections[part] if index % 2 else part
+                    for index, part in enumerate(parts))
+
+
+def _read_umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Lida uma vez: trocar a umask não é seguro com a gravação em segundo plano
+_UMASK = _read_umask()
+
+
+def _file_mode(path):
+    """Permissões do arquivo existente, ou as de um arquivo novo (umask)"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def write_atomic(path, payload):
+    """Grava bytes em um temporário sincronizado e o troca pelo original.
+
+    O temporário do mkstemp nasce com modo 0600; ele recebe as permissões
+    do arquivo que vai substituir.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.',
+                                     suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            os.chmod(temp_path, _file_mode(path))
+            file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_directory(directory)
+    return len(payload)
+
+
+def index_sections(raw):
+    """Posições (início, fim) do valor de cada chave de primeiro nível.
+
+    Funciona com o JSON gravado pela ficha (indent=4); para outros formatos
+    retorna None.
+    """
+    body = raw.strip()
+    if not body.startswith(b'{') or not body.endswith(b'}'):
+        return None
+    end_of_object = raw.rindex(b'}')
+    matches = list(_TOP_LEVEL_KEY.finditer(raw, 0, end_of_object))
+    if not matches or raw[:matches[0].start()].strip() != b'{':
+        return None
+    spans = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        start = match.end()
+        end = following.start() if following else end_of_object
+        value = raw[start:end].rstrip()
+        if following:
+            if not value.endswith(b','):
+                return None
+            value = value[:-1].rstrip()
+        spans[json.loads(match.group(1))] = (start, start + len(value))
+    return spans
+
+
+def read_sheet(path, deferred=DEFERRED_SECTIONS):
+    """Lê o JSON de uma ficha adiando as seções grandes.
+
+    As seções em ``deferred`` voltam como DeferredSection (o trecho bruto
+    do arquivo), que CharacterSheet.from_dict só decodifica no primeiro
+    acesso. Arquivos fora do formato indent=4 são lidos por inteiro.
+    """
+    with open(path, 'rb') as file:
+        raw = file.read()
+    if sheet_binary.is_binary(raw):
+        return sheet_binary.loads(raw)
+    spans = index_sections(raw)
+    if spans is None:
+        return json.loads(raw)
+    data = {}
+    try:
+        for key, (start, end) in spans.items():
+            value = raw[start:end]
+            # Só adia listas e objetos completos; o resto é pequeno
+            if key in deferred and value and _CLOSING.get(value[0]) == value[-1]:
+                data[key] = DeferredSection(value)
+            else:
+                data[key] = json.loads(value)
+    except ValueError:
+        return json.loads(raw)
+    return data
+
+
+def _fsync_directory(directory):
+    # Garante que a troca de nomes chegou ao disco (não suportado no Windows)
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def asset_ref(data):
+    """Referência de conteúdo de um arquivo binário ('sha256:<hex>')"""
+    return 'sha256:' + hashlib.sha256(data).hexdigest()
+
+
+class AssetStore:
+    """Arquivos binários (retratos) guardados pelo hash do conteúdo.
+
+    O mesmo conteúdo é gravado uma única vez, mesmo que várias fichas do
+    diretório o usem.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @classmethod
+    def for_sheet(cls, sheet_path):
+        """Repositório do diretório onde fica a ficha"""
+        return cls(os.path.join(os.path.dirname(os.path.abspath(sheet_path)), ASSET_DIRECTORY))
+
+    def path(self, ref):
+        match = _REF_PATTERN.match(ref or '')
+        if not match:
+            raise ValueError(f"Referência inválida: {ref!r}")
+        return os.path.join(self.directory, match.group(1))
+
+    def put(self, data, ref=None):
+        """Guarda o conteúdo (se ainda não existir) e retorna sua referência"""
+        ref = ref or asset_ref(data)
+        path = self.path(ref)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            write_atomic(path, data)
+        return ref
+
+    def get(self, ref):
+        """Lê o conteúdo de uma referência, conferindo o hash"""
+        with open(self.path(ref), 'rb') as file:
+            data = file.read()
+        if asset_ref(data) != ref:
+            raise ValueError(f"Conteúdo corrompido: {ref}")
+        return data
+
+
+def write_sheet(path, data, assets=None):
+    """Grava os arquivos referenciados ({ref: bytes}) e depois o JSON da ficha.
+
+    Os arquivos vêm primeiro para que o JSON nunca aponte para um retrato
+    que ainda não está no disco. No formato binário a ficha é autocontida:
+    o retrato vai dentro do próprio arquivo.
+    """
+    if is_binary_path(path):
+        return write_atomic(path, sheet_binary.dumps(_embed_assets(data, assets)))
+    if assets:
+        store = AssetStore.for_sheet(path)
+        for ref, content in assets.items():
+            store.put(content, ref)
+    return write_json_atomic(path, data)
+
+
+def is_binary_path(path):
+    return path.lower().endswith(sheet_binary.BINARY_EXTENSION)
+
+
+def _embed_assets(data, assets):
+    """Cópia rasa dos dados com seções adiadas lidas e o retrato embutido"""
+    data = {key: value.load() if isinstance(value, DeferredSection) else value
+            for key, value in data.items()}
+    ref = data.pop('photo_ref', None)
+    if ref and assets and ref in assets:
+        data['photo_data'] = base64.b64encode(assets[ref]).decode('ascii')
+    elif ref:
+        data['photo_ref'] = ref
+    return data
+
+
+class AutosaveWorker:
+    """Grava snapshots de fichas em segundo plano.
+
+    ``submit`` apenas guarda o snapshot e acorda a thread; se outro snapshot
+    do mesmo arquivo chegar antes da gravação, só o mais recente é gravado.
+    Os resultados (SaveResult) ficam em ``results`` para a interface ler
+    na thread principal.
+    """
+
+    def __init__(self, writer=write_sheet):
+        self.writer = writer
+        self.results = queue.Queue()
+        self._pending = {}
+        self._busy = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def submit(self, path, data, assets=None, on_saved=None):
+        """Agenda a gravação de data em path (substitui um snapshot pendente).
+
+        assets ({ref: bytes}) são os arquivos referenciados pela ficha.
+        on_saved é chamado na thread de gravação logo depois que este
+        snapshot chega ao disco (ex.: para compactar o diário da ficha).
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("AutosaveWorker já foi encerrado")
+            self._pending[path] = (data, assets, on_saved)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='autosave', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    @property
+    def idle(self):
+        with self._condition:
+            return not self._pending and not self._busy
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                path = next(iter(self._pending))
+                data, assets, on_saved = self._pending.pop(path)
+                self._busy = True
+            start = time.perf_counter()
+            try:
+                size = self.writer(path, data, assets)
+                if on_saved is not None:
+                    on_saved()
+                error = None
+            except Exception as e:
+                size = 0
+                error = e
+            self.results.put(SaveResult(path, error, time.perf_counter() - start, size))
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Espera as gravações pendentes terminarem; retorna False se expirar"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Grava o que estiver pendente e encerra a thread"""
+        done = self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        return done